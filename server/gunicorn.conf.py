@@ -0,0 +1,25 @@
+import gc
+import os
+
+'''
+gunicorn configuration, read from the working directory (see Procfile)
+
+The app is imported and the dataset tables are loaded once in the master process, before the workers are forked, so
+all workers share the same tables instead of each loading its own copy. Adding workers then costs little memory.
+'''
+
+timeout = 10000
+preload_app = os.environ.get('PRELOAD_DATASETS', '1') != '0'
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from pattern_mining.post_processing import utils
+    server.log.info("preloaded dataset tables: " + ", ".join(utils.datasets.preload()))
+    for data in ['airport', 'flaredown']:
+        utils.get_facet_index(data)
+        utils.get_event_name_index(data)
+    # objects allocated so far are never collected, so the garbage collector of a worker does not write to (and
+    # copy) the pages of the shared tables
+    gc.freeze()
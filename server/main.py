@@ -1,9 +1,15 @@
 # server
+import time
+boot_start = time.time()
+
 from flask import Flask, jsonify, request, render_template
 from flask_cors import CORS
 from pathlib import Path
 
 from pattern_mining.post_processing import utils
+from pattern_mining import jobs
+from pattern_mining.post_processing.pattern_store import PatternSetExpired
+from pattern_mining.post_processing.centrality import METHODS as CENTRALITY_METHODS
 
 # configuration
 DEBUG = True
@@ -14,6 +20,7 @@ app.config.from_object(__name__)
 # enable CORS
 CORS(app, resources={r'/*': {'origins': '*'}})
 
+utils.datasets.report_boot(boot_start)
 
 
 @app.route('/')
@@ -42,90 +49,192 @@ def ping_pong():
     return jsonify('pong!')
 
 
-@app.route('/fis', methods=['POST'])
-def all_freq_itemsets():
-    '''
-    request must include mining configuration, and optionally transaction filtering criteria
-    returns frequent itemsets and distribution for front-end in required format
-    '''
-    req = request.get_json()
-    mining_config = utils.HDict(req['config']) if req['config'] is not None else None
-    data = req['data']  # dataset identifier: airport or flaredown
+def _get_filters(req: dict) -> utils.HDict:
     sequence_filters = None
     if 'filter' in req:
         sequence_filters = {}
         for key in req['filter'].keys():
             sequence_filters[key] = tuple(req['filter'][key])
         sequence_filters = utils.HDict(sequence_filters)
+    return sequence_filters
+
+
+def freq_itemsets_views(req: dict) -> dict:
+    '''
+    mines frequent itemsets for a /fis request and returns the views for front-end
+    '''
+    mining_config = utils.HDict(req['config']) if req['config'] is not None else None
+    data = req['data']  # dataset identifier: airport or flaredown
+    sequence_filters = _get_filters(req)
     try:
         fis, s_ids = utils.get_frequent_itemsets(mining_config, sequence_filters, data=data)
-    except:
-        return jsonify({'toomany': '1'})
-    views_dict = utils.get_fis_matrix_views(tuple(fis), tuple(s_ids), data=data)
-    return jsonify(views_dict)
+    except utils.TooManyPatterns:
+        return {'toomany': '1'}
+    views_dict = dict(utils.get_fis_matrix_views(fis, tuple(s_ids), data=data))
+    views_dict['handle'] = utils.store_pattern_set(fis, False, mining_config, sequence_filters, data=data)
+    return views_dict
+
+
+def rules_views(req: dict) -> dict:
+    '''
+    mines sequential rules for a /rules request and returns the views for front-end
+    '''
+    data = req['data']  # dataset identifier: airport or flaredown
+    mining_config = utils.HDict(req['config']) if req['config'] is not None else None
+    sequence_filters = _get_filters(req)
+    try:
+        rules, s_ids, total = utils.get_sequential_rules(mining_config, sequence_filters, data=data)
+    except utils.TooManyPatterns:
+        return {'toomany': '1'}
+
+    # if too many rules are mined, only the top rules by support are returned along with the thresholds they reach
+    # and the number of rules found (truncated)
+    views_dict = dict(utils.get_rules_graph_matrix_views(rules, tuple(s_ids), data=data,
+                                                         centrality=req.get('centrality', 'approximate'),
+                                                         centrality_pivots=req.get('centrality_pivots')))
+    views_dict.update({'toomany':'0'})
+    views_dict['handle'] = utils.store_pattern_set(rules, True, mining_config, sequence_filters, data=data)
+    views_dict['thresholds'] = utils.get_effective_thresholds(rules, s_ids)
+    if total is not None:
+        views_dict['truncated'] = {'kept': len(rules), 'total': total}
+    return views_dict
+
+
+job_types = {'fis': freq_itemsets_views, 'rules': rules_views}
+
+
+def _check_centrality(req: dict) -> str:
+    '''
+    :return: error message if the centrality options of a /rules request are invalid, None otherwise
+    '''
+    if req.get('centrality', 'approximate') not in CENTRALITY_METHODS:
+        return 'unknown centrality method'
+    pivots = req.get('centrality_pivots')
+    if pivots is not None and (not isinstance(pivots, int) or pivots < 1):
+        return 'centrality_pivots must be a positive integer'
+    return None
+
+
+@app.route('/fis', methods=['POST'])
+def all_freq_itemsets():
+    '''
+    request must include mining configuration, and optionally transaction filtering criteria
+    returns frequent itemsets and distribution for front-end in required format
+    '''
+    return jsonify(freq_itemsets_views(request.get_json()))
 
 
 @app.route('/rules', methods=['POST'])
 def all_rules():
     '''
     request must include mining configuration, and optionally transaction filtering criteria
+    request may include the centrality method of the overview graph: 'exact', 'approximate' (default) or 'none',
+    and the number of pivots of approximate centrality (centrality_pivots, by default depends on graph size)
     returns sequential rules and distribution for front-end in required format
     '''
-    sequence_filters = None
     req = request.get_json()
-    data = req['data']  # dataset identifier: airport or flaredown
-    mining_config = utils.HDict(req['config']) if req['config'] is not None else None
-    if 'filter' in req:
-        sequence_filters = {}
-        for key in req['filter'].keys():
-            sequence_filters[key] = tuple(req['filter'][key])
-        sequence_filters = utils.HDict(sequence_filters)
+    error = _check_centrality(req)
+    if error is not None:
+        return jsonify({'error': error}), 400
+    return jsonify(rules_views(req))
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    '''
+    request must include job type ('rules' or 'fis') and the same fields as a /rules or /fis request
+    starts mining in the background and returns the job id right away
+    '''
+    req = request.get_json()
+    if req.get('type') not in job_types:
+        return jsonify({'error': 'unknown job type'}), 400
+    error = _check_centrality(req)
+    if error is not None:
+        return jsonify({'error': error}), 400
     try:
-        rules, s_ids = utils.get_sequential_rules(mining_config, sequence_filters, data=data)
-    except:
-        return jsonify({'toomany': '1'})
-
-    if rules is None:
-        # if the number of mined rules are too many, the post-processing will take too long
-        # for the sake of user experience, high number of rules are not processed and rendered
-        views_dict = {'toomany': '1'}
-    else:
-        views_dict = utils.get_rules_graph_matrix_views(tuple(rules), tuple(s_ids), data=data)
-        views_dict.update({'toomany':'0'})
-    return jsonify(views_dict)
+        job_id = jobs.job_manager.submit(job_types[req['type']], req)
+    except jobs.JobQueueFull:
+        return jsonify({'error': 'too many pending jobs'}), 503
+    return jsonify({'job_id': job_id, 'status': jobs.QUEUED}), 202
+
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    '''
+    returns status and stage of all the jobs, jobs of exited server processes are reported as failed
+    '''
+    return jsonify(jobs.job_manager.list())
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    '''
+    returns status and stage of a job, and its result (same as /rules or /fis response) once done
+    '''
+    job = jobs.job_manager.status(job_id)
+    if job is None:
+        return jsonify({'error': 'job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    if not jobs.job_manager.cancel(job_id):
+        return jsonify({'error': 'job not found or already finished'}), 404
+    return jsonify({'job_id': job_id, 'status': jobs.CANCELLED})
 
 
 @app.route('/distribution_data', methods=['POST'])
 def get_distribution_data():
+    '''
+    request must include the result handle returned by /rules or /fis, and ids of the selected patterns (rids)
+    returns data series of the sequences of the selected patterns
+    '''
     req = request.get_json()
-    mining_config = utils.HDict(req['config']) if req['config'] is not None else None
-    sequence_filters = None
     selected_rule_ids = req['rids']
-    if 'filter' in req:
-        sequence_filters = {}
-        for key in req['filter'].keys():
-            sequence_filters[key] = tuple(req['filter'][key])
-        sequence_filters = utils.HDict(sequence_filters)
+    if 'handle' not in req:
+        # requests of older front-ends, patterns are found by mining again with the posted configuration
+        result = _distribution_data_by_config(req, selected_rule_ids)
+        if result is None:
+            return jsonify({'error': 'selected patterns not found'}), 404
+        return jsonify(result)
+    try:
+        return jsonify(utils.get_distribution_data(req['handle'], tuple(selected_rule_ids)))
+    except PatternSetExpired:
+        return jsonify({'error': 'result expired, patterns must be mined again'}), 410
+
+
+def _distribution_data_by_config(req: dict, selected_rule_ids: list) -> dict:
+    '''
+    :return: data series of the sequences of the selected patterns, None if none of the patterns is found (e.g. the
+        configuration changed since the patterns were selected)
+    '''
+    mining_config = utils.HDict(req['config']) if req['config'] is not None else None
+    sequence_filters = _get_filters(req)
+    data = req.get('data', 'airport')
 
     if int(req['mode']) == 0:
-        patterns, s_ids = utils.get_sequential_rules(mining_config, sequence_filters)
+        patterns, s_ids, _ = utils.get_sequential_rules(mining_config, sequence_filters, data=data)
         rule = True
     else:
-        patterns, s_ids = utils.get_frequent_itemsets(mining_config, sequence_filters)
+        patterns, s_ids = utils.get_frequent_itemsets(mining_config, sequence_filters, data=data)
         rule = False
 
-    sequence_ids, seq_ids_per_pattern, pattern_items = utils.get_sequences_by_pattern_id(tuple(patterns),
+    sequence_ids, seq_ids_per_pattern, pattern_items = utils.get_sequences_by_pattern_id(patterns,
                                                                                          tuple(selected_rule_ids),
                                                                                          detailed=True,
-                                                                                         rule=rule)
-    sunburst, heatmap, pc = utils.get_views_by_sequence_ids(sequence_ids, seq_ids_per_pattern)
+                                                                                         rule=rule, data=data)
+    if len(seq_ids_per_pattern) == 0 and len(selected_rule_ids) != 0:
+        return None
+    sunburst, heatmap, pc = utils.get_views_by_sequence_ids(sequence_ids, seq_ids_per_pattern, data=data)
     result = {
         'heatmap': heatmap,
         'sunburst': sunburst,
         'pc': pc
     }
-    result.update(utils.get_performance(sequence_ids, pattern_items, rule))
-    return jsonify(result)
+    if data == 'airport':
+        result.update(utils.get_performance(sequence_ids, pattern_items, rule))
+    return result
 
 
 @app.route('/filter_options', methods=['GET'])
@@ -140,5 +249,40 @@ def get_filter_options():
     return jsonify(utils.get_filter_options())
 
 
+@app.route('/filter_counts', methods=['POST'])
+def get_filter_counts():
+    '''
+    request includes dataset identifier (airport or flaredown) and the current filter
+    returns the number of records of every option of the categorical filters, given the other filters
+    '''
+    req = request.get_json()
+    filters = _get_filters(req)
+    if filters is None:
+        return jsonify({'error': 'filter is required'}), 400
+    return jsonify(utils.get_filter_counts(filters, req.get('data', 'airport')))
+
+
+@app.route('/events/search', methods=['GET'])
+def search_events():
+    '''
+    request includes the query (q), and may include dataset identifier (airport or flaredown) - by default airport
+    dataset is used - and the maximum number of results (limit)
+    returns events whose names contain the query, for typeahead in the event filter
+    '''
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    return jsonify(utils.search_events(request.args.get('q', ''), request.args.get('data', 'airport'), limit))
+
+
+@app.route('/metrics/datasets', methods=['GET'])
+def get_dataset_metrics():
+    '''
+    returns the boot time of the server and the load time, format and size of the dataset tables loaded so far
+    '''
+    return jsonify(utils.datasets.metrics())
+
+
 if __name__ == '__main__':
     app.run()
@@ -0,0 +1,240 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from pattern_mining.processes import pid_alive
+
+'''
+Asynchronous mining jobs.
+
+A job runs the mining pipeline on a bounded thread pool of the server process that received it, so the web worker
+returns right away. Job status, stage and result are kept in an SQLite database shared by all server processes, so
+any gunicorn worker can answer a status poll or a cancellation for any job.
+
+Cancellation is cooperative: the pipeline calls report_stage between its stages, which raises JobCancelled once the
+job is cancelled. Finished jobs are removed after their result TTL.
+
+Each job records the pid and start time of the process running it. Queued and running jobs of a process that exited
+(or whose pid now belongs to another process) are marked failed when the manager starts, and whenever jobs are read.
+
+Configuration through environment variables:
+    JOB_WORKERS: number of jobs run at the same time per server process
+    JOB_MAX_PENDING: maximum number of queued and running jobs per server process, further jobs are rejected
+    JOB_RESULT_TTL: seconds a finished job and its result are kept
+    RESULT_CACHE_DIR: directory of the job database (shared with the result cache)
+'''
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+_current = threading.local()
+
+
+def report_stage(stage: str):
+    '''
+    records the current stage of the job running in this thread, does nothing outside of a job
+    raises JobCancelled if the job was cancelled
+    '''
+    manager = getattr(_current, 'manager', None)
+    if manager is not None:
+        manager.set_stage(_current.job_id, stage)
+
+
+def _process_start(pid: int) -> str:
+    '''
+    :return: start time of the process in clock ticks since boot, None if it is not available (no /proc)
+    '''
+    try:
+        with open('/proc/' + str(pid) + '/stat') as f:
+            # fields after the parenthesized command name start at field 3, the start time is field 22
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+def _owner_alive(pid: int, start: str) -> bool:
+    '''
+    :return: True if the process that stored pid and start is still running (a reused pid has another start time)
+    '''
+    if not pid_alive(pid):
+        return False
+    return start is None or _process_start(pid) in (None, start)
+
+
+class JobManager:
+
+    def __init__(self, directory: str, workers: int, max_pending: int, ttl: int):
+        '''
+        :param directory: directory of the job database
+        :param workers: number of jobs run at the same time in this process
+        :param max_pending: maximum number of queued and running jobs in this process
+        :param ttl: seconds a finished job is kept
+        '''
+        self.path = os.path.join(directory, 'jobs.sqlite')
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor = None
+        self._executor_pid = None
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT, stage TEXT, "
+                               "pid INTEGER, cancel INTEGER, result BLOB, error TEXT, created REAL, finished REAL, "
+                               "pid_start TEXT)")
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(jobs)")]
+            if 'pid_start' not in columns:  # database of an earlier version
+                connection.execute("ALTER TABLE jobs ADD COLUMN pid_start TEXT")
+        self._fail_orphans()
+
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection.execute("PRAGMA journal_mode=WAL")
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # threads are not inherited by forked gunicorn workers, each process starts its own pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            self._executor_pid = os.getpid()
+            self._pending = 0
+        return self._executor
+
+    def _update(self, job_id: str, **columns):
+        assignments = ', '.join(column + ' = ?' for column in columns)
+        with self._connection() as connection:
+            connection.execute("UPDATE jobs SET " + assignments + " WHERE id = ?", list(columns.values()) + [job_id])
+
+    def _fail_orphans(self):
+        '''
+        marks the queued and running jobs of exited processes as failed
+        '''
+        with self._connection() as connection:
+            rows = connection.execute("SELECT id, pid, pid_start FROM jobs WHERE status IN (?, ?)",
+                                      (QUEUED, RUNNING)).fetchall()
+            now = time.time()
+            connection.executemany("UPDATE jobs SET status = ?, error = ?, finished = ? "
+                                   "WHERE id = ? AND status IN (?, ?)",
+                                   [(FAILED, "server process running the job exited", now, job_id, QUEUED, RUNNING)
+                                    for job_id, pid, start in rows if not _owner_alive(pid, start)])
+
+    def _remove_expired(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?",
+                               (time.time() - self.ttl,))
+
+    def submit(self, function: Callable, *args) -> str:
+        '''
+        :param function: pipeline function, its return value is the job result
+        :return: job id
+        '''
+        self._remove_expired()
+        with self._lock:
+            executor = self._get_executor()
+            if self._pending >= self.max_pending:
+                raise JobQueueFull("too many pending jobs")
+            self._pending += 1
+        job_id = uuid.uuid4().hex
+        with self._connection() as connection:
+            connection.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, 0, NULL, NULL, ?, NULL, ?)",
+                               (job_id, QUEUED, QUEUED, os.getpid(), time.time(), _process_start(os.getpid())))
+        executor.submit(self._run, job_id, function, args)
+        return job_id
+
+    def _run(self, job_id: str, function: Callable, args: tuple):
+        _current.manager = self
+        _current.job_id = job_id
+        try:
+            self.set_stage(job_id, 'started', status=RUNNING)
+            result = function(*args)
+            self._update(job_id, status=DONE, stage=DONE, result=pickle.dumps(result), finished=time.time())
+        except JobCancelled:
+            self._update(job_id, status=CANCELLED, stage=CANCELLED, finished=time.time())
+        except Exception as e:
+            self._update(job_id, status=FAILED, error=repr(e), finished=time.time())
+        finally:
+            _current.manager = None
+            _current.job_id = None
+            with self._lock:
+                self._pending -= 1
+
+    def set_stage(self, job_id: str, stage: str, status: str = None):
+        '''
+        raises JobCancelled if the job was cancelled
+        '''
+        with self._connection() as connection:
+            row = connection.execute("SELECT cancel FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row[0]:
+                raise JobCancelled(job_id)
+            if status is None:
+                connection.execute("UPDATE jobs SET stage = ? WHERE id = ?", (stage, job_id))
+            else:
+                connection.execute("UPDATE jobs SET stage = ?, status = ? WHERE id = ?", (stage, status, job_id))
+
+    def status(self, job_id: str) -> dict:
+        '''
+        :return: dictionary of job id, status, stage, and result or error if the job finished. None if the job
+            does not exist or has expired
+        '''
+        self._fail_orphans()
+        with self._connection() as connection:
+            row = connection.execute("SELECT status, stage, result, error FROM jobs WHERE id = ?",
+                                     (job_id,)).fetchone()
+        if row is None:
+            return None
+        status, stage, result, error = row
+        job = {'job_id': job_id, 'status': status, 'stage': stage}
+        if status == DONE:
+            job['result'] = pickle.loads(result)
+        elif status == FAILED:
+            job['error'] = error
+        return job
+
+    def list(self) -> list:
+        '''
+        :return: list of dictionaries of job id, status, stage and error of all the jobs, newest first
+        '''
+        self._fail_orphans()
+        with self._connection() as connection:
+            rows = connection.execute("SELECT id, status, stage, error FROM jobs ORDER BY created DESC").fetchall()
+        return [{'job_id': job_id, 'status': status, 'stage': stage, 'error': error}
+                for job_id, status, stage, error in rows]
+
+    def cancel(self, job_id: str) -> bool:
+        '''
+        :return: False if the job does not exist or already finished
+        '''
+        self._fail_orphans()
+        with self._connection() as connection:
+            cursor = connection.execute("UPDATE jobs SET cancel = 1 WHERE id = ? AND status IN (?, ?)",
+                                        (job_id, QUEUED, RUNNING))
+            # a queued job is cancelled right away, a running one at its next stage
+            connection.execute("UPDATE jobs SET status = ?, stage = ?, finished = ? WHERE id = ? AND status = ?",
+                               (CANCELLED, CANCELLED, time.time(), job_id, QUEUED))
+            return cursor.rowcount > 0
+
+
+job_manager = JobManager(os.environ.get('RESULT_CACHE_DIR', 'pattern_mining/data/cache'),
+                         workers=int(os.environ.get('JOB_WORKERS', 2)),
+                         max_pending=int(os.environ.get('JOB_MAX_PENDING', 16)),
+                         ttl=int(os.environ.get('JOB_RESULT_TTL', 60 * 60)))
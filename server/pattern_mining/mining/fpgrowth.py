@@ -0,0 +1,175 @@
+import math
+import numpy as np
+from itertools import combinations
+from typing import Iterable, List, Tuple
+from pattern_mining.post_processing.pattern_classes import ItemsetTable
+from pattern_mining.mining.limits import check_pattern_count
+
+'''
+In-process FP-Growth for frequent itemsets.
+
+Mining with the SPMF Java executable requires writing an input file, starting a JVM and parsing the output file for
+every request. For the dataset sizes used in this project that overhead is larger than the mining itself, so this
+module mines directly from the transaction column and fills the transaction ids of each itemset while at it.
+The SPMF backend is still available in post_processing.utils for cross-checking the results.
+'''
+
+
+class _FPNode:
+    __slots__ = ('item', 'count', 'parent', 'children')
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+
+
+class FPTree:
+    '''
+    prefix tree of transactions with items sorted by descending support, along with a header table of the nodes of
+    each item
+    '''
+
+    def __init__(self, transactions: Iterable[Tuple[list, int]], min_count: int):
+        '''
+        :param transactions: iterable of (items, count) tuples, count is the number of times the transaction repeats
+        :param min_count: absolute minimum support, infrequent items are not inserted into the tree
+        '''
+        transactions = list(transactions)
+        self.root = _FPNode(None, None)
+        self.header = {}
+        self.item_support = {}
+        for items, count in transactions:
+            for item in items:
+                self.item_support[item] = self.item_support.get(item, 0) + count
+        self.item_support = {item: s for item, s in self.item_support.items() if s >= min_count}
+
+        # ties are broken by item code to keep the tree (and the output) deterministic
+        rank = {item: r for r, item in
+                enumerate(sorted(self.item_support, key=lambda i: (-self.item_support[i], i)))}
+        for items, count in transactions:
+            items = sorted([item for item in items if item in rank], key=rank.get)
+            if items:
+                self._insert(items, count)
+
+    def _insert(self, items: list, count: int):
+        node = self.root
+        for item in items:
+            child = node.children.get(item)
+            if child is None:
+                child = _FPNode(item, node)
+                node.children[item] = child
+                self.header.setdefault(item, []).append(child)
+            child.count += count
+            node = child
+
+    def single_path(self) -> list:
+        '''
+        :return: list of (item, count) along the tree if the tree has only one branch, else None
+        '''
+        path = []
+        node = self.root
+        while len(node.children) == 1:
+            node = next(iter(node.children.values()))
+            path.append((node.item, node.count))
+        return path if len(node.children) == 0 else None
+
+    def prefix_paths(self, item) -> List[Tuple[list, int]]:
+        '''
+        :param item: item in header table
+        :return: conditional pattern base of the item, list of (path from root, count of item node)
+        '''
+        paths = []
+        for node in self.header[item]:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                paths.append((path[::-1], node.count))
+        return paths
+
+
+def _fpgrowth(tree: FPTree, suffix: tuple, min_count: int, result: List[Tuple[tuple, int]], max_patterns: int = None):
+    '''
+    recursively mines the FP-tree and appends (itemset, support) to result
+
+    :raises TooManyPatterns: as soon as result has more than max_patterns itemsets
+    '''
+    path = tree.single_path()
+    if path is not None:
+        # every combination of the nodes of a single path is frequent, support is the count of the deepest node
+        check_pattern_count(len(result) + 2 ** len(path) - 1, max_patterns)
+        for size in range(1, len(path) + 1):
+            for combination in combinations(path, size):
+                result.append((suffix + tuple(item for item, _ in combination), combination[-1][1]))
+        return
+
+    for item in sorted(tree.header, key=lambda i: (tree.item_support[i], i)):
+        itemset = suffix + (item,)
+        result.append((itemset, tree.item_support[item]))
+        check_pattern_count(len(result), max_patterns)
+        conditional_tree = FPTree(tree.prefix_paths(item), min_count)
+        if conditional_tree.header:
+            _fpgrowth(conditional_tree, itemset, min_count, result, max_patterns)
+
+
+def to_transaction(record: Iterable) -> set:
+    '''
+    :param record: list of items, or list of tuples for complex sequences (simultaneous events)
+    :return: set of unique items in the record
+    '''
+    items = set()
+    for element in record:
+        if isinstance(element, (tuple, list, np.ndarray)):
+            items.update(int(item) for item in element)
+        else:
+            items.add(int(element))
+    return items
+
+
+def get_min_count(support: float, record_count: int) -> int:
+    '''
+    :param support: minimum support in percentage
+    :param record_count: number of transactions/sequences
+    :return: absolute minimum support, rounded the same way as SPMF
+    '''
+    return max(1, int(math.ceil(support / 100 * record_count)))
+
+
+def mine_frequent_itemsets(records: Iterable, ids: Iterable, support: float, max_patterns: int = None) -> ItemsetTable:
+    '''
+    :param records: list of transactions. Each transaction is a list of items or a list of tuples of items
+    :param ids: transaction ids in the same order as records
+    :param support: minimum support in percentage, same as the SPMF argument without the % sign
+    :param max_patterns: maximum number of itemsets, None for no limit
+    :return: ItemsetTable, the FrequentItemSet objects have seq_ids and support_percentage set
+    :raises TooManyPatterns: if more than max_patterns itemsets are frequent
+    '''
+    transactions = [to_transaction(record) for record in records]
+    ids = np.array(list(ids), dtype=object)
+    mined = []
+    item_row = {}
+    if len(transactions) != 0:
+        min_count = get_min_count(support, len(transactions))
+        tree = FPTree(((transaction, 1) for transaction in transactions), min_count)
+        _fpgrowth(tree, (), min_count, mined, max_patterns)
+        item_row = {item: row for row, item in enumerate(sorted(tree.item_support))}
+
+    # vertical boolean matrix (frequent item x transaction) for finding the transactions of each itemset
+    incidence = np.zeros((len(item_row), len(transactions)), dtype=bool)
+    for column, transaction in enumerate(transactions):
+        for item in transaction:
+            if item in item_row:
+                incidence[item_row[item], column] = True
+
+    mined = [(sorted(items), count) for items, count in mined]
+    mined.sort(key=lambda pattern: (len(pattern[0]), pattern[0]))
+    indptr = np.zeros(len(mined) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(items) for items, _ in mined])
+    items = np.array([item for itemset, _ in mined for item in itemset], dtype=np.int32)
+    seq_ids = [list(ids[incidence[[item_row[item] for item in itemset]].all(axis=0)]) for itemset, _ in mined]
+    return ItemsetTable(indptr, items, np.array([count for _, count in mined], dtype=np.int64), seq_ids=seq_ids,
+                        record_count=len(transactions))
@@ -0,0 +1,43 @@
+import ca.pfv.spmf.gui.CommandProcessor;
+
+import java.io.BufferedReader;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.util.Arrays;
+
+/**
+ * Long-lived SPMF worker driven over stdin/stdout by pattern_mining/mining/spmf_pool.py
+ *
+ * Each job is one line of tab separated fields: algorithm, input file, output file, arguments...
+ * The worker replies with one line per job: "@DONE" when the output file is written, or "@ERROR message".
+ * SPMF prints statistics to System.out, so System.out is redirected to System.err while a job runs to keep the
+ * protocol channel clean.
+ */
+public class SpmfWorker {
+
+    public static void main(String[] args) throws Exception {
+        PrintStream protocol = new PrintStream(System.out, true, "UTF-8");
+        System.setOut(System.err);
+        BufferedReader jobs = new BufferedReader(new InputStreamReader(System.in, "UTF-8"));
+
+        String line;
+        while ((line = jobs.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            String[] fields = line.split("\t", -1);
+            if (fields.length < 3) {
+                protocol.println("@ERROR malformed job");
+                continue;
+            }
+            try {
+                String[] parameters = Arrays.copyOfRange(fields, 3, fields.length);
+                CommandProcessor.runAlgorithm(fields[0], fields[1], fields[2], parameters);
+                protocol.println("@DONE");
+            } catch (Throwable e) {
+                String message = String.valueOf(e).replace('\n', ' ').replace('\r', ' ');
+                protocol.println("@ERROR " + message);
+            }
+        }
+    }
+}
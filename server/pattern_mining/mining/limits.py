@@ -0,0 +1,24 @@
+'''
+Output limits of the in-process miners.
+
+The number of patterns above a low support threshold grows exponentially with the length of the
+transactions/sequences, so the native miners stop as soon as they exceed the pattern budget of the caller instead of
+growing their result until the process runs out of memory.
+'''
+
+
+class TooManyPatterns(Exception):
+    '''
+    mining found more patterns than the pattern budget, the output size cap or the memory of SPMF allows
+    '''
+    pass
+
+
+def check_pattern_count(count: int, max_patterns: int = None):
+    '''
+    :param count: number of patterns found so far
+    :param max_patterns: pattern budget, None for no limit
+    :raises TooManyPatterns: if count exceeds max_patterns
+    '''
+    if max_patterns is not None and count > max_patterns:
+        raise TooManyPatterns("mining found more than " + str(max_patterns) + " patterns")
@@ -8,7 +8,7 @@ import dash_core_components as dcc
 import dash_html_components as html
 import dash_bootstrap_components as dbc
 from pattern_mining.post_processing.rule_dag import RuleDAG
-from pattern_mining.post_processing.itemset_graph import ItemsetGraph
+from pattern_mining.post_processing.itemset_graph import ItemsetGraph, network_max_edges
 from pattern_mining.pre_processing.dictionary import AirportMapping
 
 '''
@@ -105,7 +105,7 @@ matrices, full_graph = rd.create_matrices(rules, cluster=False, id_as_column=Tru
 # Frequent itemset parsing and lattice generation
 with open('pattern_mining/data/HIAA_anonymized/fis.pkl', 'rb') as f:
     freqitemsets = pickle.load(f)
-lattice_fig = ItemsetGraph().generate_plotly_figure(freqitemsets)
+lattice_fig = ItemsetGraph(max_edges_per_node=network_max_edges).generate_plotly_figure(freqitemsets)
 
 # Get list of tids per rule, used for generating parallel coordinates for weather, one line per rule
 # which is the median of weather condition of sequences of each rule
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+from pattern_mining.processes import pid_alive
+
+'''
+Scratch files for the SPMF backend.
+
+SPMF only reads and writes files, and some algorithms read their input more than once, so the input cannot be streamed
+through a pipe. Instead the files are kept in a memory-backed directory (/dev/shm when available) and every mining run
+owns its files through the scratch_files context manager, which removes them whether or not mining and parsing
+succeed. File names start with the pid of the owner process, which lets reap_orphans remove files left behind by
+killed server workers.
+
+SPMF_SCRATCH_DIR environment variable overrides the scratch directory.
+'''
+
+
+def _default_scratch_dir() -> str:
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm/serviz-spmf'
+    return os.path.join(tempfile.gettempdir(), 'serviz-spmf')
+
+
+scratch_dir = os.environ.get('SPMF_SCRATCH_DIR', _default_scratch_dir())
+# files of live processes older than this (seconds) are considered leaked as well
+max_file_age = 6 * 60 * 60
+
+_reaped_pid = None
+
+
+def reap_orphans(max_age: int = max_file_age) -> int:
+    '''
+    removes scratch files whose owner process is gone or which are older than max_age seconds
+    :return: number of removed files
+    '''
+    removed = 0
+    if not os.path.isdir(scratch_dir):
+        return removed
+    now = time.time()
+    for filename in os.listdir(scratch_dir):
+        path = os.path.join(scratch_dir, filename)
+        try:
+            pid = int(filename.split('-', 1)[0])
+        except ValueError:
+            continue
+        try:
+            if not pid_alive(pid) or now - os.path.getmtime(path) > max_age:
+                os.remove(path)
+                removed += 1
+        except OSError:  # removed concurrently by another process
+            pass
+    return removed
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def scratch_files() -> Iterator[Tuple[str, str]]:
+    '''
+    context manager for one SPMF run, the files are removed on exit even if an exception is raised
+    orphans of dead processes are reaped the first time a process uses the scratch directory
+
+    :return: tuple of input and output file paths in the scratch directory
+    '''
+    global _reaped_pid
+    os.makedirs(scratch_dir, exist_ok=True)
+    if _reaped_pid != os.getpid():
+        _reaped_pid = os.getpid()
+        reap_orphans()
+
+    prefix = os.path.join(scratch_dir, '{}-{}'.format(os.getpid(), uuid.uuid4().hex))
+    input_file = prefix + '-in.txt'
+    output_file = prefix + '-out.txt'
+    try:
+        yield input_file, output_file
+    finally:
+        _remove(input_file)
+        _remove(output_file)
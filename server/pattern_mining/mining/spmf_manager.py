@@ -5,6 +5,7 @@ from spmf import Spmf
 import pathlib
 import uuid
 from pattern_mining.pre_processing.dictionary import AirportMapping
+from pattern_mining.mining import spmf_pool
 from typing import Iterable, List
 
 spmf_jar_dir = str(pathlib.Path(__file__).parent.absolute())+"/thirdparty"
@@ -58,7 +59,8 @@ def generate_input_line_from_list(record: List, itemset=False) -> str:
     return line
 
 
-def generate_input_file(records: Iterable, itemset=False, converted_from_text=False, is_spmf_format=False) -> str:
+def generate_input_file(records: Iterable, itemset=False, converted_from_text=False, is_spmf_format=False,
+                        filename: str = None) -> str:
     '''
     :param records: iterable object of lists. Each list is a transaction or a sequence. Complex sequences must be
         represented with list of tuples
@@ -66,41 +68,49 @@ def generate_input_file(records: Iterable, itemset=False, converted_from_text=Fa
     :param converted_from_text: use a dictionary for converting numbers to names in output.
         more details in SPMF documentation
     :param is_spmf_format: if the records are already in spmf format
+    :param filename: path of the input file, by default a new file in data directory. Use spmf_io.scratch_files for
+        files that must not outlive the mining run
     :return: file name of the SPMF input
     '''
-    id = str(uuid.uuid4().hex)
-    filename = id + '.txt'
-    filename = os.path.join(data_dir, filename)
-    file = open(filename, "w")
+    if filename is None:
+        filename = os.path.join(data_dir, str(uuid.uuid4().hex) + '.txt')
 
-    if converted_from_text:
-        file.write(_generate_CONVERTED_FROM_TEXT())
+    with open(filename, "w") as file:
+        if converted_from_text:
+            file.write(_generate_CONVERTED_FROM_TEXT())
 
-    for record in records:
-        if not is_spmf_format:
-            record = generate_input_line_from_list(record, itemset)
-        file.write(record)
-
-    file.close()
+        for record in records:
+            if not is_spmf_format:
+                record = generate_input_line_from_list(record, itemset)
+            file.write(record)
 
     return filename
 
 
-def run(sm_algorithm, input_file, support='15%', confidence='60%', window=15, max_cons=1, itemset=False) -> str:
+def run(sm_algorithm, input_file, support='15%', confidence='60%', window=15, max_cons=1, itemset=False,
+        output_file: str = None) -> str:
     '''
-    Runs SPMF Java executable with input arguments, returns file name of SPMF output
+    Runs SPMF with input arguments, returns file name of SPMF output
+    The job is sent to the warm worker pool in spmf_pool, unless the pool is disabled or its worker class was not
+    compiled at build time, then a new Java process is started for the job
+    :param output_file: path of the output file, by default a new file in data directory
+    :raises spmf_pool.SpmfOutputTooLarge: if the output exceeded the output size cap of spmf_pool or the heap of the JVM
     '''
-    id = str(uuid.uuid4().hex)
-    output_filename = id + '.txt'
-    output_file = os.path.join(data_dir, output_filename)
+    if output_file is None:
+        output_file = os.path.join(data_dir, str(uuid.uuid4().hex) + '.txt')
     arguments = [support]
     if not itemset:
         arguments.append(confidence)
     if sm_algorithm == 'TRuleGrowth':
         arguments.extend([window, window, max_cons])
-    spmf = Spmf(sm_algorithm, input_filename=input_file, spmf_bin_location_dir=spmf_jar_dir,
-                output_filename=output_file, arguments=arguments, memory=350)
-    spmf.run()
+    if spmf_pool.is_available():
+        spmf_pool.get_pool().run(sm_algorithm, input_file, output_file, arguments)
+    else:
+        spmf = Spmf(sm_algorithm, input_filename=input_file, spmf_bin_location_dir=spmf_jar_dir,
+                    output_filename=output_file, arguments=arguments, memory=spmf_pool.worker_memory)
+        spmf.run()
+        # a job started here cannot be stopped while it runs, its output is only checked once it is written
+        spmf_pool.check_output_size(output_file)
     return output_file
 
 
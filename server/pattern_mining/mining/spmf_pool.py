@@ -0,0 +1,269 @@
+import atexit
+import os
+import pathlib
+import select
+import shutil
+import subprocess
+import threading
+import time
+from typing import List
+
+'''
+Pool of long-lived SPMF worker processes.
+
+Running SPMF through the spmf package starts a new JVM for every mining request, paying class loading and JIT warm-up
+each time. The workers in this pool are started once per server process (java/SpmfWorker.java) and receive jobs over
+stdin/stdout, so consecutive requests reuse a warm JVM.
+
+The worker class is compiled at build time (bin/post_compile runs python -m pattern_mining.mining.spmf_pool), never
+while serving requests. Without the compiled class (e.g. an image with a JRE only) the pool is not used and every
+request starts its own JVM.
+
+Configuration through environment variables:
+    SPMF_POOL: set to 0 to disable the pool and start one JVM per request
+    SPMF_POOL_SIZE: maximum number of worker processes
+    SPMF_WORKER_MEMORY: maximum heap of each worker in MB
+    SPMF_QUEUE_DEPTH: maximum number of jobs waiting for a free worker, further jobs are rejected
+    SPMF_JOB_TIMEOUT: seconds a job may run, a worker exceeding it is killed and replaced by a new one
+    SPMF_MAX_OUTPUT_MB: maximum size of the output file of a job, a worker writing more is killed and replaced
+'''
+
+java_dir = str(pathlib.Path(__file__).parent.absolute()) + "/java"
+spmf_jar = str(pathlib.Path(__file__).parent.absolute()) + "/thirdparty/spmf.jar"
+
+enabled = os.environ.get('SPMF_POOL', '1') != '0'
+pool_size = int(os.environ.get('SPMF_POOL_SIZE', 2))
+worker_memory = int(os.environ.get('SPMF_WORKER_MEMORY', 350))
+queue_depth = int(os.environ.get('SPMF_QUEUE_DEPTH', 8))
+job_timeout = float(os.environ.get('SPMF_JOB_TIMEOUT', 600))
+max_output_bytes = int(os.environ.get('SPMF_MAX_OUTPUT_MB', 200)) * 2 ** 20
+
+_source = os.path.join(java_dir, 'SpmfWorker.java')
+_compiled = os.path.join(java_dir, 'SpmfWorker.class')
+
+
+class SpmfWorkerError(RuntimeError):
+    pass
+
+
+class SpmfJobTimeout(SpmfWorkerError):
+    pass
+
+
+class SpmfOutputTooLarge(SpmfWorkerError):
+    '''
+    the job found more patterns than the output size cap or the heap of the JVM allows
+    '''
+    pass
+
+
+def check_output_size(output_file: str, max_bytes: int = None):
+    '''
+    :param output_file: path of the SPMF output file
+    :param max_bytes: maximum size of the output file, by default max_output_bytes
+    :raises SpmfOutputTooLarge: if the output file is larger than max_bytes
+    '''
+    max_bytes = max_output_bytes if max_bytes is None else max_bytes
+    if os.path.exists(output_file) and os.path.getsize(output_file) > max_bytes:
+        raise SpmfOutputTooLarge("SPMF output exceeded " + str(max_bytes) + " bytes")
+
+
+def is_available() -> bool:
+    '''
+    :return: True if the pool is enabled and the worker class was compiled by the build step
+    '''
+    return enabled and os.path.exists(_compiled)
+
+
+def compile_worker() -> bool:
+    '''
+    compiles the worker class against the SPMF jar if the class file is missing or older than the source.
+    Build step only, see bin/post_compile
+
+    :return: True if the compiled class is up to date
+    '''
+    if os.path.exists(_compiled) and os.path.getmtime(_compiled) >= os.path.getmtime(_source):
+        return True
+    if shutil.which('javac') is None:
+        return False
+    subprocess.check_call(['javac', '-cp', spmf_jar, '-d', java_dir, _source])
+    return True
+
+
+class SpmfWorker:
+    '''
+    one JVM running SpmfWorker, jobs are sent as tab separated lines and each job gets one reply line
+    '''
+
+    poll_interval = 0.5  # seconds between checks of the output size and the timeout of a running job
+
+    def __init__(self, memory: int):
+        self.process = subprocess.Popen(['java', '-Xmx{}m'.format(memory), '-cp',
+                                         os.pathsep.join([spmf_jar, java_dir]), 'SpmfWorker'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1)
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, sm_algorithm: str, input_file: str, output_file: str, arguments: List, timeout: float = None,
+            max_bytes: int = None):
+        '''
+        runs one SPMF job and blocks until the output file is written
+
+        :param timeout: seconds to wait for the job, the worker is killed if the job takes longer
+        :param max_bytes: maximum size of the output file, the worker is killed if the job writes more
+        :raises SpmfOutputTooLarge: if the output exceeded max_bytes or the JVM ran out of memory
+        '''
+        job = [sm_algorithm, input_file, output_file] + [str(argument) for argument in arguments]
+        deadline = None if timeout is None else time.time() + timeout
+        try:
+            self.process.stdin.write('\t'.join(job) + '\n')
+            self.process.stdin.flush()
+            # the worker writes its reply line at once, so the line is complete when the pipe becomes readable. While
+            # waiting, the output file is checked every poll_interval seconds
+            while not select.select([self.process.stdout], [], [], self._wait_time(deadline))[0]:
+                if max_bytes is not None:
+                    try:
+                        check_output_size(output_file, max_bytes)
+                    except SpmfOutputTooLarge:
+                        self.kill()
+                        raise
+                if deadline is not None and time.time() >= deadline:
+                    self.kill()
+                    raise SpmfJobTimeout("SPMF job did not finish in " + str(timeout) + "s, the worker was killed")
+            reply = self.process.stdout.readline().strip()
+        except (BrokenPipeError, OSError) as e:
+            raise SpmfWorkerError("SPMF worker is not running: " + str(e))
+        if reply == '@DONE':
+            if max_bytes is not None:
+                # a job may finish between two checks
+                check_output_size(output_file, max_bytes)
+            return
+        if reply == '':
+            raise SpmfWorkerError("SPMF worker exited with code " + str(self.process.poll()))
+        if 'OutOfMemoryError' in reply:
+            raise SpmfOutputTooLarge(reply[len('@ERROR '):])
+        raise SpmfWorkerError(reply[len('@ERROR '):])
+
+    def _wait_time(self, deadline: float = None) -> float:
+        if deadline is None:
+            return self.poll_interval
+        return max(0, min(self.poll_interval, deadline - time.time()))
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+
+    def close(self):
+        if self.is_alive():
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class SpmfWorkerPool:
+    '''
+    bounded pool of SpmfWorker processes. Workers are started lazily and reused for all jobs. A worker that died or was
+    killed for exceeding the job timeout frees its place, and a waiting job starts a new worker in it.
+    '''
+
+    def __init__(self, size: int = pool_size, memory: int = worker_memory, max_queue: int = queue_depth,
+                 timeout: float = job_timeout, max_bytes: int = None, worker_factory=SpmfWorker):
+        '''
+        :param size: maximum number of worker processes
+        :param memory: maximum heap of each worker in MB
+        :param max_queue: maximum number of jobs waiting for a free worker
+        :param timeout: seconds a job may run on a worker, None for no limit
+        :param max_bytes: maximum size of the output file of a job, by default max_output_bytes
+        :param worker_factory: creates a worker from the heap size
+        '''
+        self.size = size
+        self.memory = memory
+        self.timeout = timeout
+        self.max_bytes = max_output_bytes if max_bytes is None else max_bytes
+        self._worker_factory = worker_factory
+        self._idle = []  # the most recently used worker (last) is the warmest one
+        self._slots = threading.BoundedSemaphore(size + max_queue)
+        self._condition = threading.Condition()
+        self._workers = []
+
+    def _checkout(self) -> SpmfWorker:
+        with self._condition:
+            while True:
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.is_alive():
+                        return worker
+                    self._workers.remove(worker)
+                if len(self._workers) < self.size:
+                    worker = self._worker_factory(self.memory)
+                    self._workers.append(worker)
+                    return worker
+                self._condition.wait()
+
+    def _checkin(self, worker: SpmfWorker):
+        with self._condition:
+            if worker.is_alive():
+                self._idle.append(worker)
+            else:
+                self._workers.remove(worker)
+            self._condition.notify()
+
+    def run(self, sm_algorithm: str, input_file: str, output_file: str, arguments: List):
+        '''
+        runs an SPMF job on a free worker, waits in the queue if all workers are busy
+
+        :raises SpmfJobTimeout: if the job exceeded the timeout
+        :raises SpmfOutputTooLarge: if the job exceeded the output size or the heap of the worker
+        '''
+        if not self._slots.acquire(blocking=False):
+            raise SpmfWorkerError("SPMF job queue is full")
+        try:
+            worker = self._checkout()
+            try:
+                worker.run(sm_algorithm, input_file, output_file, arguments, timeout=self.timeout,
+                           max_bytes=self.max_bytes)
+            finally:
+                self._checkin(worker)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._condition:
+            for worker in self._workers:
+                worker.close()
+            self._workers = []
+            self._idle = []
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SpmfWorkerPool:
+    '''
+    :return: the worker pool of the current process. A forked (gunicorn) worker gets its own pool instead of the
+        pipes inherited from the parent
+    '''
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = SpmfWorkerPool()
+            _pool_pid = os.getpid()
+        return _pool
+
+
+@atexit.register
+def _close_pool():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.close()
+
+
+if __name__ == '__main__':
+    if compile_worker():
+        print("SpmfWorker class is up to date")
+    else:
+        print("javac not found, SpmfWorker was not compiled: SPMF jobs start one JVM each")
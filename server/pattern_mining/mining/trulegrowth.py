@@ -0,0 +1,296 @@
+import heapq
+import itertools
+import numpy as np
+from bisect import bisect_right, bisect_left
+from typing import Iterable, List
+from pattern_mining.post_processing.pattern_classes import RuleTable
+from pattern_mining.mining.fpgrowth import get_min_count
+from pattern_mining.mining.limits import check_pattern_count
+
+'''
+In-process TRuleGrowth for sequential rules.
+
+Same rule definition and parameters as the SPMF implementation run by spmf_manager.run: a rule X ==> Y holds in a
+sequence if all items of X appear before all items of Y within a window of consecutive itemsets. Rules are grown
+from pairs of items by adding items to the consequent (expand right) and to the antecedent (expand left), and each
+rule keeps the set of sequences it holds in, so the supporting sequence ids are known without a separate matching pass.
+
+TopKRuleGrowth mines the k rules with the highest support instead of all rules above a support threshold. The support
+threshold starts at one sequence and is raised to the support of the k-th best rule found so far, so the output and the
+search stay bounded whatever the data.
+
+based on:
+Fournier-Viger, P., Wu, C.-W., Tseng, V. S., Nkambou, R. (2012). Mining Sequential Rules Common to Several Sequences
+with the Window Size Constraint. Proc. 25th Canadian Conf. on Artificial Intelligence
+Fournier-Viger, P., Tseng, V. S. (2011). Mining Top-K Sequential Rules. Proc. 7th Intern. Conf. on Advanced Data
+Mining and Applications
+'''
+
+
+def to_itemsets(record: Iterable) -> List[tuple]:
+    '''
+    :param record: list of items, or list of tuples for complex sequences (simultaneous events)
+    :return: list of itemsets
+    '''
+    return [tuple(int(item) for item in element) if isinstance(element, (tuple, list, np.ndarray))
+            else (int(element),) for element in record]
+
+
+def _occurrences(itemsets: List[tuple]) -> dict:
+    '''
+    :return: dictionary with key=item, value=sorted list of positions of the itemsets containing the item
+    '''
+    occurrences = {}
+    for position, itemset in enumerate(itemsets):
+        for item in itemset:
+            positions = occurrences.setdefault(item, [])
+            if not positions or positions[-1] != position:
+                positions.append(position)
+    return occurrences
+
+
+def window_match(occurrences: dict, lhs: tuple, rhs: tuple, window: int) -> bool:
+    '''
+    :param occurrences: item positions of one sequence
+    :param lhs: antecedent items
+    :param rhs: consequent items
+    :param window: maximum number of consecutive itemsets spanned by the rule
+    :return: True if all lhs items appear before all rhs items within the window
+
+    for a split position k, the best window ends lhs at the last occurrence of each lhs item up to k and starts rhs at
+    the first occurrence of each rhs item after k. Only positions of lhs items need to be tried as k.
+    '''
+    for k in sorted(set(position for item in lhs for position in occurrences[item])):
+        start = k
+        for item in lhs:
+            positions = occurrences[item]
+            index = bisect_right(positions, k) - 1
+            if index < 0:
+                start = None
+                break
+            start = min(start, positions[index])
+        if start is None:
+            continue
+        end = k
+        for item in rhs:
+            positions = occurrences[item]
+            index = bisect_left(positions, k + 1)
+            if index == len(positions):
+                end = None
+                break
+            end = max(end, positions[index])
+        if end is None:
+            # rhs items only get rarer further right
+            return False
+        if end - start < window:
+            return True
+    return False
+
+
+class TRuleGrowth:
+
+    def __init__(self, records: Iterable, support: float, confidence: float, window: int, max_antecedent: int = None,
+                 max_consequent: int = 1, max_patterns: int = None):
+        '''
+        :param records: list of sequences. Each sequence is a list of items or a list of tuples of items
+        :param support: minimum support in percentage
+        :param confidence: minimum confidence in percentage
+        :param window: window size
+        :param max_antecedent: maximum number of items in rule antecedent, spmf_manager.run uses the window
+        :param max_consequent: maximum number of items in rule consequent
+        :param max_patterns: maximum number of rules, mine raises TooManyPatterns as soon as more are found
+        '''
+        self.occurrences = [_occurrences(to_itemsets(record)) for record in records]
+        self.min_count = get_min_count(support, len(self.occurrences))
+        self.min_confidence = confidence / 100
+        self.window = window
+        self.max_antecedent = window if max_antecedent is None else max_antecedent
+        self.max_consequent = max_consequent
+        self.max_patterns = max_patterns
+        self.rules = []
+
+        item_sids = {}
+        for sid, occurrences in enumerate(self.occurrences):
+            for item in occurrences:
+                item_sids.setdefault(item, set()).add(sid)
+        self.item_sids = {item: sids for item, sids in item_sids.items() if len(sids) >= self.min_count}
+
+    def mine(self) -> list:
+        '''
+        :return: list of (antecedent, consequent, set of supporting sequence indices, confidence)
+        '''
+        self.rules = []
+        for lhs, rhs, lhs_sids, rule_sids in self._pairs():
+            self._grow(lhs, rhs, lhs_sids, rule_sids)
+        return self.rules
+
+    def _pairs(self):
+        '''
+        :return: generator of (lhs, rhs, lhs sids, rule sids) of the rules with one item on each side
+        '''
+        items = sorted(self.item_sids)
+        for i in range(len(items)):
+            item_i = items[i]
+            sids_i = self.item_sids[item_i]
+            for item_j in items[i + 1:]:
+                sids_j = self.item_sids[item_j]
+                common = sids_i & sids_j
+                if len(common) < self.min_count:
+                    continue
+                yield (item_i,), (item_j,), sids_i, {sid for sid in common if
+                                                     window_match(self.occurrences[sid], (item_i,), (item_j,),
+                                                                  self.window)}
+                yield (item_j,), (item_i,), sids_j, {sid for sid in common if
+                                                     window_match(self.occurrences[sid], (item_j,), (item_i,),
+                                                                  self.window)}
+
+    def _grow(self, lhs: tuple, rhs: tuple, lhs_sids: set, rule_sids: set):
+        if len(rule_sids) < self.min_count:
+            return
+        self._save(lhs, rhs, lhs_sids, rule_sids)
+        self._expand(lhs, rhs, lhs_sids, rule_sids)
+
+    def _expand(self, lhs: tuple, rhs: tuple, lhs_sids: set, rule_sids: set):
+        if len(lhs) < self.max_antecedent:
+            self._expand_left(lhs, rhs, lhs_sids, rule_sids)
+        if len(rhs) < self.max_consequent:
+            self._expand_right(lhs, rhs, lhs_sids, rule_sids)
+
+    def _save(self, lhs: tuple, rhs: tuple, lhs_sids: set, rule_sids: set):
+        confidence = len(rule_sids) / len(lhs_sids)
+        if confidence >= self.min_confidence:
+            self.rules.append((lhs, rhs, rule_sids, confidence))
+            check_pattern_count(len(self.rules), self.max_patterns)
+
+    def _candidates(self, rule_sids: set, greater_than: int, excluded: tuple) -> list:
+        '''
+        :return: sorted frequent items larger than greater_than, not in excluded, and found in at least min_count of
+            the sequences of the rule
+        '''
+        counts = {}
+        for sid in rule_sids:
+            for item in self.occurrences[sid]:
+                if item > greater_than and item in self.item_sids and item not in excluded:
+                    counts[item] = counts.get(item, 0) + 1
+        return sorted(item for item, count in counts.items() if count >= self.min_count)
+
+    def _expand_left(self, lhs: tuple, rhs: tuple, lhs_sids: set, rule_sids: set):
+        for item in self._candidates(rule_sids, lhs[-1], rhs):
+            new_lhs = lhs + (item,)
+            sids = {sid for sid in rule_sids if item in self.occurrences[sid] and
+                    window_match(self.occurrences[sid], new_lhs, rhs, self.window)}
+            if len(sids) < self.min_count:
+                continue
+            new_lhs_sids = lhs_sids & self.item_sids[item]
+            self._save(new_lhs, rhs, new_lhs_sids, sids)
+            if len(new_lhs) < self.max_antecedent:
+                self._expand_left(new_lhs, rhs, new_lhs_sids, sids)
+
+    def _expand_right(self, lhs: tuple, rhs: tuple, lhs_sids: set, rule_sids: set):
+        for item in self._candidates(rule_sids, rhs[-1], lhs):
+            new_rhs = rhs + (item,)
+            sids = {sid for sid in rule_sids if item in self.occurrences[sid] and
+                    window_match(self.occurrences[sid], lhs, new_rhs, self.window)}
+            if len(sids) < self.min_count:
+                continue
+            self._save(lhs, new_rhs, lhs_sids, sids)
+            if len(lhs) < self.max_antecedent:
+                self._expand_left(lhs, new_rhs, lhs_sids, sids)
+            if len(new_rhs) < self.max_consequent:
+                self._expand_right(lhs, new_rhs, lhs_sids, sids)
+
+
+class TopKRuleGrowth(TRuleGrowth):
+
+    def __init__(self, records: Iterable, k: int, confidence: float, window: int, max_antecedent: int = None,
+                 max_consequent: int = 1):
+        '''
+        :param records: list of sequences. Each sequence is a list of items or a list of tuples of items
+        :param k: number of rules to mine
+        :param confidence: minimum confidence in percentage
+        :param window: window size
+        '''
+        TRuleGrowth.__init__(self, records, 0, confidence, window, max_antecedent, max_consequent)
+        self.k = k
+        self._top = []
+        self._order = itertools.count()
+
+    def mine(self) -> list:
+        '''
+        :return: list of the k rules with the highest support, as (antecedent, consequent, set of supporting sequence
+            indices, confidence), sorted by descending support and confidence. Ties with the k-th rule are broken by
+            confidence, then by discovery order
+        '''
+        self._top = []
+        seeds = []
+        for lhs, rhs, lhs_sids, rule_sids in self._pairs():
+            if len(rule_sids) >= self.min_count:
+                self._save(lhs, rhs, lhs_sids, rule_sids)
+                seeds.append((lhs, rhs, lhs_sids, rule_sids))
+
+        # expanding the rules of highest support first raises the threshold early and prunes the rest of the search
+        seeds.sort(key=lambda seed: len(seed[3]), reverse=True)
+        for lhs, rhs, lhs_sids, rule_sids in seeds:
+            if len(rule_sids) < self.min_count:
+                break
+            self._expand(lhs, rhs, lhs_sids, rule_sids)
+
+        self.rules = [rule for _, _, _, rule in sorted(self._top, reverse=True)]
+        return self.rules
+
+    def _save(self, lhs: tuple, rhs: tuple, lhs_sids: set, rule_sids: set):
+        confidence = len(rule_sids) / len(lhs_sids)
+        if confidence < self.min_confidence or len(rule_sids) < self.min_count:
+            return
+        # min-heap of the best k rules, the order counter makes earlier rules win ties
+        heapq.heappush(self._top, (len(rule_sids), confidence, -next(self._order), (lhs, rhs, rule_sids, confidence)))
+        if len(self._top) > self.k:
+            heapq.heappop(self._top)
+        if len(self._top) == self.k:
+            # rules with lower support than the k-th rule, and their expansions, can not make it to the top k
+            self.min_count = max(self.min_count, self._top[0][0])
+
+
+def _to_rule_table(mined: list, ids: Iterable, record_count: int) -> RuleTable:
+    ids = np.array(list(ids), dtype=object)
+    indptr = np.zeros(len(mined) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(lhs) for lhs, _, _, _ in mined])
+    return RuleTable(indptr, np.array([item for lhs, _, _, _ in mined for item in lhs], dtype=np.int32),
+                     np.array([rhs[0] for _, rhs, _, _ in mined], dtype=np.int32),
+                     np.array([len(sids) for _, _, sids, _ in mined], dtype=np.int64),
+                     np.array([conf for _, _, _, conf in mined], dtype=np.float64),
+                     seq_ids=[list(ids[sorted(sids)]) for _, _, sids, _ in mined], record_count=record_count)
+
+
+def mine_sequential_rules(records: Iterable, ids: Iterable, support: float, confidence: float, window: int,
+                          max_patterns: int = None) -> RuleTable:
+    '''
+    :param records: list of sequences. Each sequence is a list of items or a list of tuples of items
+    :param ids: sequence ids in the same order as records
+    :param support: minimum support in percentage, same as the SPMF argument without the % sign
+    :param confidence: minimum confidence in percentage, same as the SPMF argument without the % sign
+    :param window: window size
+    :param max_patterns: maximum number of rules, None for no limit
+    :return: RuleTable of rules with a single item consequent (same as spmf_manager.run), the Rule objects have seq_ids
+        and support_percentage set
+    :raises TooManyPatterns: if more than max_patterns rules are found
+    '''
+    records = list(records)
+    mined = TRuleGrowth(records, support, confidence, window, max_patterns=max_patterns).mine() \
+        if len(records) != 0 else []
+    return _to_rule_table(mined, ids, len(records))
+
+
+def mine_top_k_rules(records: Iterable, ids: Iterable, k: int, confidence: float, window: int) -> RuleTable:
+    '''
+    :param records: list of sequences. Each sequence is a list of items or a list of tuples of items
+    :param ids: sequence ids in the same order as records
+    :param k: number of rules to mine
+    :param confidence: minimum confidence in percentage
+    :param window: window size
+    :return: RuleTable of the (at most) k rules with a single item consequent and the highest support, sorted by
+        descending support and confidence
+    '''
+    records = list(records)
+    mined = TopKRuleGrowth(records, k, confidence, window).mine() if len(records) != 0 and k > 0 else []
+    return _to_rule_table(mined, ids, len(records))
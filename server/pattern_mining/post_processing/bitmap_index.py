@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable
+
+# number of set bits of every byte value, used for counting bits of bitmaps
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class BitmapIndex:
+    '''
+    Vertical index of a dataset of transactions/sequences: one bitmap per item over the rows of the dataframe, bit i of
+    an item bitmap is set if row i contains the item. Bitmaps are packed into 64-bit words, so finding the records
+    that contain an itemset is an AND of a few bitmaps and counting them is a popcount, instead of a scan of all the
+    records per pattern.
+
+    The index is built once per dataset over the full dataframe. Subsets of the dataframe (e.g. filtered sequences)
+    are handled by ANDing with a row mask built from their index labels.
+    '''
+
+    def __init__(self, df: pd.DataFrame, seq_col: str, id_col: str = None):
+        '''
+        :param df: dataframe of transactions/sequences
+        :param seq_col: transaction/sequence column, each record is a list of items or a list of tuples of items
+        :param id_col: transaction/sequence id column, required for seq_ids
+        '''
+        self.size = df.shape[0]
+        self.labels = df.index
+        self.ids = df[id_col].to_numpy() if id_col is not None else None
+        self._words = (self.size + 63) // 64
+
+        rows_per_item = {}
+        for row, record in enumerate(df[seq_col]):
+            for element in record:
+                if isinstance(element, (tuple, list, np.ndarray)):
+                    for item in element:
+                        rows_per_item.setdefault(int(item), []).append(row)
+                else:
+                    rows_per_item.setdefault(int(element), []).append(row)
+        self.bitmaps = {item: self._from_positions(rows) for item, rows in rows_per_item.items()}
+
+    def _from_positions(self, positions: Iterable) -> np.ndarray:
+        bits = np.zeros(self._words * 64, dtype=bool)
+        bits[np.asarray(positions, dtype=np.int64)] = True
+        return np.packbits(bits, bitorder='little').view(np.uint64)
+
+    def empty(self) -> np.ndarray:
+        return np.zeros(self._words, dtype=np.uint64)
+
+    def full(self) -> np.ndarray:
+        return self._from_positions(np.arange(self.size))
+
+    def mask(self, labels: Iterable = None) -> np.ndarray:
+        '''
+        :param labels: dataframe index labels of a subset of rows, None for all rows
+        :return: bitmap of the rows
+        '''
+        if labels is None:
+            return self.full()
+        positions = self.labels.get_indexer(labels)
+        return self._from_positions(positions[positions >= 0])
+
+    def bitmap(self, items: Iterable, all_items=True, rows: np.ndarray = None) -> np.ndarray:
+        '''
+        :param items: item codes
+        :param all_items: if True rows must contain all the items (AND) else at least one (OR)
+        :param rows: optional row mask to restrict the result to
+        :return: bitmap of the rows containing the items
+        '''
+        result = None
+        for item in items:
+            item_bitmap = self.bitmaps.get(int(item))
+            if item_bitmap is None:
+                if all_items:
+                    return self.empty()
+                continue
+            if result is None:
+                result = item_bitmap.copy()
+            elif all_items:
+                result &= item_bitmap
+            else:
+                result |= item_bitmap
+        if result is None:
+            result = self.empty() if not all_items else self.full()
+        if rows is not None:
+            result &= rows
+        return result
+
+    @staticmethod
+    def count(bitmap: np.ndarray) -> int:
+        return int(_POPCOUNT[bitmap.view(np.uint8)].sum(dtype=np.int64))
+
+    def positions(self, bitmap: np.ndarray) -> np.ndarray:
+        '''
+        :return: sorted row positions of the set bits
+        '''
+        return np.flatnonzero(np.unpackbits(bitmap.view(np.uint8), bitorder='little')[:self.size])
+
+    def subset_positions(self, bitmap: np.ndarray, labels: pd.Index) -> np.ndarray:
+        '''
+        :param bitmap: bitmap of rows of a subset of the dataframe
+        :param labels: index labels of the subset (unique, as taken from the dataframe)
+        :return: sorted row positions of the set bits in the subset, for DataFrame.take
+        '''
+        positions = self.positions(bitmap)
+        if labels is self.labels or labels.equals(self.labels):
+            return positions
+        return np.sort(labels.get_indexer(self.labels[positions]))
+
+    def seq_ids(self, bitmap: np.ndarray) -> list:
+        '''
+        :return: transaction/sequence ids of the rows in bitmap, in dataframe order
+        '''
+        return self.ids[self.positions(bitmap)].tolist()
@@ -0,0 +1,100 @@
+import hashlib
+import math
+import threading
+import networkx as nx
+from collections import OrderedDict
+from pattern_mining.post_processing.result_cache import result_cache, make_key
+
+'''
+Betweenness centrality of the overview graphs.
+
+Exact betweenness (Brandes) runs a shortest path search from every node, O(VE). The approximate method runs it from
+k sampled pivots only and extrapolates, O(kE). Error bounds for every node (e.g. Hoeffding's inequality with a union
+bound, k = ln(2n / delta) / (2 * epsilon^2)) need more pivots than the overview graphs have nodes for any useful
+epsilon (about 2,000 pivots for epsilon = 0.05), so the pivot count is given instead: by default min_pivots, or a
+pivot_fraction of the nodes for larger graphs. Graphs with no more nodes than pivots are computed exactly.
+
+Results are memoized by a fingerprint of the graph structure (in this process, and in the persistent result cache), so
+the same DAG or itemset graph is not recomputed for another request or filter that produces it.
+
+based on:
+Brandes, U., Pich, C. (2007). Centrality Estimation in Large Networks. International Journal of Bifurcation and Chaos,
+17(07)
+'''
+
+METHODS = ('exact', 'approximate', 'none')
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+_memo_size = 64
+
+# graphs up to min_pivots nodes are computed exactly, larger graphs use pivot_fraction of their nodes as pivots
+min_pivots = 100
+pivot_fraction = 0.1
+
+
+def graph_fingerprint(graph: nx.Graph) -> str:
+    '''
+    :return: hash of the nodes and edges of the graph, independent of their insertion order
+    '''
+    nodes = sorted(str(node) for node in graph.nodes)
+    edges = sorted((str(u), str(v)) if graph.is_directed() else tuple(sorted((str(u), str(v))))
+                   for u, v in graph.edges)
+    return hashlib.sha256(repr((graph.is_directed(), nodes, edges)).encode()).hexdigest()
+
+
+def get_pivot_count(node_count: int, pivots: int = None) -> int:
+    '''
+    :param node_count: number of nodes in graph
+    :param pivots: requested number of pivots, by default the larger of min_pivots and pivot_fraction of the nodes
+    :return: number of pivots, equal to node_count if the centrality must be computed exactly
+    '''
+    if node_count == 0:
+        return 0
+    if pivots is None:
+        pivots = max(min_pivots, int(math.ceil(pivot_fraction * node_count)))
+    return min(node_count, max(1, pivots))
+
+
+def betweenness_centrality(graph: nx.Graph, method='approximate', pivots: int = None) -> dict:
+    '''
+    :param graph: networkx graph
+    :param method: 'exact', 'approximate' (k-pivot sampling, exact for small graphs) or 'none' (all zeros)
+    :param pivots: number of pivots of the approximate method, see get_pivot_count
+    :return: dictionary with key=node, value=normalized betweenness centrality
+    '''
+    if method not in METHODS:
+        raise ValueError("unknown centrality method: " + str(method))
+    if method == 'none':
+        return {node: 0.0 for node in graph.nodes}
+
+    node_count = graph.number_of_nodes()
+    if method == 'approximate':
+        pivots = get_pivot_count(node_count, pivots)
+    else:
+        pivots = node_count
+    key = make_key('centrality', graph_fingerprint(graph), pivots)
+
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _to_nodes(graph, _memo[key])
+    found, by_name = result_cache.get(key)
+    if not found:
+        if pivots < graph.number_of_nodes():
+            # fixed seed, so the same graph always gets the same centrality
+            centrality = nx.betweenness_centrality(graph, k=pivots, seed=0)
+        else:
+            centrality = nx.betweenness_centrality(graph)
+        by_name = {str(node): value for node, value in centrality.items()}
+        result_cache.set(key, by_name)
+    with _memo_lock:
+        _memo[key] = by_name
+        while len(_memo) > _memo_size:
+            _memo.popitem(last=False)
+    return _to_nodes(graph, by_name)
+
+
+def _to_nodes(graph: nx.Graph, by_name: dict) -> dict:
+    # the fingerprint compares nodes by name, results are returned with the node objects of the given graph
+    return {node: by_name[str(node)] for node in graph.nodes}
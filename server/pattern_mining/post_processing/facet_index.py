@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable
+from pattern_mining.post_processing.bitmap_index import BitmapIndex
+
+
+class FacetIndex:
+    '''
+    Index of the record attributes used by the filters (e.g. stand, airline and weather of the airport turnarounds),
+    so any combination of filter options is resolved without scanning the tables.
+
+    Records are numbered by their sorted ids and sets of records are bitmaps over these numbers, packed into 64-bit
+    words as in BitmapIndex. A categorical facet keeps one bitmap per value, a selection of values is the OR of their
+    bitmaps and a filter on several facets the AND of the selections. A range facet keeps the values sorted with their
+    record numbers, so the records in a range are a slice found by binary search.
+    The facets may come from different tables of the same records, joined by the record id.
+    '''
+
+    def __init__(self, ids: Iterable):
+        '''
+        :param ids: ids of all the records
+        '''
+        self.ids = np.unique(np.asarray(list(ids)))
+        self.size = len(self.ids)
+        self._words = (self.size + 63) // 64
+        self.categories = {}
+        self.ranges = {}
+
+    def _positions(self, ids: pd.Series) -> np.ndarray:
+        positions = np.searchsorted(self.ids, ids.to_numpy())
+        if len(positions) and (positions.max() >= self.size or (self.ids[positions] != ids.to_numpy()).any()):
+            raise ValueError("facet has ids that are not in the index")
+        return positions
+
+    def _from_positions(self, positions: np.ndarray) -> np.ndarray:
+        bits = np.zeros(self._words * 64, dtype=bool)
+        bits[positions] = True
+        return np.packbits(bits, bitorder='little').view(np.uint64)
+
+    def empty(self) -> np.ndarray:
+        return np.zeros(self._words, dtype=np.uint64)
+
+    def full(self) -> np.ndarray:
+        return self._from_positions(np.arange(self.size))
+
+    def add_categorical(self, name: str, ids: pd.Series, values: pd.Series):
+        '''
+        :param name: facet name
+        :param ids: record ids
+        :param values: value of each record (rows with missing values are not indexed)
+        '''
+        rows_per_value = {}
+        for position, value in zip(self._positions(ids).tolist(), values.tolist()):
+            if not pd.isna(value):
+                rows_per_value.setdefault(value, []).append(position)
+        self.categories[name] = {value: self._from_positions(np.asarray(rows, dtype=np.int64))
+                                 for value, rows in rows_per_value.items()}
+
+    def add_range(self, name: str, ids: pd.Series, values: pd.Series):
+        '''
+        :param name: facet name
+        :param ids: record ids
+        :param values: numeric value of each record (rows with missing values are not indexed)
+        '''
+        positions = self._positions(ids)
+        values = values.to_numpy(dtype=float)
+        present = ~np.isnan(values)
+        order = np.argsort(values[present], kind='stable')
+        self.ranges[name] = (values[present][order], positions[present][order])
+
+    def select(self, name: str, values: Iterable) -> np.ndarray:
+        '''
+        :param name: categorical facet name
+        :param values: selected values
+        :return: bitmap of the records with any of the values
+        '''
+        result = self.empty()
+        bitmaps = self.categories[name]
+        for value in values:
+            if value in bitmaps:
+                result |= bitmaps[value]
+        return result
+
+    def between(self, name: str, low: float, high: float) -> np.ndarray:
+        '''
+        :param name: range facet name
+        :return: bitmap of the records with low <= value <= high
+        '''
+        values, positions = self.ranges[name]
+        start = np.searchsorted(values, low, side='left')
+        end = np.searchsorted(values, high, side='right')
+        return self._from_positions(positions[start:end])
+
+    def counts(self, name: str, rows: np.ndarray = None) -> dict:
+        '''
+        :param name: categorical facet name
+        :param rows: optional bitmap of the records to count
+        :return: dictionary with key=value, value=number of records with the value
+        '''
+        return {value: BitmapIndex.count(bitmap if rows is None else bitmap & rows)
+                for value, bitmap in self.categories[name].items()}
+
+    def facet_counts(self, selections: dict, rows: np.ndarray = None) -> dict:
+        '''
+        counts of the values of every categorical facet in selections, among the records matching the selections of
+        the other facets (the counts shown next to the filter options)
+
+        :param selections: dictionary with key=categorical facet name, value=selected values
+        :param rows: optional bitmap of the records matching other (e.g. range) filters
+        :return: dictionary with key=facet name, value=dictionary of value counts
+        '''
+        selected = {name: self.select(name, values) for name, values in selections.items()}
+        result = {}
+        for name in selections:
+            others = self.full() if rows is None else rows.copy()
+            for other, bitmap in selected.items():
+                if other != name:
+                    others &= bitmap
+            result[name] = self.counts(name, others)
+        return result
+
+    def record_ids(self, bitmap: np.ndarray) -> set:
+        '''
+        :return: set of the ids of the records in bitmap
+        '''
+        positions = np.flatnonzero(np.unpackbits(bitmap.view(np.uint8), bitorder='little')[:self.size])
+        return set(self.ids[positions].tolist())
@@ -0,0 +1,92 @@
+import networkx as nx
+from typing import Hashable, Iterable, Tuple
+
+
+class IncrementalDAG:
+    '''
+    Directed acyclic graph that keeps a topological order of its nodes while edges are added, so an edge closing a
+    cycle is found by searching only the nodes between its two endpoints in the order, instead of copying the graph
+    and checking all of it.
+    Nodes and edges are added to the underlying nx.DiGraph in the same order as nx.DiGraph.add_edges_from would, so the
+    graph is the same as one built directly with networkx.
+
+    based on:
+    Pearce, D. J., Kelly, P. H. J. (2007). A Dynamic Topological Sort Algorithm for Directed Acyclic Graphs. ACM Journal
+    of Experimental Algorithmics, 11
+    '''
+
+    def __init__(self):
+        self.graph = nx.DiGraph()
+        self._order = {}
+        # new nodes are placed before (sources) or after (targets) all other nodes, so they need no reordering
+        self._first = 0
+        self._last = 0
+
+    def add_edges(self, edges: Iterable[Tuple[Hashable, Hashable]]) -> bool:
+        '''
+        adds all the edges, or none of them if they would create a cycle
+
+        :param edges: list of (source, target) tuples
+        :return: True if the edges were added
+        '''
+        new_nodes = []
+        new_edges = []
+        for source, target in edges:
+            for node in (source, target):
+                if node not in self._order and node not in new_nodes:
+                    new_nodes.append(node)
+            if self.graph.has_edge(source, target):
+                continue
+            if not self._add_edge(source, target):
+                self.graph.remove_edges_from(new_edges)
+                self.graph.remove_nodes_from([node for node in new_nodes if node in self.graph])
+                for node in new_nodes:
+                    self._order.pop(node, None)
+                return False
+            new_edges.append((source, target))
+        return True
+
+    def _add_edge(self, source: Hashable, target: Hashable) -> bool:
+        if source == target:
+            return False
+        if source not in self._order:
+            self._first -= 1
+            self._order[source] = self._first
+        if target not in self._order:
+            self._last += 1
+            self._order[target] = self._last
+
+        lower, upper = self._order[target], self._order[source]
+        if lower < upper:
+            # nodes reachable from target that are not after source in the order
+            forward = self._search(target, self.graph.successors, lambda order: order <= upper)
+            if source in forward:
+                return False
+            # nodes reaching source that are not before target in the order
+            backward = self._search(source, self.graph.predecessors, lambda order: order >= lower)
+            self._reorder(backward, forward)
+        self.graph.add_edge(source, target)
+        return True
+
+    def _search(self, start: Hashable, neighbors, in_range) -> set:
+        visited = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            if node not in self.graph:
+                continue
+            for neighbor in neighbors(node):
+                if neighbor not in visited and in_range(self._order[neighbor]):
+                    visited.add(neighbor)
+                    stack.append(neighbor)
+        return visited
+
+    def _reorder(self, backward: set, forward: set):
+        '''
+        moves the nodes reaching the new edge source before the nodes reachable from the edge target, reusing their
+        positions in the order
+        '''
+        nodes = sorted(backward, key=self._order.get) + sorted(forward, key=self._order.get)
+        positions = sorted(self._order[node] for node in nodes)
+        for node, position in zip(nodes, positions):
+            self._order[node] = position
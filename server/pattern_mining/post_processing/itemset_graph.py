@@ -1,12 +1,19 @@
+import os
 import networkx as nx
+from bisect import bisect_right
 from typing import List
 from pattern_mining.post_processing.pattern_classes import FrequentItemSet
 from pattern_mining.pre_processing.dictionary import AirportMapping, FlaredownMapping
+from pattern_mining.post_processing.centrality import betweenness_centrality
 import plotly.graph_objects as go
 import pandas as pd
 from networkx.drawing.nx_agraph import graphviz_layout
 from plotly.subplots import make_subplots
 
+# edges kept per node of the itemset network drawn by the dashboards. Itemsets mined at low support share items with
+# most other itemsets, so the network is close to complete and unreadable without a cap
+network_max_edges = int(os.environ.get('ITEMSET_NETWORK_MAX_EDGES', 10))
+
 
 class ItemsetGraph:
     '''
@@ -19,8 +26,13 @@ class ItemsetGraph:
             - network was discarded for the final visual design due to low visual scalability
     '''
 
-    def __init__(self, data='airport'):
+    def __init__(self, data='airport', max_edges_per_node: int = None):
+        '''
+        :param data: dataset identifier - 'airport' or 'flaredown'
+        :param max_edges_per_node: if set, the network keeps at most this many edges per node, highest weights first
+        '''
         self.data = data
+        self.max_edges_per_node = max_edges_per_node
         self.mapping = AirportMapping() if self.data == 'airport' else FlaredownMapping()
 
     def get_full_graph_info(self, fis_list: List[FrequentItemSet]) -> dict:
@@ -30,7 +42,7 @@ class ItemsetGraph:
         '''
         graph = self._create_graph(fis_list)
         frequencies = [f.support_percentage for f in fis_list]
-        centrality = nx.betweenness_centrality(graph)
+        centrality = betweenness_centrality(graph)
         min_c = min(centrality.values())
         max_c = max(centrality.values())
         nodes = [{'code': fis.id, 'items': [self.mapping.code_to_event[str(item)]['event'] for item in fis.items],
@@ -48,34 +60,35 @@ class ItemsetGraph:
             itemset rows have level==1 and groups have level==0. columns include all the unique items found in patterns
             non-empty cells in rows indicate existence of that item in the pattern
         '''
-        size = len(fis_list)
-        rows = []
-        similar_groups = []
-
-        for i in range(size):
-            fis_i = fis_list[i]
-            belongs_to_sets = []
-            set_i = set(fis_i.items)
-            for j in range(len(similar_groups)):
-                for pattern in similar_groups[j]:
-                    if len(set(pattern.items).intersection(set_i)) != 0:
-                        belongs_to_sets.append(j)
-                        break
-
-            if len(belongs_to_sets) == 0:
-                similar_groups.append({fis_i})
-
-            elif len(belongs_to_sets) == 1:
-                similar_groups[belongs_to_sets[0]].add(fis_i)
-
+        items_sets = _DisjointSet()
+        group_order = {}  # group root -> index of the pattern that created or last merged the group
+        for i, fis in enumerate(fis_list):
+            items = list(fis.items)
+            if len(items) == 0:
+                # an empty itemset intersects nothing, it is a group of its own
+                group_order[('pattern', i)] = i
+                continue
+            roots = {items_sets.find(item) for item in items if item in items_sets}
+            for item in items[1:]:
+                items_sets.union(items[0], item)
+            for root in roots:
+                items_sets.union(items[0], root)
+            root = items_sets.find(items[0])
+            if len(roots) == 1:
+                group_order[root] = group_order.pop(roots.pop())
             else:
-                groups_to_merge = [similar_groups[j] for j in belongs_to_sets]
-                group = {fis_i}
-                for sm in groups_to_merge:
-                    similar_groups.remove(sm)
-                    group.update(sm)
-                similar_groups.append(group)
+                # new groups and merged groups go to the end, same as the previous list based grouping
+                for old_root in roots:
+                    group_order.pop(old_root)
+                group_order[root] = i
+
+        group_index = {root: g for g, root in enumerate(sorted(group_order, key=group_order.get))}
+        similar_groups = [[] for _ in group_index]
+        for i, fis in enumerate(fis_list):
+            root = items_sets.find(fis.items[0]) if len(fis.items) != 0 else ('pattern', i)
+            similar_groups[group_index[root]].append(fis)
 
+        rows = []
         for i in range(len(similar_groups)):
             group = similar_groups[i]
             for pattern in group:
@@ -101,21 +114,47 @@ class ItemsetGraph:
         :return: network graph, nodes= FrequentItemSet object ids, edges = non-empty intersection of itemsets
         '''
         graph = nx.Graph()
-
         graph.add_nodes_from([fis.id for fis in fis_list])
-        size = len(fis_list)
-        for i in range(size - 1):
-            set_i = set(fis_list[i].items)
-            for j in range(i + 1, size):
-                intersect = set_i.intersection(set(fis_list[j].items))
-                intersect_len = len(intersect)
-                if intersect_len == 0:
-                    continue
-                # weight was added to use in network scatter plot for showing similar patterns closer
-                graph.add_edge(fis_list[i].id, fis_list[j].id, weight=intersect_len)
 
+        # posting list of each item: positions of the itemsets containing it, in ascending order
+        postings = {}
+        for i, fis in enumerate(fis_list):
+            for item in set(fis.items):
+                postings.setdefault(item, []).append(i)
+
+        # only pairs sharing an item are visited, the weight (size of intersection) is the number of shared postings
+        edges = []
+        for i, fis in enumerate(fis_list):
+            weights = {}
+            for item in set(fis.items):
+                posting = postings[item]
+                for j in posting[bisect_right(posting, i):]:
+                    weights[j] = weights.get(j, 0) + 1
+            edges.extend((i, j, weight) for j, weight in sorted(weights.items()))
+
+        if self.max_edges_per_node is not None:
+            edges = self._prune_edges(edges, len(fis_list))
+
+        # weight was added to use in network scatter plot for showing similar patterns closer
+        graph.add_weighted_edges_from([(fis_list[i].id, fis_list[j].id, weight) for i, j, weight in edges])
         return graph
 
+    def _prune_edges(self, edges: List[tuple], size: int) -> List[tuple]:
+        '''
+        :param edges: list of (i, j, weight) sorted by i and j
+        :param size: number of nodes
+        :return: edges kept by adding them in descending weight while both nodes have less than max_edges_per_node
+            edges, in the same order as the input
+        '''
+        degree = [0] * size
+        kept = []
+        for i, j, weight in sorted(edges, key=lambda edge: -edge[2]):
+            if degree[i] < self.max_edges_per_node and degree[j] < self.max_edges_per_node:
+                degree[i] += 1
+                degree[j] += 1
+                kept.append((i, j, weight))
+        return sorted(kept)
+
     def generate_plotly_figure(self, fis_list: List[FrequentItemSet]) -> go:
         '''
         :param fis_list: list of FrequentItemSet objects
@@ -201,3 +240,35 @@ class ItemsetGraph:
             yaxis=dict(showgrid=False, zeroline=False, showticklabels=False), template='none',
             margin=dict(l=0, r=0, b=0, t=0, pad=0))
         return fig
+
+
+class _DisjointSet:
+    '''
+    union-find of item codes with path halving and union by size
+    '''
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def __contains__(self, item):
+        return item in self.parent
+
+    def find(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+            return item
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
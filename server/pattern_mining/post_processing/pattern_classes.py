@@ -1,4 +1,5 @@
 import numpy as np
+from abc import ABC, abstractmethod
 
 class Rule:
     def __init__(self, LHS: np.ndarray, RHS: int, support: int, confidence: float):
@@ -48,3 +49,167 @@ class FrequentItemSet:
         # initially the id was generated with uuid, but changed it to the following to reduce data size passed to
         # front-end
         return ''.join([str(item) for item in self.items]) + str(self.support)
+
+
+class _PatternTable(ABC):
+    '''
+    read-only sequence of patterns stored column-wise. Pattern objects are only created when a row is accessed and
+    are cached, so changes to them (e.g. seq_ids) persist.
+    Items of each row are CSR-encoded: items of row i are items[indptr[i]:indptr[i + 1]]
+    '''
+
+    def __init__(self, indptr: np.ndarray, items: np.ndarray, support: np.ndarray, seq_ids: list = None,
+                 record_count: int = None):
+        '''
+        :param seq_ids: optional list of sequence/transaction ids per row, set on the created objects
+        :param record_count: optional number of mined records, used for setting support_percentage of created objects
+        '''
+        self.indptr = indptr
+        self.items = items
+        self.support = support
+        self.seq_ids = seq_ids
+        self.record_count = record_count
+        self._objects = {}
+
+    def __len__(self):
+        return self.support.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index not in self._objects:
+            pattern = self._create(index)
+            if self.seq_ids is not None:
+                pattern.seq_ids = self.seq_ids[index]
+            if self.record_count:
+                pattern.support_percentage = round(float(pattern.support / self.record_count), 2)
+            self._objects[index] = pattern
+        return self._objects[index]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def row_items(self, index: int) -> np.ndarray:
+        return self.items[self.indptr[index]:self.indptr[index + 1]]
+
+    def take(self, rows: np.ndarray):
+        '''
+        :param rows: row positions
+        :return: new table of the same type with the given rows, already created objects are shared
+        '''
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        indptr = np.concatenate(([0], np.cumsum(lengths))).astype(self.indptr.dtype)
+        item_positions = np.repeat(starts - indptr[:-1], lengths) + np.arange(indptr[-1])
+        table = self._take(rows, indptr, self.items[item_positions])
+        table.seq_ids = None if self.seq_ids is None else [self.seq_ids[row] for row in rows]
+        table.record_count = self.record_count
+        table._objects = {new: self._objects[old] for new, old in enumerate(rows.tolist()) if old in self._objects}
+        return table
+
+    @abstractmethod
+    def _take(self, rows: np.ndarray, indptr: np.ndarray, items: np.ndarray):
+        '''
+        :return: new table of the same type with the given rows of the columns other than items
+        '''
+
+    @abstractmethod
+    def _create(self, index: int):
+        '''
+        :return: pattern object of the row
+        '''
+
+
+class RuleTable(_PatternTable):
+    '''
+    sequential rules with CSR-encoded LHS items, and RHS, support and confidence columns
+    confidence is kept exact, Rule objects get the value rounded to two decimals
+    '''
+
+    def __init__(self, lhs_indptr: np.ndarray, lhs_items: np.ndarray, rhs: np.ndarray, support: np.ndarray,
+                 confidence: np.ndarray, seq_ids: list = None, record_count: int = None):
+        _PatternTable.__init__(self, lhs_indptr, lhs_items, support, seq_ids, record_count)
+        self.rhs = rhs
+        self.confidence = confidence
+
+    def _take(self, rows: np.ndarray, indptr: np.ndarray, items: np.ndarray):
+        return RuleTable(indptr, items, self.rhs[rows], self.support[rows], self.confidence[rows])
+
+    def _create(self, index: int) -> Rule:
+        return Rule(self.row_items(index), int(self.rhs[index]), int(self.support[index]),
+                    round(float(self.confidence[index]), 2))
+
+
+class ItemsetTable(_PatternTable):
+    '''
+    frequent itemsets with CSR-encoded items and support column
+    '''
+
+    def _take(self, rows: np.ndarray, indptr: np.ndarray, items: np.ndarray):
+        return ItemsetTable(indptr, items, self.support[rows])
+
+    def _create(self, index: int) -> FrequentItemSet:
+        return FrequentItemSet(self.row_items(index), int(self.support[index]))
+
+
+class PatternCollection:
+    '''
+    immutable sequence of Rule/FrequentItemSet objects with a hash index by pattern id, passed between the
+    post-processing functions instead of lists/tuples so that looking up selected patterns does not scan all of them.
+    Collections are hashable (by their patterns) to be used as lru_cache arguments.
+    '''
+
+    def __init__(self, patterns=()):
+        '''
+        :param patterns: Rule/FrequentItemSet objects
+        '''
+        self._patterns = tuple(patterns)
+        self._by_id = {}
+        for pattern in self._patterns:
+            # the first pattern is kept if ids are repeated, same as the previous linear search
+            self._by_id.setdefault(str(pattern.id), pattern)
+        self._hash = None
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def __iter__(self):
+        return iter(self._patterns)
+
+    def __getitem__(self, index):
+        return self._patterns[index]
+
+    def __contains__(self, pattern_id):
+        return str(pattern_id) in self._by_id
+
+    def __eq__(self, other):
+        return isinstance(other, PatternCollection) and self._patterns == other._patterns
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self._patterns)
+        return self._hash
+
+    def __getstate__(self):
+        # the hash depends on the pattern objects
+        state = self.__dict__.copy()
+        state['_hash'] = None
+        return state
+
+    def get(self, pattern_id):
+        '''
+        :return: pattern with the id, None if there is no such pattern
+        '''
+        return self._by_id.get(str(pattern_id))
+
+    def by_ids(self, pattern_ids) -> list:
+        '''
+        :return: patterns with the given ids in the same order, None for unknown ids
+        '''
+        return [self.get(pattern_id) for pattern_id in pattern_ids]
@@ -0,0 +1,88 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Iterable, Tuple
+from pattern_mining.post_processing.pattern_classes import PatternCollection
+
+'''
+Server-side pattern sets referred to by result handles.
+
+/rules and /fis return a handle of the mined pattern set, and /distribution_data looks up the selected patterns by
+handle and pattern id instead of running the mining pipeline again to find them. Patterns are stored one row per
+pattern in an SQLite database shared by all server processes, so a selection only loads the selected patterns and
+works on any gunicorn worker. Pattern sets expire after a TTL.
+'''
+
+
+class PatternSetExpired(KeyError):
+    pass
+
+
+class PatternStore:
+
+    def __init__(self, directory: str, ttl: int):
+        '''
+        :param directory: directory of the SQLite database
+        :param ttl: seconds a pattern set is kept after it was last stored
+        '''
+        self.path = os.path.join(directory, 'patterns.sqlite')
+        self.ttl = ttl
+        self._local = threading.local()
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS pattern_sets (handle TEXT PRIMARY KEY, data TEXT, "
+                               "rule INTEGER, created REAL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS patterns (handle TEXT, id TEXT, pattern BLOB, "
+                               "PRIMARY KEY (handle, id))")
+
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection.execute("PRAGMA journal_mode=WAL")
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def put(self, handle: str, patterns: Iterable, data: str, rule: bool):
+        '''
+        stores a pattern set under handle, if the handle is already stored only its expiry is renewed
+
+        :param patterns: Rule/FrequentItemSet objects, the first pattern is kept if ids are repeated
+            (same as PatternCollection.get)
+        '''
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("DELETE FROM patterns WHERE handle IN "
+                               "(SELECT handle FROM pattern_sets WHERE created < ?)", (now - self.ttl,))
+            connection.execute("DELETE FROM pattern_sets WHERE created < ?", (now - self.ttl,))
+            if connection.execute("UPDATE pattern_sets SET created = ? WHERE handle = ?", (now, handle)).rowcount:
+                return
+            connection.executemany("INSERT OR IGNORE INTO patterns VALUES (?, ?, ?)",
+                                   ((handle, str(pattern.id), sqlite3.Binary(pickle.dumps(pattern)))
+                                    for pattern in patterns))
+            connection.execute("INSERT INTO pattern_sets VALUES (?, ?, ?, ?)", (handle, data, int(rule), now))
+
+    def get(self, handle: str, pattern_ids: Iterable) -> Tuple[str, bool, PatternCollection]:
+        '''
+        :param handle: handle of a stored pattern set
+        :param pattern_ids: ids of the patterns to return
+        :return: tuple of dataset identifier, if the patterns are sequential rules, and collection of the patterns in
+            the order of pattern_ids (unknown ids are skipped)
+        '''
+        connection = self._connection()
+        row = connection.execute("SELECT data, rule, created FROM pattern_sets WHERE handle = ?",
+                                 (handle,)).fetchone()
+        if row is None or time.time() - row[2] > self.ttl:
+            raise PatternSetExpired(handle)
+        patterns = []
+        for pattern_id in pattern_ids:
+            found = connection.execute("SELECT pattern FROM patterns WHERE handle = ? AND id = ?",
+                                       (handle, str(pattern_id))).fetchone()
+            if found is not None:
+                patterns.append(pickle.loads(found[0]))
+        return row[0], bool(row[1]), PatternCollection(patterns)
+
+
+pattern_store = PatternStore(os.environ.get('RESULT_CACHE_DIR', 'pattern_mining/data/cache'),
+                             ttl=int(os.environ.get('RESULT_CACHE_TTL', 24 * 60 * 60)))
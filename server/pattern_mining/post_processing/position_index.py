@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from typing import Iterable, List
+
+
+class PositionIndex:
+    '''
+    First occurrence position of every item in every sequence, stored as a (sequence x item code) matrix with a
+    sentinel for items that do not occur in a sequence. Checking whether a sequential rule holds in a sequence (all LHS
+    items occur before the first occurrence of the RHS) becomes an array comparison over all sequences at once, and
+    rules with the same LHS length are checked together in batches.
+
+    The index is built once per dataset over the full dataframe; subsets are handled with row positions.
+    '''
+
+    def __init__(self, df: pd.DataFrame, seq_col: str, id_col: str):
+        '''
+        :param df: dataframe of sequences
+        :param seq_col: sequence column, each record is a list of items or a list of tuples of simultaneous items
+        :param id_col: sequence id column
+        '''
+        self.labels = df.index
+        self.ids = df[id_col].to_numpy()
+
+        records = []
+        max_item = 0
+        max_length = 0
+        for record in df[seq_col]:
+            items = []
+            positions = []
+            for position, element in enumerate(record):
+                element = element if isinstance(element, (tuple, list, np.ndarray)) else (element,)
+                items.extend(int(item) for item in element)
+                positions.extend([position] * len(element))
+            items = np.array(items, dtype=np.int64)
+            if items.shape[0]:
+                max_item = max(max_item, int(items.max()))
+                max_length = max(max_length, positions[-1] + 1)
+            records.append((items, np.array(positions, dtype=np.int64)))
+
+        dtype = np.int16 if max_length < np.iinfo(np.int16).max else np.int32
+        self.absent = np.iinfo(dtype).max
+        # the last column is never filled and is used for item codes that do not occur in the dataset
+        self.first = np.full((len(records), max_item + 2), self.absent, dtype=dtype)
+        for row, (items, positions) in enumerate(records):
+            # np.unique returns the index of the first occurrence of each item
+            unique_items, first_index = np.unique(items, return_index=True)
+            self.first[row, unique_items] = positions[first_index]
+
+    def rows(self, labels: Iterable = None) -> np.ndarray:
+        '''
+        :param labels: dataframe index labels of a subset of sequences, None for all sequences
+        :return: row positions of the sequences in the index
+        '''
+        if labels is None:
+            return np.arange(self.first.shape[0])
+        positions = self.labels.get_indexer(labels)
+        return positions[positions >= 0]
+
+    def _columns(self, codes) -> np.ndarray:
+        codes = np.asarray(codes, dtype=np.int64)
+        unknown = self.first.shape[1] - 1
+        return np.where((codes >= 0) & (codes < unknown), codes, unknown)
+
+    def match_rules(self, lhs_list: List[np.ndarray], rhs_list: List[int], rows: np.ndarray = None,
+                    batch_cells=8_000_000) -> List[np.ndarray]:
+        '''
+        :param lhs_list: LHS item codes per rule
+        :param rhs_list: RHS item code per rule
+        :param rows: row positions of the sequences to match against, all sequences if None
+        :param batch_cells: upper bound on the size of the intermediate (sequence x rule x item) array per batch
+        :return: row positions of the sequences matching each rule
+        '''
+        first = self.first if rows is None else self.first[rows]
+        row_positions = np.arange(self.first.shape[0]) if rows is None else rows
+        result = [None] * len(rhs_list)
+
+        by_length = {}
+        for i, lhs in enumerate(lhs_list):
+            by_length.setdefault(len(lhs), []).append(i)
+
+        for length, rule_indices in by_length.items():
+            batch_size = max(1, batch_cells // max(1, first.shape[0] * max(length, 1)))
+            for start in range(0, len(rule_indices), batch_size):
+                batch = rule_indices[start:start + batch_size]
+                rhs_first = first[:, self._columns([rhs_list[i] for i in batch])]  # sequence x rule
+                matches = rhs_first != self.absent
+                if length > 0:
+                    lhs_columns = self._columns(np.array([lhs_list[i] for i in batch]).reshape(len(batch), length))
+                    lhs_first = first[:, lhs_columns]  # sequence x rule x item
+                    # an absent LHS item has the largest value, so it is never before a present RHS
+                    matches &= (lhs_first < rhs_first[:, :, None]).all(axis=2)
+                for column, i in enumerate(batch):
+                    result[i] = row_positions[matches[:, column]]
+        return result
+
+    def seq_ids_per_rule(self, rules: Iterable, rows: np.ndarray = None) -> List[list]:
+        '''
+        :param rules: Rule objects
+        :param rows: row positions of the sequences to match against, all sequences if None
+        :return: ids of the sequences matching each rule, in dataframe order
+        '''
+        rules = list(rules)
+        matched = self.match_rules([rule.LHS for rule in rules], [rule.RHS for rule in rules], rows)
+        return [self.ids[positions].tolist() for positions in matched]
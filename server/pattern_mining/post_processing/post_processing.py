@@ -1,49 +1,62 @@
-from typing import List
-from pattern_mining.post_processing.pattern_classes import Rule, FrequentItemSet
-from pattern_mining.post_processing.itemset_graph import ItemsetGraph
+from typing import List, Tuple
+from pattern_mining.post_processing.pattern_classes import Rule, FrequentItemSet, RuleTable, ItemsetTable
+from pattern_mining.post_processing.itemset_graph import ItemsetGraph, network_max_edges
+from pattern_mining.post_processing.bitmap_index import BitmapIndex
+from pattern_mining.post_processing.position_index import PositionIndex
 import pandas as pd
 import numpy as np
 
 
-def parse_rules(rules_file: str) -> List[Rule]:
-    '''
-    :param rules_file: file path of the SPMF output
-    :return: list of Rule objects
-    '''
-    f = open(rules_file, "r")
-    rules = []
-    while True:
-        line = f.readline()
-        if not line:
-            break
-        rule = line.split('==>')
-        lhs = rule[0].split(',')
-        lhs = np.array([int(item) for item in lhs])
-        rule = rule[1].split()
-        rhs = int(rule[0])
-        sup = int(rule[2])
-        conf = round(float(rule[4]), 2)
-        rules.append(Rule(lhs, rhs, sup, conf))
-    return rules
+def _read_numbers(output_file: str, replacements: list) -> np.ndarray:
+    '''
+    reads an SPMF output file in one pass and returns all the numbers in it as a flat array
+    :param replacements: list of (token, replacement) applied to the file content before conversion
+    '''
+    with open(output_file, "rb") as f:
+        content = f.read()
+    for token, replacement in replacements:
+        content = content.replace(token, replacement)
+    return np.fromstring(content, dtype=np.float64, sep=' ')
+
+
+def _split_rows(numbers: np.ndarray, separators: np.ndarray, tail: int) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    :param numbers: flat numbers of the file, each row is: items, separator, tail values
+    :param separators: positions of separators in numbers
+    :param tail: number of values after the separator in each row
+    :return: CSR index pointer and items of the rows
+    '''
+    row_starts = np.concatenate(([0], separators + tail + 1))[:-1]
+    lengths = separators - row_starts
+    indptr = np.concatenate(([0], np.cumsum(lengths)))
+    is_item = np.ones(numbers.shape[0], dtype=bool)
+    for offset in range(tail + 1):
+        is_item[separators + offset] = False
+    return indptr, numbers[is_item].astype(np.int32)
+
+
+def parse_rules(rules_file: str) -> RuleTable:
+    '''
+    :param rules_file: file path of the SPMF output, one rule per line in form of "1,2 ==> 3 #SUP: 10 #CONF: 0.5"
+    :return: RuleTable, Rule objects are created when accessed
+    '''
+    # "==>" becomes a -1 separator (item codes are positive), rows are: LHS items, -1, RHS, support, confidence
+    numbers = _read_numbers(rules_file, [(b'==>', b' -1 '), (b'#SUP:', b' '), (b'#CONF:', b' '), (b',', b' ')])
+    separators = np.flatnonzero(numbers == -1)
+    indptr, lhs_items = _split_rows(numbers, separators, 3)
+    return RuleTable(indptr, lhs_items, numbers[separators + 1].astype(np.int32),
+                     numbers[separators + 2].astype(np.int64), numbers[separators + 3])
 
 
-def parse_itemsets(itemset_file) -> List[FrequentItemSet]:
+def parse_itemsets(itemset_file) -> ItemsetTable:
     '''
-    :param rules_file: file path of the SPMF output
-    :return: list of FrequentItemSet objects
+    :param itemset_file: file path of the SPMF output, one itemset per line in form of "1 2 #SUP: 10"
+    :return: ItemsetTable, FrequentItemSet objects are created when accessed
     '''
-    f = open(itemset_file, "r")
-    itemsets = []
-    while True:
-        line = f.readline()
-        if not line:
-            break
-        line = line.split('#SUP:')
-        items = line[0].split()
-        items = np.array([int(item) for item in items])
-        support = int(line[1])
-        itemsets.append(FrequentItemSet(items, support))
-    return itemsets
+    numbers = _read_numbers(itemset_file, [(b'#SUP:', b' -1 ')])
+    separators = np.flatnonzero(numbers == -1)
+    indptr, items = _split_rows(numbers, separators, 1)
+    return ItemsetTable(indptr, items, numbers[separators + 1].astype(np.int64))
 
 
 def remove_redundant_rules(rules: List[Rule]) -> List[Rule]:
@@ -54,84 +67,108 @@ def remove_redundant_rules(rules: List[Rule]) -> List[Rule]:
         conf(ra) = conf(rb)
         sup(ra) = sup(rb)
         X1 ⊆ X ∧ Y ⊆ Y1.
+
+    Only rules with the same RHS, support and confidence can make each other redundant, so rules are bucketed by
+    these three values and each LHS is stored as an integer bitmask of its items. For each rule, the bucket is searched
+    for a subset of its LHS either by enumerating the submasks of its LHS or by scanning the bucket, whichever is
+    smaller, so the cost per rule is bounded by min(2^|LHS|, bucket size) integer operations.
     :param rules: list of Rule objects
     :return: list of non-redundant rules in form of Rule objects
     '''
-    redundant_ids = []
+    rules = list(rules)
+    item_bits = {}
+    buckets = {}
+    masks = []
     for rule in rules:
-        for rule1 in rules:
+        mask = 0
+        for item in rule.LHS:
+            mask |= 1 << item_bits.setdefault(int(item), len(item_bits))
+        masks.append(mask)
+        bucket = buckets.setdefault((int(rule.RHS), rule.support, rule.confidence), {})
+        bucket.setdefault(mask, set()).add(rule.id)
+
+    redundant_ids = set()
+    for rule, mask in zip(rules, masks):
+        bucket = buckets[(int(rule.RHS), rule.support, rule.confidence)]
+        if 2 ** len(rule.LHS) <= len(bucket):
+            submask = mask
+            while submask:
+                if submask in bucket and bucket[submask] - {rule.id}:
+                    redundant_ids.add(rule.id)
+                    break
+                submask = (submask - 1) & mask
+        else:
+            for other_mask, ids in bucket.items():
+                if other_mask & ~mask == 0 and ids - {rule.id}:
+                    redundant_ids.add(rule.id)
+                    break
 
-            if rule.id == rule1.id:
-                continue
+    return [rule for rule in rules if rule.id not in redundant_ids]
 
-            if rule1.RHS == rule.RHS and np.sum(np.isin(rule.LHS, rule1.LHS)) == rule1.LHS.shape[-1] and \
-                    rule1.support == rule.support and rule1.confidence == rule.confidence:
-                redundant_ids.append(rule.id)
 
-    return [rule for rule in rules if rule.id not in redundant_ids]
+def select_top_rules(rules: List[Rule], k: int) -> List[Rule]:
+    '''
+    :param rules: RuleTable or list of Rule objects
+    :param k: number of rules to keep
+    :return: the k rules with the highest support, ties broken by confidence, in the same type as rules
+    '''
+    if len(rules) <= k:
+        return rules
+    if isinstance(rules, RuleTable):
+        order = np.lexsort((-rules.confidence, -rules.support))
+        return rules.take(np.sort(order[:k]))
+    return sorted(rules, key=lambda rule: (rule.support, rule.confidence), reverse=True)[:k]
 
 
-def get_sequences_per_rule(rules: List[Rule], sequences: pd.DataFrame, data='airport') -> List[Rule]:
+def get_sequences_per_rule(rules: List[Rule], sequences: pd.DataFrame, data='airport',
+                           index: PositionIndex = None) -> List[Rule]:
     '''
     :param rules: list of Rule objects
     :param sequences: dataframe of sequences with event list stored in 'Sequence' column
     :param data: dataset identifier: airport or flaredown
+    :param index: position index of the dataset sequences is taken from, built from sequences if None
     :return: list of Rule objects with their seq_is property is the list of Turnaround IDs corresponding to that rule
 
     This function will not work for complex sequences like flaredown where each item in list is a tuple of simultaneous
     events. The time complexity for finding the correct match for each pattern in a complex sequence will be too high and
     the SPMF library does not provide list of sequence ids for each pattern (mined with TRuleGrowth) as of May 2021.
+    The native TRuleGrowth backend sets the sequence ids while mining, for both datasets.
     '''
     count_all_sequences = sequences.shape[0]
-    for rule in rules:
-        seq_ids = []
-        if data == 'airport':
-            for i, row in sequences.iterrows():
-                events = row['Sequence']
-                rhs_indx = np.where(np.array(events) == rule.RHS)[0]
-                if (rule.RHS in events) and np.sum(np.isin(np.unique(events), rule.LHS)) == rule.LHS.shape[-1] \
-                        and \
-                        all((np.where(events == item)[0][0] < rhs_indx[0]) for item in
-                            rule.LHS):
-                    seq_ids.append(row['Turnaround ID'])
+    if data == 'airport':
+        if index is None:
+            index = PositionIndex(sequences, 'Sequence', 'Turnaround ID')
+        for rule, seq_ids in zip(rules, index.seq_ids_per_rule(rules, index.rows(sequences.index))):
             rule.seq_ids = seq_ids
+    for rule in rules:
         rule.support_percentage = round(float(rule.support / count_all_sequences), 2)
     return rules
 
 
-def get_sequences_per_fis(fis: List[FrequentItemSet], labeled_sequences: pd.DataFrame, data='airport') -> List[
-    FrequentItemSet]:
+def get_sequences_per_fis(fis: List[FrequentItemSet], labeled_sequences: pd.DataFrame, data='airport',
+                          index: BitmapIndex = None) -> List[FrequentItemSet]:
     '''
     :param fis: list of FrequentItemSet objects
     :param labeled_sequences: dataframe of sequences with event list stored in 'Sequence' column
     :param data: dataset identifier: airport or flaredown
+    :param index: bitmap index of the dataset labeled_sequences is taken from, built from labeled_sequences if None
     :return: list of FrequentItemSet objects with their seq_is property is the list of Turnaround IDs corresponding to that pattern
     '''
     count_all_sequences = labeled_sequences.shape[0]
+    if data == 'airport':
+        if index is None:
+            index = BitmapIndex(labeled_sequences, 'Sequence', 'Turnaround ID')
+        rows = index.mask(labeled_sequences.index)
     for itemset in fis:
-        seq_ids = []
         if data == 'airport':
-            for i, row in labeled_sequences.iterrows():
-                events = row['Sequence']
-                if np.sum(np.isin(np.unique(events), itemset.items)) == itemset.items.shape[-1]:
-                    seq_ids.append(row['Turnaround ID'])
-            itemset.seq_ids = seq_ids
+            itemset.seq_ids = index.seq_ids(index.bitmap(itemset.items, rows=rows))
         itemset.support_percentage = round(float(itemset.support / count_all_sequences), 2)
     return fis
 
-def get_pattern_by_id(patterns: list, id: str):
-    '''
-    returns class instance of Rule or FrequentItemSet with specific id from a list of objects
-    '''
-    for pattern in patterns:
-        if str(pattern.id) == str(id):
-            return pattern
-    return None
-
 
 if __name__ == "__main__":
     delta_labels_df = pd.read_pickle("pattern_mining/data/HIAA/labeled_deltas.pkl")
     freqitemsets = parse_itemsets("pattern_mining/data/spmf/FPGrowth_itemsets_out.txt")
     freqitemsets = get_sequences_per_fis(freqitemsets, delta_labels_df)
-    lattice_fig = ItemsetGraph().generate_plotly_figure(freqitemsets)
+    lattice_fig = ItemsetGraph(max_edges_per_node=network_max_edges).generate_plotly_figure(freqitemsets)
     lattice_fig.show()
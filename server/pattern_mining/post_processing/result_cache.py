@@ -0,0 +1,177 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Callable, Hashable, Tuple
+from pattern_mining.post_processing.single_flight import SingleFlight
+from pattern_mining.post_processing.pattern_classes import PatternCollection
+
+'''
+Persistent result cache shared by all server processes.
+
+functools.lru_cache is per process and lost on every restart, so each gunicorn worker used to mine and render the same
+configurations again. This cache stores pickled results in an SQLite database (WAL mode, safe for concurrent
+processes) under a content-addressed key: a hash of the namespace, the dataset version and the call arguments.
+Entries expire after a TTL and the least recently used entries are evicted when the database exceeds its size cap.
+Concurrent calls with the same key, in this or another server process, are coalesced into a single computation.
+
+Configuration through environment variables:
+    RESULT_CACHE: set to 0 to disable the cache
+    RESULT_CACHE_DIR: directory of the cache database
+    RESULT_CACHE_MAX_MB: size cap of the stored values in MB
+    RESULT_CACHE_TTL: time to live of entries in seconds
+'''
+
+# bump when the pickled classes change in an incompatible way
+CACHE_FORMAT = 1
+
+
+def _canonical(value):
+    '''
+    converts a call argument into a hashable representation independent of object identity and dict order
+    patterns (Rule/FrequentItemSet) are represented by their ids
+    '''
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _canonical(v)) for k, v in value.items()))
+    if isinstance(value, PatternCollection):
+        return tuple(_canonical(pattern) for pattern in value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_canonical(v) for v in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else tuple(items)
+    if hasattr(value, 'id') and hasattr(value, 'support'):
+        return (type(value).__name__, value.id)
+    if hasattr(value, 'tolist'):  # numpy values and arrays, pandas series
+        return _canonical(value.tolist())
+    return value
+
+
+def make_key(*parts) -> str:
+    return hashlib.sha256(repr((CACHE_FORMAT, _canonical(parts))).encode()).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, directory: str, max_bytes: int, ttl: int, enabled=True):
+        '''
+        :param directory: directory of the SQLite database
+        :param max_bytes: size cap of the stored values in bytes
+        :param ttl: time to live of entries in seconds
+        :param enabled: if False, get always misses and set does nothing
+        '''
+        self.path = os.path.join(directory, 'results.sqlite')
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._local = threading.local()
+        self.flights = SingleFlight(os.path.join(directory, 'locks') if enabled else None)
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+            with self._connection() as connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB, "
+                                   "size INTEGER, created REAL, accessed REAL)")
+                connection.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections must not be shared between threads or forked processes
+        if getattr(self._local, 'pid', None) != os.getpid():
+            self._local.connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection.execute("PRAGMA journal_mode=WAL")
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def get(self, key: str) -> Tuple[bool, object]:
+        '''
+        :return: tuple of (found, value)
+        '''
+        if not self.enabled:
+            return False, None
+        now = time.time()
+        with self._connection() as connection:
+            row = connection.execute("SELECT value, created FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return False, None
+            if now - row[1] > self.ttl:
+                connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                return False, None
+            connection.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        try:
+            return True, pickle.loads(row[0])
+        except Exception:  # stored by an incompatible version of the code
+            return False, None
+
+    def set(self, key: str, value):
+        if not self.enabled:
+            return
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                               (key, sqlite3.Binary(blob), len(blob), now, now))
+            self._evict(connection, now)
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        connection.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in connection.execute("SELECT key, size FROM results ORDER BY accessed").fetchall():
+            connection.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        if self.enabled:
+            with self._connection() as connection:
+                connection.execute("DELETE FROM results")
+
+    def cached(self, namespace: str, version: Callable[[str], Hashable] = None):
+        '''
+        decorator for functions whose results are stored in the cache, concurrent calls with the same arguments wait
+        for the first one instead of computing the result again
+
+        :param namespace: name separating the results of different functions
+        :param version: function of the 'data' argument of the decorated function returning the dataset version,
+            results of an older version of a dataset are never returned
+        '''
+
+        def decorator(function):
+            signature = inspect.signature(function)
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = dict(bound.arguments)
+                dataset_version = version(arguments.get('data')) if version is not None else None
+                key = make_key(namespace, dataset_version, arguments)
+                found, value = self.get(key)
+                if found:
+                    return value
+
+                def compute():
+                    result = function(*args, **kwargs)
+                    self.set(key, result)
+                    return result
+
+                return self.flights.do(key, compute, lookup=lambda: self.get(key))
+
+            wrapper.cache = self
+            return wrapper
+
+        return decorator
+
+
+result_cache = ResultCache(os.environ.get('RESULT_CACHE_DIR', 'pattern_mining/data/cache'),
+                           max_bytes=int(os.environ.get('RESULT_CACHE_MAX_MB', 512)) * 1024 * 1024,
+                           ttl=int(os.environ.get('RESULT_CACHE_TTL', 24 * 60 * 60)),
+                           enabled=os.environ.get('RESULT_CACHE', '1') != '0')
@@ -0,0 +1,85 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Hashable
+from pattern_mining.mining.fpgrowth import get_min_count
+
+
+class ThresholdResultStore:
+    '''
+    Keeps the mining results of the most permissive runs per mining key (dataset, filter, window, ...).
+    Patterns frequent at a support threshold are a subset of the patterns frequent at any lower threshold (same for
+    confidence), so a request with stricter support/confidence than a stored run is answered by filtering the stored
+    pattern table in memory instead of mining again.
+
+    Per key, only runs that are not dominated by another stored run (lower or equal support and confidence) are kept.
+    The store is bounded by the number of keys and by the total number of stored patterns, since a single run at a low
+    support can hold millions of patterns. Keys are evicted least recently used first, and a run larger than the
+    pattern budget is not stored.
+    '''
+
+    def __init__(self, max_keys=32, max_patterns=500000):
+        '''
+        :param max_keys: maximum number of mining keys
+        :param max_patterns: maximum total number of patterns in the stored runs
+        '''
+        self.max_keys = max_keys
+        self.max_patterns = max_patterns
+        self.pattern_count = 0
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, support: float, confidence: float = None):
+        '''
+        :param key: mining key without the thresholds
+        :param support: minimum support in percentage
+        :param confidence: minimum confidence in percentage, None for frequent itemsets
+        :return: RuleTable/ItemsetTable filtered to the thresholds, None if no stored run is permissive enough
+        '''
+        with self._lock:
+            runs = self._runs.get(key)
+            if runs is None:
+                return None
+            self._runs.move_to_end(key)
+            for run_support, run_confidence, table in runs:
+                if run_support <= support and (confidence is None or run_confidence <= confidence):
+                    break
+            else:
+                return None
+
+        if run_support == support and run_confidence == confidence:
+            return table
+        keep = table.support >= get_min_count(support, table.record_count)
+        if confidence is not None:
+            keep &= table.confidence >= confidence / 100
+        return table.take(np.flatnonzero(keep))
+
+    def put(self, key: Hashable, support: float, confidence: float, table):
+        '''
+        :param table: RuleTable/ItemsetTable of a mining run, record_count must be set
+        '''
+        if table.record_count is None or len(table) > self.max_patterns:
+            return
+        with self._lock:
+            runs = self._runs.setdefault(key, [])
+            for run_support, run_confidence, _ in runs:
+                if run_support <= support and (confidence is None or run_confidence <= confidence):
+                    return  # an equally or more permissive run is already stored
+            kept = []
+            for run in runs:
+                if support <= run[0] and (confidence is None or confidence <= run[1]):
+                    self.pattern_count -= len(run[2])  # dominated by the new run
+                else:
+                    kept.append(run)
+            runs[:] = kept
+            runs.append((support, confidence, table))
+            self.pattern_count += len(table)
+            self._runs.move_to_end(key)
+            while len(self._runs) > self.max_keys or (self.pattern_count > self.max_patterns and len(self._runs) > 1):
+                self._evict(next(iter(self._runs)))
+            # the other runs of the key itself are dropped last, the new run fits the budget on its own
+            while self.pattern_count > self.max_patterns:
+                self.pattern_count -= len(runs.pop(0)[2])
+
+    def _evict(self, key: Hashable):
+        self.pattern_count -= sum(len(table) for _, _, table in self._runs.pop(key))
@@ -3,6 +3,8 @@ from typing import List, Tuple
 import pandas as pd
 import numpy as np
 from pattern_mining.post_processing.pattern_classes import Rule
+from pattern_mining.post_processing.incremental_dag import IncrementalDAG
+from pattern_mining.post_processing.centrality import betweenness_centrality
 from pattern_mining.pre_processing.dictionary import AirportMapping, FlaredownMapping
 from sklearn_extra.cluster import KMedoids
 
@@ -22,22 +24,25 @@ class RuleDAG:
         self.tagged = tagged
         self.mapping = AirportMapping() if data == 'airport' else FlaredownMapping()
 
-    def _insert_rule_to_dag(self, dag: nx.DiGraph, rule: Rule) -> nx.DiGraph:
+    def _rule_edges(self, rule: Rule) -> List[tuple]:
+        '''
+        :param rule: sequential rule in form of a Rule object
+        :return: DAG edges of the rule, from LHS items to RHS
+        '''
+        return [(lhs, rule.RHS) if self.tagged
+                else (self.mapping.code_to_event[str(lhs)]['parent'],
+                      self.mapping.code_to_event[str(rule.RHS)]['parent'])
+                for lhs in rule.LHS]
+
+    def _insert_rule_to_dag(self, dag: IncrementalDAG, edges: List[tuple]) -> bool:
         '''
         inserts a sequential rule into a DAG with items as nodes and edges from LHS to RHS
 
-        :param dag: a directed acyclic graph
-        :param rule: sequential rule in form of a Rule object
-        :return: a new DAG including the rule, None is returned if the rule caused a cycle in the DAG
+        :param dag: a directed acyclic graph, updated in place
+        :param edges: edges of the rule, see _rule_edges
+        :return: False if the rule caused a cycle in the DAG, the DAG is then left unchanged
         '''
-        temp_graph = dag.copy()
-        temp_graph.add_edges_from([(lhs, rule.RHS) if self.tagged
-                                   else (self.mapping.code_to_event[str(lhs)]['parent'],
-                                         self.mapping.code_to_event[str(rule.RHS)]['parent'])
-                                   for lhs in rule.LHS])
-        if nx.is_directed_acyclic_graph(temp_graph):
-            return temp_graph
-        return None
+        return dag.add_edges(edges)
 
     def _create_dags(self, rules: List[Rule]) -> Tuple[List, dict]:
         '''
@@ -52,16 +57,16 @@ class RuleDAG:
         event_frequency = {}
 
         for rule in rules:
+            edges = self._rule_edges(rule)
             inserted = False
             for dag in dags:
-                g = self._insert_rule_to_dag(dag['g'], rule)
-                if g is not None:
-                    dag['g'] = g  # update dag with newly inserted rule
+                if self._insert_rule_to_dag(dag['g'], edges):
                     dag['rules'].append(rule.id)
                     inserted = True
                     break
             if not inserted:
-                dag = self._insert_rule_to_dag(nx.DiGraph(), rule)
+                dag = IncrementalDAG()
+                self._insert_rule_to_dag(dag, edges)
                 dags.append({'g': dag, 'rules': [rule.id]})
 
             all_items = rule.LHS
@@ -73,6 +78,8 @@ class RuleDAG:
                 else:
                     event_frequency[item] = 1
 
+        for dag in dags:
+            dag['g'] = dag['g'].graph
         return dags, event_frequency
 
     def _topol_sort_dags(self, dags: List[dict]):
@@ -96,24 +103,62 @@ class RuleDAG:
                 the value of the group.
             - level indicates row is sequential rule (1 is rule and 0 is group)
         '''
-        matrix_columns = columns.copy()
-        matrix_columns.extend(["group", "level", "support", "confidence"])
-        matrix = pd.DataFrame('', index=[rule.id for rule in rules], columns=matrix_columns)
+        column_index = {column: i for i, column in enumerate(columns)}
+        # cell values are stored as small integer codes and converted to strings once at the end
+        cell_values = ['']
+        item_cells = {}  # item -> (column position, antecedent cell code, consequent cell code)
         for rule in rules:
+            for item in np.append(rule.LHS, rule.RHS):
+                if item not in item_cells:
+                    item_cells[item] = self._item_cells(item, column_index, cell_values)
+
+        lhs_rows, lhs_cols, lhs_codes = [], [], []
+        rhs_cols, rhs_codes = [], []
+        for row, rule in enumerate(rules):
             for item in rule.LHS:
-                col = item if self.tagged else self.mapping.code_to_event[str(item)]['parent']
-                cell_val = 'A.' if self.tagged else 'A.' + self.mapping.code_to_event[str(item)]['tag'][0].upper() + "."
-                matrix.loc[rule.id, col] = cell_val
-            col = rule.RHS if self.tagged else self.mapping.code_to_event[str(rule.RHS)]['parent']
-            cell_val = 'C.' if self.tagged else 'C.' + self.mapping.code_to_event[str(rule.RHS)]['tag'][0].upper() + "."
-            matrix.loc[rule.id, col] = cell_val
-            matrix.loc[rule.id, "group"] = columns.index(col)
-            matrix.loc[rule.id, "level"] = 1
-            matrix.loc[rule.id, "support"] = rule.support_percentage
-            matrix.loc[rule.id, "confidence"] = rule.confidence
+                col, antecedent, _ = item_cells[item]
+                lhs_rows.append(row)
+                lhs_cols.append(col)
+                lhs_codes.append(antecedent)
+            col, _, consequent = item_cells[rule.RHS]
+            rhs_cols.append(col)
+            rhs_codes.append(consequent)
+
+        codes = np.zeros((len(rules), len(columns)), dtype=np.int8)
+        codes[lhs_rows, lhs_cols] = lhs_codes
+        # consequent is written last, same as an antecedent sharing its column was overwritten before
+        codes[np.arange(len(rules)), rhs_cols] = rhs_codes
+
+        values = np.empty((len(rules), len(columns) + 4), dtype=object)
+        values[:, :len(columns)] = np.array(cell_values, dtype=object)[codes]
+        values[:, len(columns)] = rhs_cols  # group
+        values[:, len(columns) + 1] = 1  # level
+        values[:, len(columns) + 2] = [rule.support_percentage for rule in rules]
+        values[:, len(columns) + 3] = [rule.confidence for rule in rules]
+        matrix = pd.DataFrame(values, index=[rule.id for rule in rules],
+                              columns=columns + ["group", "level", "support", "confidence"])
 
         return matrix.rename(columns={code: self.mapping.code_to_event[str(code)]['event'] for code in columns})
 
+    def _item_cells(self, item: int, column_index: dict, cell_values: list) -> Tuple[int, int, int]:
+        '''
+        :param item: rule item
+        :param column_index: dictionary with key=column, value=column position in the matrix
+        :param cell_values: list of cell strings by code, new cell strings are appended
+        :return: column position of the item, and codes of its antecedent and consequent cell values
+        '''
+        if self.tagged:
+            col, tag = item, ''
+        else:
+            event = self.mapping.code_to_event[str(item)]
+            col, tag = event['parent'], event['tag'][0].upper() + "."
+        codes = []
+        for cell_value in ('A.' + tag, 'C.' + tag):
+            if cell_value not in cell_values:
+                cell_values.append(cell_value)
+            codes.append(cell_values.index(cell_value))
+        return column_index[col], codes[0], codes[1]
+
     def _cluster_matrix(self, matrix: pd.DataFrame, n_clusters=5) -> pd.DataFrame:
         '''
         clusters rule matrix (without support,confidence, group and level columns) with Jaccard distance
@@ -145,11 +190,14 @@ class RuleDAG:
 
         return tmp.drop(columns=['labels'])
 
-    def create_matrices(self, rules: List[Rule], cluster=False, id_as_column=False) -> Tuple[List[pd.DataFrame], dict]:
+    def create_matrices(self, rules: List[Rule], cluster=False, id_as_column=False,
+                        centrality='approximate', centrality_pivots: int = None) -> Tuple[List[pd.DataFrame], dict]:
         '''
         :param rules: list of Rule objects
         :param cluster: cluster rule rows or not
         :param id_as_column: use rule ids as a column (if False, the rule id is still accessible with index)
+        :param centrality: node centrality method: 'exact', 'approximate' or 'none', see centrality.py
+        :param centrality_pivots: number of pivots of approximate node centrality, by default depends on DAG size
         :return: tupe of the following:
             - list of rule matrices (one matrix per DAG)
             - dictionary of the DAG (forest) information including frequency of nodes (items) in patterns and
@@ -164,9 +212,9 @@ class RuleDAG:
         for i in range(len(dags)):
             g = dags[i]['g']
             dag_index = str(i)
-            centrality = nx.betweenness_centrality(g)
-            min_c = min(centrality.values())
-            max_c = max(centrality.values())
+            node_centrality = betweenness_centrality(g, method=centrality, pivots=centrality_pivots)
+            min_c = min(node_centrality.values())
+            max_c = max(node_centrality.values())
             if min_c < full_graph['min_c']:
                 full_graph['min_c'] = min_c
             if max_c > full_graph['max_c']:
@@ -175,7 +223,7 @@ class RuleDAG:
             # the information stored for nodes and edges are for front-end use
             # dag_index is used to know which node and edge in DAG forest correspond to which matrix
             nodes = [{'code': str(node) + dag_index, 'name': self.mapping.code_to_event[str(node)]['event'],
-                      'dag_index': dag_index, 'f': event_frequency[node], 'c': centrality[node]}
+                      'dag_index': dag_index, 'f': event_frequency[node], 'c': node_centrality[node]}
                      for node in g.nodes]
             edges = [{'source': str(edge[0]) + dag_index, 'target': str(edge[1]) + dag_index} for edge in g.edges]
             full_graph['edges'].extend(edges)
@@ -185,7 +233,10 @@ class RuleDAG:
         self._topol_sort_dags(dags)
 
         # create a dataframe per dag
-        matrices = [self._create_df(dag['g'], [rule for rule in rules if rule.id in dag['rules']]) for dag in dags]
+        matrices = []
+        for dag in dags:
+            dag_rules = set(dag['rules'])
+            matrices.append(self._create_df(dag['g'], [rule for rule in rules if rule.id in dag_rules]))
 
         if cluster:
             matrices = [self._cluster_matrix(m) for m in matrices]
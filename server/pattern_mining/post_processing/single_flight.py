@@ -0,0 +1,109 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Tuple
+from pattern_mining.jobs import JobCancelled
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, only calls within a process are coalesced there
+    fcntl = None
+
+'''
+Coalescing of identical concurrent calls.
+
+When several requests for the same mining configuration arrive at once, every one of them misses the caches and runs
+the same mining. With single-flight, the first caller of a key computes the result and concurrent callers of the same
+key wait for it instead:
+    - within a process, followers wait on the leader's call and receive its result (or its error)
+    - across processes, leaders of the same key serialize on a lock file, and every leader checks the shared result
+      cache again once it holds the lock, so only the first one computes
+'''
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self, lock_directory: str = None):
+        '''
+        :param lock_directory: directory of the lock files coalescing calls across processes, None to only coalesce
+            calls within this process
+        '''
+        self.lock_directory = lock_directory
+        self._calls = {}
+        self._lock = threading.Lock()
+        if lock_directory is not None:
+            os.makedirs(lock_directory, exist_ok=True)
+
+    @contextmanager
+    def _file_lock(self, key: str):
+        if self.lock_directory is None or fcntl is None:
+            yield
+            return
+        path = os.path.join(self.lock_directory, key + '.lock')
+        while True:
+            lock_file = open(path, 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # the previous holder removes the file before unlocking it. A process that was waiting for it then holds
+            # the lock of a removed file, while a new caller may hold the lock of a new file at the same path, so the
+            # lock only counts if it is on the file currently at the path
+            try:
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+        try:
+            yield
+        finally:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    def do(self, key: str, function: Callable, lookup: Callable[[], Tuple[bool, object]] = None):
+        '''
+        :param key: identity of the call, must be usable as a file name
+        :param function: computes the result
+        :param lookup: returns (found, value) of a result stored by another process, called once the cross-process
+            lock is held
+        :return: result of function, computed by this or a concurrent caller
+        '''
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+            if leader:
+                break
+            call.done.wait()
+            # a cancelled job only cancels its own computation, the followers compute again
+            if isinstance(call.error, JobCancelled):
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with self._file_lock(key):
+                found, value = lookup() if lookup is not None else (False, None)
+                call.result = value if found else function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
@@ -0,0 +1,78 @@
+import numpy as np
+from typing import List
+
+
+class TrigramIndex:
+    '''
+    Substring index over item/event names: every name is split into its n-grams of up to 3 characters, and each gram
+    keeps the sorted ids of the names containing it. The names containing a query are candidates from the intersection
+    of the postings of the query trigrams (smallest first), verified with a substring test, so a search only looks at
+    names sharing all the trigrams of the query instead of all the names. Queries of up to 3 characters are a single
+    gram lookup.
+    '''
+
+    def __init__(self, names: List[str], codes: List[int]):
+        '''
+        :param names: item/event names, searched case-insensitively
+        :param codes: item/event number code of each name
+        '''
+        self.names = list(names)
+        self.codes = list(codes)
+        self._lower = [name.lower() for name in self.names]
+        postings = {}
+        for name_id, name in enumerate(self._lower):
+            for gram in self._grams(name):
+                postings.setdefault(gram, []).append(name_id)
+        # a name is added once per gram in name order, so postings are sorted and unique
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    @staticmethod
+    def _grams(text: str) -> set:
+        grams = set()
+        for size in (1, 2, 3):
+            grams.update(text[i:i + size] for i in range(len(text) - size + 1))
+        return grams
+
+    def _candidates(self, query: str) -> np.ndarray:
+        if len(query) <= 3:
+            return self._postings.get(query, np.empty(0, dtype=np.int32))
+        postings = sorted((self._postings.get(query[i:i + 3]) for i in range(len(query) - 2)),
+                          key=lambda ids: -1 if ids is None else len(ids))
+        if postings[0] is None:
+            return np.empty(0, dtype=np.int32)
+        candidates = postings[0]
+        for ids in postings[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            if len(candidates) == 0:
+                break
+        return candidates
+
+    def search_ids(self, query: str, lowercase=True) -> List[int]:
+        '''
+        :param query: substring of names
+        :param lowercase: if False, the query is matched as given against the lowercase names (an upper case query
+            matches nothing)
+        :return: ids of the names containing the query, in name order
+        '''
+        if lowercase:
+            query = query.lower()
+        if len(query) == 0:
+            return list(range(len(self.names)))
+        return [name_id for name_id in self._candidates(query).tolist() if query in self._lower[name_id]]
+
+    def search(self, query: str, lowercase=True) -> List[int]:
+        '''
+        :return: codes of the names containing the query, in name order
+        '''
+        return [self.codes[name_id] for name_id in self.search_ids(query, lowercase)]
+
+    def suggest(self, query: str, limit=20) -> List[dict]:
+        '''
+        :param query: substring of names
+        :param limit: maximum number of suggestions
+        :return: list of {'value': code, 'text': name}, names starting with the query first
+        '''
+        query = query.lower()
+        name_ids = self.search_ids(query)
+        name_ids.sort(key=lambda name_id: not self._lower[name_id].startswith(query))
+        return [{'value': self.codes[name_id], 'text': self.names[name_id]} for name_id in name_ids[:limit]]
@@ -1,38 +1,163 @@
 from functools import lru_cache
 import pandas as pd
 import pickle
-import os
 import math
+import os
 from typing import Iterable, List, Tuple
 from pattern_mining.post_processing.post_processing import parse_rules, remove_redundant_rules, get_sequences_per_rule, \
-    get_pattern_by_id, parse_itemsets, get_sequences_per_fis
+    parse_itemsets, get_sequences_per_fis, select_top_rules
 from pattern_mining.post_processing.rule_dag import RuleDAG
 from pattern_mining.post_processing.itemset_graph import ItemsetGraph
+from pattern_mining.post_processing.bitmap_index import BitmapIndex
+from pattern_mining.post_processing.position_index import PositionIndex
+from pattern_mining.post_processing.facet_index import FacetIndex
+from pattern_mining.post_processing.trigram_index import TrigramIndex
+from pattern_mining.post_processing.result_store import ThresholdResultStore
+from pattern_mining.post_processing.result_cache import result_cache, make_key
+from pattern_mining.post_processing.pattern_store import pattern_store
+from pattern_mining.post_processing.pattern_classes import PatternCollection
 from pattern_mining.pre_processing.dictionary import AirportMapping, FlaredownMapping
-from pattern_mining.mining import spmf_manager
+from pattern_mining.pre_processing.dataset_store import DatasetStore
+from pattern_mining.mining import spmf_manager, spmf_io, spmf_pool, fpgrowth, trulegrowth
+from pattern_mining.mining.limits import TooManyPatterns
+from pattern_mining.jobs import report_stage
 
 # global data ####################################################################################
 
-labels_df = pd.read_pickle("pattern_mining/data/HIAA_anonymized/labeled_sequences.pkl") # sequences removed, only ids (NDA)
-delta_labels_df = pd.read_pickle("pattern_mining/data/HIAA_anonymized/labeled_deltas.pkl") # deltas removed, only ids (NDA)
-flat_flight_tid = pd.read_csv("pattern_mining/data/HIAA_anonymized/turnaround_arr_dep_flights.csv")
-weather_tid_df = pd.read_csv("pattern_mining/data/HIAA_anonymized/tid_weather.csv")
-performance_detail_df = pd.read_csv("pattern_mining/data/HIAA_anonymized/performance_detail.csv")
-delta_performance_detail_df = pd.read_csv("pattern_mining/data/HIAA_anonymized/delta_performance_detail.csv")
+# tables are loaded on first use, see pre_processing/dataset_store.py
+datasets = DatasetStore(os.environ.get('DATASET_BINARY_DIR', 'pattern_mining/data/binary'))
+# sequences removed, only ids (NDA)
+datasets.register('labels_df', "pattern_mining/data/HIAA_anonymized/labeled_sequences.pkl", pd.read_pickle)
+# deltas removed, only ids (NDA)
+datasets.register('delta_labels_df', "pattern_mining/data/HIAA_anonymized/labeled_deltas.pkl", pd.read_pickle)
+datasets.register('flat_flight_tid', "pattern_mining/data/HIAA_anonymized/turnaround_arr_dep_flights.csv", pd.read_csv)
+datasets.register('weather_tid_df', "pattern_mining/data/HIAA_anonymized/tid_weather.csv", pd.read_csv)
 # Nan not a valid json literal, problems in parsing response in front-end
-performance_detail_df = performance_detail_df.where(pd.notnull(performance_detail_df), None)
-delta_performance_detail_df = delta_performance_detail_df.where(pd.notnull(delta_performance_detail_df), None)
-ce_mapping = AirportMapping()
+datasets.register('performance_detail_df', "pattern_mining/data/HIAA_anonymized/performance_detail.csv", pd.read_csv,
+                  postprocess=lambda df: df.where(pd.notnull(df), None))
+datasets.register('delta_performance_detail_df', "pattern_mining/data/HIAA_anonymized/delta_performance_detail.csv",
+                  pd.read_csv, postprocess=lambda df: df.where(pd.notnull(df), None))
+datasets.register('flaredown_df', "pattern_mining/data/flaredown/sequences.pkl", pd.read_pickle)
+datasets.register('user_demographics', "pattern_mining/data/flaredown/user_demographics.csv", pd.read_csv)
+
+
+@lru_cache()
+def get_mapping(data='airport'):
+    '''
+    :param data: dataset identifier: 'airport' or 'flaredown'
+    :return: AirportMapping or FlaredownMapping, created on first use
+    '''
+    return AirportMapping() if data == 'airport' else FlaredownMapping()
+
+
+@lru_cache()
+def get_event_name_index(data='airport') -> TrigramIndex:
+    '''
+    :param data: dataset identifier: 'airport' or 'flaredown'
+    :return: substring index over the item/event names of the dataset mapping, built on first use
+    '''
+    event_to_code = get_mapping(data).event_to_code
+    return TrigramIndex(list(event_to_code), [value['code'] for value in event_to_code.values()])
 
-flaredown_df = pd.read_pickle("pattern_mining/data/flaredown/sequences.pkl")
-user_demographics = pd.read_csv("pattern_mining/data/flaredown/user_demographics.csv")
-fl_mapping = FlaredownMapping()
+
+def search_events(query: str, data='airport', limit=20) -> List[dict]:
+    '''
+    :param query: part of an item/event name, case-insensitive
+    :param data: dataset identifier: 'airport' or 'flaredown'
+    :param limit: maximum number of results
+    :return: list of {'value': code, 'text': name} of the matching items/events, names starting with query first
+    '''
+    return get_event_name_index(data).suggest(query, limit)
+
+
+# mining backend used when the mining configuration does not specify one
+# 'native' mines in-process, 'spmf' runs the SPMF Java executable (kept for cross-checking the results)
+mining_backend = 'native'
+# mining results of the most permissive thresholds per dataset/filter/window, stricter thresholds are served from it
+mined_results = ThresholdResultStore(max_patterns=int(os.environ.get('MINED_RESULTS_MAX_PATTERNS', 500000)))
+# rules beyond this number take too long to post-process and render, only the top rules by support are kept
+max_rules = 2000
+# the native miners stop with TooManyPatterns beyond this number of rules/itemsets (SPMF is capped by its output size)
+max_mined_patterns = int(os.environ.get('MAX_MINED_PATTERNS', 200000))
+
+
+# data files per dataset, used for the dataset version of persistently cached results
+dataset_files = {
+    'airport': ["pattern_mining/data/HIAA_anonymized/labeled_sequences.pkl",
+                "pattern_mining/data/HIAA_anonymized/labeled_deltas.pkl",
+                "pattern_mining/data/HIAA_anonymized/rules.pkl",
+                "pattern_mining/data/HIAA_anonymized/fis.pkl",
+                "pattern_mining/data/HIAA_anonymized/turnaround_arr_dep_flights.csv",
+                "pattern_mining/data/HIAA_anonymized/tid_weather.csv",
+                "pattern_mining/data/HIAA_anonymized/performance_detail.csv",
+                "pattern_mining/data/HIAA_anonymized/delta_performance_detail.csv"],
+    'flaredown': ["pattern_mining/data/flaredown/sequences.pkl",
+                  "pattern_mining/data/flaredown/user_demographics.csv"]
+}
 
 
 def _get_id_col(data: str) -> str:
     return 'Turnaround ID' if data == 'airport' else 'user_id'
 
 
+def dataset_version(data='airport') -> tuple:
+    '''
+    :param data: dataset identifier: 'airport' or 'flaredown'
+    :return: size and modification time of the dataset files, changes whenever a file of the dataset is replaced.
+        The files are checked on every call (a few stat calls), so persisted results of replaced files are never
+        served. Tables already loaded by a running process are only reloaded on restart
+    '''
+    version = []
+    for filename in dataset_files.get(data, []):
+        stat = os.stat(filename) if os.path.exists(filename) else None
+        version.append((filename, stat.st_size if stat else None, stat.st_mtime if stat else None))
+    return tuple(version)
+
+
+@lru_cache()
+def get_bitmap_index(data='airport', itemset=False) -> BitmapIndex:
+    '''
+    :param data: dataset identifier: 'airport' or 'flaredown'
+    :param itemset: index of the transactions or of the sequences (airport only)
+    :return: vertical bitmap index of all the records of the dataset, built on first use
+    '''
+    if data == 'flaredown':
+        return BitmapIndex(datasets.get('flaredown_df'), 'Sequence_flat', _get_id_col(data))
+    return BitmapIndex(datasets.get('delta_labels_df' if itemset else 'labels_df'), 'Sequence', _get_id_col(data))
+
+
+@lru_cache()
+def get_position_index() -> PositionIndex:
+    '''
+    :return: first occurrence position index of all the airport sequences, built on first use
+        (rules of complex Flaredown sequences are not matched against sequences, see get_sequences_per_rule)
+    '''
+    return PositionIndex(datasets.get('labels_df'), 'Sequence', _get_id_col('airport'))
+
+
+@lru_cache()
+def get_facet_index(data='airport') -> FacetIndex:
+    '''
+    :param data: dataset identifier: 'airport' or 'flaredown'
+    :return: index of the record attributes used by the filters, built on first use
+    '''
+    if data == 'flaredown':
+        user_demographics = datasets.get('user_demographics')
+        index = FacetIndex(user_demographics['user_id'])
+        for column in ['age_group', 'sex', 'country']:
+            index.add_categorical(column, user_demographics['user_id'], user_demographics[column])
+        return index
+
+    flat_flight_tid = datasets.get('flat_flight_tid')
+    weather_tid_df = datasets.get('weather_tid_df')
+    index = FacetIndex(pd.concat([flat_flight_tid['Turnaround ID'], weather_tid_df['Turnaround ID']]))
+    for column in ['Stand', 'AL']:
+        index.add_categorical(column, flat_flight_tid['Turnaround ID'], flat_flight_tid[column])
+    for column in ['AT', 'GT', 'RH']:
+        index.add_range(column, weather_tid_df['Turnaround ID'], weather_tid_df[column])
+    return index
+
+
 def get_heatmap_series(flight_df: pd.DataFrame) -> dict:
     '''
     :param flight_df: flight information dataframe
@@ -108,8 +233,10 @@ def get_performance(sequence_ids: list, pattern_items: list, rule=True,anonymize
     :return: dictionary of rows and columns in format required for Vuetify data table
     '''
     if rule:
+        performance_detail_df = datasets.get('performance_detail_df')
         prfmnc = performance_detail_df[performance_detail_df['Turnaround ID'].isin(sequence_ids)]
     else:
+        delta_performance_detail_df = datasets.get('delta_performance_detail_df')
         prfmnc = delta_performance_detail_df[delta_performance_detail_df['Turnaround ID'].isin(sequence_ids)]
 
     if anonymized:
@@ -127,7 +254,7 @@ def get_performance(sequence_ids: list, pattern_items: list, rule=True,anonymize
 
         stat_cols = []
         for parent_code in pattern_items:
-            parent_name = ce_mapping.code_to_event[str(parent_code)]['event']
+            parent_name = get_mapping('airport').code_to_event[str(parent_code)]['event']
             if parent_name == 'Aircraft entered stand':  # always 0, since it's the origin
                 continue
             stat_cols.extend([parent_name, parent_name + " min", parent_name + " 0.4 quantile", parent_name + " median",
@@ -150,6 +277,7 @@ def get_demo_map(user_ids) -> dict:
     :param user_ids: user ids in Flaredown dataset
     :return: dictionary of countries and count of users per country in Plotly choropleth map in Javascript
     '''
+    user_demographics = datasets.get('user_demographics')
     users = user_demographics[user_demographics['user_id'].isin(user_ids)]
     country_count = users['country'].value_counts()
     return {'z': list(country_count), 'locations': list(country_count.index)}
@@ -163,6 +291,7 @@ def get_pc_format(seq_ids_per_pattern: List[list] = None) -> List[dict]:
     :return: list of dictionaries of weather data series in format required by Plotly parallel coordinates in Javascript
     '''
     dimensions = []
+    weather_tid_df = datasets.get('weather_tid_df')
     if seq_ids_per_pattern is None:
         medians = [weather_tid_df.median(numeric_only=True).astype(float).to_dict()]
     else:
@@ -179,15 +308,14 @@ def get_pc_format(seq_ids_per_pattern: List[list] = None) -> List[dict]:
     return dimensions
 
 
-def remove_file(filename: str):
-    try:
-        os.remove(filename)
-    except OSError as e:
-        print("Error: %s - %s." % (e.filename, e.strerror))
+def _get_backend(config: dict = None) -> str:
+    if config is not None and 'backend' in config:
+        return config['backend']
+    return mining_backend
 
 
 def mine_patterns(records: Iterable, support: int, confidence: int = None, window: int = None, itemset=False,
-                  is_spmf_format=False) -> str:
+                  is_spmf_format=False, ids: Iterable = None, backend: str = None, top_k: int = None) -> list:
     '''
     :param records: list of transactions/sequences
     :param support: support
@@ -196,52 +324,118 @@ def mine_patterns(records: Iterable, support: int, confidence: int = None, windo
     :param itemset: if True mine frequent itemsets else mine sequential rules
     :param is_spmf_format: True indicates the transactions/sequences in list are already in SPMF input format
         else the spmf_manager will generate the appropriate input format
-    :return: path of the SPMF output file
-    '''
-    input = spmf_manager.generate_input_file(records, itemset=itemset, is_spmf_format=is_spmf_format)
-    try:
+    :param ids: transaction/sequence ids in the same order as records, used by the native backend to set seq_ids
+    :param backend: 'native' mines in-process, 'spmf' runs the SPMF Java executable, by default mining_backend
+    :param top_k: if set, support is ignored and the top_k sequential rules with the highest support are mined
+        in-process (SPMF's TopSeqRules has no window constraint)
+    :return: ItemsetTable/RuleTable, the FrequentItemSet/Rule objects only have seq_ids set by the native backend
+    :raises TooManyPatterns: if the native miner found more than max_mined_patterns patterns, or SPMF exceeded its output
+        size cap or ran out of memory
+    '''
+    if top_k is not None and not itemset:
+        return trulegrowth.mine_top_k_rules(records, ids, top_k, confidence, window)
+    if backend is None:
+        backend = mining_backend
+    if backend == 'native':
         if itemset:
-            output_file = spmf_manager.run('FPGrowth_itemsets', input, str(support) + "%", itemset=True)
-        else:
-            output_file = spmf_manager.run('TRuleGrowth', input, str(support) + "%", str(confidence) + "%",
-                                       window)
-    except:
-        remove_file(input)
-        raise TypeError("java.lang.IllegalArgumentException")
-    remove_file(input)
-    return output_file
+            return fpgrowth.mine_frequent_itemsets(records, ids, support, max_patterns=max_mined_patterns)
+        return trulegrowth.mine_sequential_rules(records, ids, support, confidence, window,
+                                                 max_patterns=max_mined_patterns)
+
+    # input and output files are removed when the block exits, even if mining or parsing fails
+    with spmf_io.scratch_files() as (input_file, output_file):
+        spmf_manager.generate_input_file(records, itemset=itemset, is_spmf_format=is_spmf_format,
+                                         filename=input_file)
+        try:
+            if itemset:
+                spmf_manager.run('FPGrowth_itemsets', input_file, str(support) + "%", itemset=True,
+                                 output_file=output_file)
+            else:
+                spmf_manager.run('TRuleGrowth', input_file, str(support) + "%", str(confidence) + "%", window,
+                                 output_file=output_file)
+        except spmf_pool.SpmfOutputTooLarge as e:
+            raise TooManyPatterns(str(e))
+        patterns = parse_itemsets(output_file) if itemset else parse_rules(output_file)
+        patterns.record_count = len(records)
+        return patterns
 
 
 @lru_cache()
-def get_sequences_by_pattern_id(all_patterns: list, pattern_ids: list, detailed: bool = False, rule=True) -> Tuple:
+def get_sequences_by_pattern_id(all_patterns: PatternCollection, pattern_ids: list, detailed: bool = False, rule=True,
+                                data='airport') -> Tuple:
     '''
-    :param all_patterns: list of Rule/FrequentItemSet objects
-    :param pattern_ids: list of pattern ids, used for filtering all_patterns
+    :param all_patterns: PatternCollection of Rule/FrequentItemSet objects
+    :param pattern_ids: list of pattern ids, used for filtering all_patterns. Unknown ids are skipped
     :param detailed: if True, list of all items used in the filtered patterns is returned, used for front-end detail table
     :param rule: if the patterns are sequential rules or frequent itemsets
+    :param data: dataset identifier: 'airport' or 'flaredown'
     :return: tuple of the following
         - all sequence/transaction ids related to filtered patterns
         - sequence/transaction ids per pattern
         - all unique items used in patterns
     '''
+    patterns = [pattern for pattern in all_patterns.by_ids(pattern_ids) if pattern is not None]
+    return get_sequences_of_patterns(patterns, detailed, rule, data)
+
+
+def get_sequences_of_patterns(patterns: list, detailed: bool = False, rule=True, data='airport') -> Tuple:
+    '''
+    same as get_sequences_by_pattern_id for patterns that are already looked up
+    '''
+    mapping = get_mapping(data)
     sequence_ids = set()
     seq_ids_per_pattern = []
     pattern_items = set()
 
-    for pattern_id in pattern_ids:
-        pattern = get_pattern_by_id(all_patterns, pattern_id)
+    for pattern in patterns:
         sequence_ids.update(pattern.seq_ids)
         seq_ids_per_pattern.append(tuple(pattern.seq_ids))
         if detailed:
             if rule:
-                pattern_items.update([ce_mapping.code_to_event[str(item)]['parent'] for item in pattern.LHS])
-                pattern_items.add(ce_mapping.code_to_event[str(pattern.RHS)]['parent'])
+                pattern_items.update([mapping.code_to_event[str(item)]['parent'] for item in pattern.LHS])
+                pattern_items.add(mapping.code_to_event[str(pattern.RHS)]['parent'])
             else:
-                pattern_items.update([ce_mapping.code_to_event[str(item)]['parent'] for item in pattern.items])
+                pattern_items.update([mapping.code_to_event[str(item)]['parent'] for item in pattern.items])
 
     return tuple(sequence_ids), tuple(seq_ids_per_pattern), tuple(pattern_items)
 
 
+def store_pattern_set(patterns: list, rule=True, config: dict = None, filter: dict = None, data='airport') -> str:
+    '''
+    stores mined patterns on the server for later selections in front-end
+
+    :param patterns: list of Rule/FrequentItemSet objects returned for config and filter
+    :return: result handle of the pattern set, same for the same dataset version, config and filter
+    '''
+    handle = make_key('pattern_set', dataset_version(data), data, rule, config, filter)
+    pattern_store.put(handle, patterns, data, rule)
+    return handle
+
+
+def get_distribution_data(handle: str, pattern_ids: list) -> dict:
+    '''
+    :param handle: result handle returned by /rules or /fis
+    :param pattern_ids: ids of the selected patterns
+    :return: data series of the sequences of the selected patterns for distribution analysis in front-end
+        raises PatternSetExpired if the handle is unknown or expired
+    '''
+    data, rule, patterns = pattern_store.get(handle, pattern_ids)
+    sequence_ids, seq_ids_per_pattern, pattern_items = get_sequences_of_patterns(patterns, detailed=True, rule=rule,
+                                                                                 data=data)
+    sunburst, heatmap, pc = get_views_by_sequence_ids(sequence_ids, seq_ids_per_pattern, data=data)
+    result = {
+        'heatmap': heatmap,
+        'sunburst': sunburst,
+        'pc': pc
+    }
+    if data == 'airport':
+        result.update(get_performance(sequence_ids, pattern_items, rule))
+    else:
+        # performance details are only available for the airport dataset
+        result.update({'performance_rows': [], 'performance_columns': []})
+    return result
+
+
 @lru_cache()
 def get_views_by_sequence_ids(sequence_ids: list = None, seq_ids_per_pattern: List[list] = None,
                               data='airport') -> Tuple:
@@ -254,11 +448,13 @@ def get_views_by_sequence_ids(sequence_ids: list = None, seq_ids_per_pattern: Li
         flaredown data: sunburst and map, only for all the records
     '''
     if data == 'flaredown':
+        user_demographics = datasets.get('user_demographics')
         sunburst = get_sunburst_format(user_demographics[user_demographics['user_id'].isin(sequence_ids)],
                                        ['sex', 'age_group'])
         map_series = get_demo_map(sequence_ids)
         return sunburst, map_series, {}
 
+    flat_flight_tid = datasets.get('flat_flight_tid')
     if sequence_ids is None:
         # show all the sequences info
         sunburst = get_sunburst_format(flat_flight_tid, ['Stand', 'Performance', 'AL', 'A/C Type'])
@@ -291,14 +487,11 @@ def filter_flaredown_records(filter: dict) -> set:
     :param filter: filtering options for sequences/transactions in Flaredown
     :return: set of user ids filtered by age, sex and country
     '''
-    age_group = filter['age']
-    sex = filter['sex']
-    countries = filter['countries']
-    ids = set(user_demographics.query("age_group in @age_group & sex in @sex")['user_id'])
-    if len(countries) != 0:
-        ids = ids.intersection(
-            user_demographics.query("country in @countries")['user_id'])
-    return ids
+    index = get_facet_index('flaredown')
+    rows = index.select('age_group', filter['age']) & index.select('sex', filter['sex'])
+    if len(filter['countries']) != 0:
+        rows &= index.select('country', filter['countries'])
+    return index.record_ids(rows)
 
 
 @lru_cache()
@@ -307,55 +500,72 @@ def filter_airport_records(filter: dict) -> set:
     :param filter: filtering options for sequences/transactions in airport dataset
     :return: set of turnaround ids filtered by stand, airline and weather condition range
     '''
-    stand = filter['stand']
-    airline = filter['airline']
-    at_min = filter['at'][0]
-    at_max = filter['at'][1]
-    gt_min = filter['gt'][0]
-    gt_max = filter['gt'][1]
-    rh_min = filter['humid'][0]
-    rh_max = filter['humid'][1]
+    index = get_facet_index('airport')
+    return index.record_ids(index.select('Stand', filter['stand']) & index.select('AL', filter['airline']) &
+                            _get_weather_rows(index, filter))
+
+
+def _get_weather_rows(index: FacetIndex, filter: dict):
+    return (index.between('AT', filter['at'][0], filter['at'][1]) &
+            index.between('GT', filter['gt'][0], filter['gt'][1]) &
+            index.between('RH', filter['humid'][0], filter['humid'][1]))
 
-    ids = set()
-    ids.update(flat_flight_tid.query("Stand in @stand & AL in @airline")['Turnaround ID'])
-    ids = ids.intersection(
-        weather_tid_df.query("AT>=@at_min & AT<=@at_max & GT>=@gt_min & GT<=@gt_max & RH>=@rh_min & RH<=@rh_max")
-        ['Turnaround ID'])
-    return ids
+
+def get_filter_counts(filter: dict, data='airport') -> dict:
+    '''
+    :param filter: filtering options for sequences/transactions, as for get_tids_from_query
+    :param data: dataset identifier: 'airport' or 'flaredown'
+    :return: number of records of every option of the categorical filters, among the records matching the other
+        filters, e.g. {'stand': {'A': 120, ...}, 'airline': {...}}
+    '''
+    index = get_facet_index(data)
+    if data == 'airport':
+        counts = index.facet_counts({'Stand': filter['stand'], 'AL': filter['airline']},
+                                    _get_weather_rows(index, filter))
+        return {'stand': counts['Stand'], 'airline': counts['AL']}
+    # no selected country means all countries
+    counts = index.facet_counts({'age_group': filter['age'], 'sex': filter['sex'],
+                                 'country': filter['countries'] or list(index.categories['country'])})
+    return {'age': counts['age_group'], 'sex': counts['sex'], 'country': counts['country']}
 
 
-def filter_by_event(sequences_df: pd.DataFrame, event_filters: list, data='airport') -> pd.DataFrame:
+def filter_by_event(sequences_df: pd.DataFrame, event_filters: list, data='airport', itemset=False) -> pd.DataFrame:
     '''
     :param sequences_df: sequences/transactions meta information dataframe
     :param event_filters: filtering options for sequences/transactions
     :param data: dataset identifier: 'airport' or 'flaredown'
+    :param itemset: if sequences_df holds transactions or sequences
     :return: dataframe of filtered turnaround/users
     '''
     if data == 'airport':
-        return filter_by_event_code(sequences_df, event_filters, 'Sequence')
+        return filter_by_event_code(sequences_df, event_filters, 'Sequence', index=get_bitmap_index(data, itemset))
     else:
-        return filter_by_event_name(sequences_df, event_filters, 'Sequence_flat')
+        return filter_by_event_name(sequences_df, event_filters, 'Sequence_flat', index=get_bitmap_index(data))
 
 
 def filter_by_event_code(sequences_df: pd.DataFrame, event_filters: list, seq_col: str,
-                         all_filters=True) -> pd.DataFrame:
+                         all_filters=True, index: BitmapIndex = None) -> pd.DataFrame:
     '''
     :param sequences_df: dataframe of transactions/sequences
     :param event_filters: list of item/event number codes for filtering transactions/sequences
     :param seq_col: transaction/sequence column in dataframe
     :param all_filters: if True each transaction/sequence must contain all elements of event_filters else at least one
+    :param index: bitmap index of the dataset sequences_df is taken from, built from sequences_df if None
     :return: dataframe of filtered turnaround/users
     '''
     if len(event_filters) == 0:
         return sequences_df
 
-    return sequences_df[
-        sequences_df[seq_col].apply(
-            lambda sequence: all(int(event) in sequence for event in event_filters) if all_filters else
-            any(int(event) in sequence for event in event_filters))]
+    if index is None:
+        index = BitmapIndex(sequences_df, seq_col)
+    subset = not sequences_df.index.equals(index.labels)
+    bitmap = index.bitmap([int(event) for event in event_filters], all_items=all_filters,
+                          rows=index.mask(sequences_df.index) if subset else None)
+    return sequences_df.take(index.subset_positions(bitmap, sequences_df.index))
 
 
-def filter_by_event_name(sequences_df: pd.DataFrame, event_filters: list, seq_col: str) -> pd.DataFrame:
+def filter_by_event_name(sequences_df: pd.DataFrame, event_filters: list, seq_col: str,
+                         index: BitmapIndex = None) -> pd.DataFrame:
     '''
     filters records by item/event names. The match is not strict and is done by checking if the filters are substrings
         of record item/event names. Any record that has at least one match is included.
@@ -363,6 +573,7 @@ def filter_by_event_name(sequences_df: pd.DataFrame, event_filters: list, seq_co
     :param sequences_df: ataframe of transactions/sequences
     :param event_filters: list of item/event names for filtering transactions/sequences
     :param seq_col: transaction/sequence column in dataframe
+    :param index: bitmap index of the dataset sequences_df is taken from
     :return: dataframe of filtered turnaround/users
     '''
     codes = []
@@ -372,42 +583,61 @@ def filter_by_event_name(sequences_df: pd.DataFrame, event_filters: list, seq_co
 
     for event in event_filters:
         if len(event) != 0:
-            codes.extend([value['code'] for key, value in fl_mapping.event_to_code.items() if event in key.lower()])
+            codes.extend(get_event_name_index('flaredown').search(event, lowercase=False))
 
     if len(codes) == 0:  # query didn't match anything in the dictionary
         return pd.DataFrame()
-    return filter_by_event_code(sequences_df, codes, seq_col, all_filters=False)
+    return filter_by_event_code(sequences_df, codes, seq_col, all_filters=False, index=index)
 
 
-def get_df_setup(data='airport', itemset=False) -> Tuple[pd.DataFrame, str, bool]:
+def get_df_setup(data='airport', itemset=False, backend: str = None) -> Tuple[pd.DataFrame, str, bool]:
     '''
     :param data: dataset identifier: 'airport' or 'flaredown'
     :param itemset: if the transaction dataframe should be returned or sequence
+    :param backend: mining backend, the native backend reads the records directly instead of SPMF input lines. By
+        default mining_backend
     :return: dataframe of records for mining, column of records, if the records are already in SPMF input format
     '''
+    if backend is None:
+        backend = mining_backend
     if data == 'flaredown':
-        sequences_df = flaredown_df
-        seq_col = 'spmf_transaction_line' if itemset else 'spmf_sequence_line'
-        is_spmf_format = True
+        sequences_df = datasets.get('flaredown_df')
+        if backend == 'native':
+            seq_col = 'Sequence_flat' if itemset else 'Sequence'
+            is_spmf_format = False
+        else:
+            seq_col = 'spmf_transaction_line' if itemset else 'spmf_sequence_line'
+            is_spmf_format = True
     else:
-        sequences_df = delta_labels_df if itemset else labels_df
+        sequences_df = datasets.get('delta_labels_df' if itemset else 'labels_df')
         seq_col = 'Sequence'
         is_spmf_format = False
     return sequences_df, seq_col, is_spmf_format
 
 
-@lru_cache()
+@lru_cache(maxsize=16)
+@result_cache.cached('rules', version=dataset_version)
 def get_sequential_rules(config: dict = None, filter: dict = None, allow_too_many=False, remove_redundant=True,
-                         data='airport') -> Tuple[list, list]:
+                         data='airport') -> Tuple[list, list, int]:
     '''
-    :param config: data mining configuration
+    :param config: data mining configuration, with 'top_k' set only the top_k rules with the highest support are mined
+        (support is ignored)
     :param filter: sequence filtering configuration
-    :param allow_too_many: allow parsing of high number of patterns. If False, function returns without post-processing
+    :param allow_too_many: allow post-processing of high number of patterns. If False, only the max_rules
+        (non-redundant) rules with the highest support are kept
     :param remove_redundant: if True, removes redundant rules in post-processing
     :param data: dataset identifier: 'airport' or 'flaredown'
-    :return: list of Rule objects and list of sequence ids used for data mining
-    '''
-    sequences_df, seq_col, is_spmf_format = get_df_setup(data, False)
+    :return: PatternCollection of Rule objects, list of sequence ids used for data mining and the number of rules
+        before the cut to the top rules (None if no rule was cut)
+    :raises TooManyPatterns: if the native miner found more than max_mined_patterns rules, or SPMF exceeded its output
+        size cap or ran out of memory
+    '''
+    backend = _get_backend(config)
+    top_k = int(config['top_k']) if config is not None and config.get('top_k') else None
+    if top_k is not None:
+        backend = 'native'  # top-k rules are only mined in-process
+    sequences_df, seq_col, is_spmf_format = get_df_setup(data, False, backend=backend)
+    total = None
 
     #NDA restrictions
     if data=='airport':
@@ -420,47 +650,88 @@ def get_sequential_rules(config: dict = None, filter: dict = None, allow_too_man
             confidence = config['confidence']
             window = config['window']
             if filter is not None:
+                report_stage('filtering')
                 filtered_tids = get_tids_from_query(filter, data)
                 sequences_df = sequences_df[sequences_df[_get_id_col(data)].isin(filtered_tids)]
                 sequences_df = filter_by_event(sequences_df, filter['events'], data=data)
                 print("#sequences after filtering: " + str(sequences_df.shape[0]))
                 if sequences_df.shape[0] == 0:
-                    return [], []
-            output_file = mine_patterns(list(sequences_df[seq_col]), support=support, confidence=confidence, window=window,
-                                    is_spmf_format=is_spmf_format)
+                    return PatternCollection(), [], None
+            mining_key = (data, 'rules', filter, window, backend)
+            # top-k results are not complete for any support threshold, they are not kept in mined_results
+            rules = mined_results.get(mining_key, support, confidence) if top_k is None else None
+            if rules is None:
+                report_stage('mining')
+                rules = mine_patterns(list(sequences_df[seq_col]), support=support, confidence=confidence,
+                                      window=window, is_spmf_format=is_spmf_format,
+                                      ids=list(sequences_df[_get_id_col(data)]), backend=backend, top_k=top_k)
+                if top_k is None:
+                    mined_results.put(mining_key, support, confidence, rules)
         else:
-            output_file = "pattern_mining/data/spmf/TRuleGrowth_out.txt"
+            print('start parsing the rules')
+            rules = parse_rules("pattern_mining/data/spmf/TRuleGrowth_out.txt")
+        report_stage('post-processing')
+        rules, total = post_process_rules(rules, remove_redundant, allow_too_many)
+        if config is None or backend != 'native':
+            # the native miner already sets the sequence ids of each rule
+            rules = get_sequences_per_rule(rules, sequences_df, data=data,
+                                           index=get_position_index() if data == 'airport' else None)
 
-        # Rule Parsing and Matrix generation
-        print('start parsing the rules')
-        rules = parse_rules(output_file)
-        if config is not None: remove_file(output_file)
-        print(str(len(rules)) + " before redundancy removal")
-        if len(rules) > 2000 and not allow_too_many:
-            return None, None
-        if remove_redundant:
-            rules = remove_redundant_rules(rules)
-        print(str(len(rules)) + " after redundancy removal")
-        rules = get_sequences_per_rule(rules, sequences_df, data=data)
+    return PatternCollection(rules), sequences_df[_get_id_col(data)], total
 
-    return rules, sequences_df[_get_id_col(data)]
 
+def post_process_rules(rules: list, remove_redundant=True, allow_too_many=False) -> Tuple[list, int]:
+    '''
+    :param rules: RuleTable or list of Rule objects
+    :param remove_redundant: if True, removes redundant rules
+    :param allow_too_many: if False, only the max_rules rules with the highest support are kept
+    :return: the rules and the number of rules before they were cut to the top rules, None if no rule was cut
+    '''
+    print(str(len(rules)) + " before redundancy removal")
+    if remove_redundant:
+        rules = remove_redundant_rules(rules)
+    print(str(len(rules)) + " after redundancy removal")
+    # the top rules are selected among the non-redundant ones, so a redundant rule never takes the place of one that
+    # would be kept
+    if len(rules) <= max_rules or allow_too_many:
+        return rules, None
+    return select_top_rules(rules, max_rules), len(rules)
 
-@lru_cache()
-def get_rules_graph_matrix_views(rules: list, s_ids: list, data='airport') -> dict:
+
+def get_effective_thresholds(rules: list, s_ids: list) -> dict:
     '''
     :param rules: list of Rule objects
     :param s_ids: list of sequence ids used for data mining
+    :return: dictionary of the lowest support (percentage) and confidence (percentage) of the rules, the thresholds
+        actually reached when rules are cut to the top rules
+    '''
+    if len(rules) == 0 or len(s_ids) == 0:
+        return {'support': None, 'confidence': None}
+    return {'support': round(100 * min(rule.support for rule in rules) / len(s_ids), 2),
+            'confidence': round(100 * min(rule.confidence for rule in rules), 2)}
+
+
+@lru_cache(maxsize=16)
+@result_cache.cached('rule_views', version=dataset_version)
+def get_rules_graph_matrix_views(rules: PatternCollection, s_ids: list, data='airport', centrality='approximate',
+                                 centrality_pivots: int = None) -> dict:
+    '''
+    :param rules: PatternCollection of Rule objects
+    :param s_ids: list of sequence ids used for data mining
     :param data: dataset identifier: 'airport' or 'flaredown'
+    :param centrality: centrality method of the DAG nodes: 'exact', 'approximate' or 'none'
+    :param centrality_pivots: number of pivots of approximate centrality, by default depends on DAG size
     :return: dictionary of DAG forest, rule matrices and data series for distribution analysis in front-end
     '''
-    sequences_df = labels_df if data == 'airport' else flaredown_df
+    sequences_df = datasets.get('labels_df' if data == 'airport' else 'flaredown_df')
     sequences_df = sequences_df[sequences_df[_get_id_col(data)].isin(s_ids)]
 
     # DAG matrices
+    report_stage('building views')
     print("generating DAGS")
     rd = RuleDAG(tagged=False, data=data)
-    matrices, full_graph = rd.create_matrices(rules, cluster=False, id_as_column=True)
+    matrices, full_graph = rd.create_matrices(rules, cluster=False, id_as_column=True, centrality=centrality,
+                                              centrality_pivots=centrality_pivots)
     print(str(len(matrices)) + " matrices found")
 
     view1_list = []
@@ -476,7 +747,7 @@ def get_rules_graph_matrix_views(rules: list, s_ids: list, data='airport') -> di
     else:
         for matrix in matrices:
             rule_ids = matrix.index
-            sequence_ids, seq_ids_per_pattern, pattern_items = get_sequences_by_pattern_id(tuple(rules),
+            sequence_ids, seq_ids_per_pattern, pattern_items = get_sequences_by_pattern_id(rules,
                                                                                            tuple(rule_ids))
             view1, view2, view3 = get_views_by_sequence_ids(sequence_ids, seq_ids_per_pattern)
             view1_list.append(view1)
@@ -511,15 +782,19 @@ def get_rules_graph_matrix_views(rules: list, s_ids: list, data='airport') -> di
     return views_dict
 
 
-@lru_cache()
+@lru_cache(maxsize=16)
+@result_cache.cached('fis', version=dataset_version)
 def get_frequent_itemsets(config: dict = None, filter: dict = None, data='airport') -> tuple:
     '''
     :param config: data mining configuration
     :param filter: transaction filtering configuration
     :param data: dataset identifier: 'airport' or 'flaredown'
-    :return: list of FrequentItemSet objects and list of transaction ids used for data mining
+    :return: PatternCollection of FrequentItemSet objects and list of transaction ids used for data mining
+    :raises TooManyPatterns: if the native miner found more than max_mined_patterns itemsets, or SPMF exceeded its
+        output size cap or ran out of memory
     '''
-    sequences_df, seq_col, is_spmf_format = get_df_setup(data, True)
+    backend = _get_backend(config)
+    sequences_df, seq_col, is_spmf_format = get_df_setup(data, True, backend=backend)
 
     if data=='airport':
         with open('pattern_mining/data/HIAA_anonymized/fis.pkl', 'rb') as f:
@@ -529,32 +804,42 @@ def get_frequent_itemsets(config: dict = None, filter: dict = None, data='airpor
         if config is not None:
             support = config['support']
             if filter is not None:
+                report_stage('filtering')
                 filtered_tids = get_tids_from_query(filter, data)
                 sequences_df = sequences_df[sequences_df[_get_id_col(data)].isin(filtered_tids)]
-                sequences_df = filter_by_event(sequences_df, filter['events'], data=data)
+                sequences_df = filter_by_event(sequences_df, filter['events'], data=data, itemset=True)
                 print("#sequences after filtering: " + str(sequences_df.shape[0]))
                 if sequences_df.shape[0] == 0:
-                    return [], []
-            output_file = mine_patterns(list(sequences_df[seq_col]), support=support, itemset=True,
-                                    is_spmf_format=is_spmf_format)
+                    return PatternCollection(), []
+            mining_key = (data, 'fis', filter, backend)
+            freqitemsets = mined_results.get(mining_key, support)
+            if freqitemsets is None:
+                report_stage('mining')
+                freqitemsets = mine_patterns(list(sequences_df[seq_col]), support=support, itemset=True,
+                                             is_spmf_format=is_spmf_format, ids=list(sequences_df[_get_id_col(data)]),
+                                             backend=backend)
+                mined_results.put(mining_key, support, None, freqitemsets)
         else:
-            output_file = "pattern_mining/data/spmf/FPGrowth_itemsets_out.txt"
+            freqitemsets = parse_itemsets("pattern_mining/data/spmf/FPGrowth_itemsets_out.txt")
 
-        freqitemsets = parse_itemsets(output_file)
-        if config is not None: remove_file(output_file)
-        freqitemsets = get_sequences_per_fis(freqitemsets, sequences_df, data=data)
+        report_stage('post-processing')
+        if config is None or backend != 'native':
+            freqitemsets = get_sequences_per_fis(freqitemsets, sequences_df, data=data,
+                                                 index=get_bitmap_index(data, True))
 
-    return freqitemsets, sequences_df[_get_id_col(data)]
+    return PatternCollection(freqitemsets), sequences_df[_get_id_col(data)]
 
 
-@lru_cache()
-def get_fis_matrix_views(fis: list, s_ids: list, data='airport') -> dict:
+@lru_cache(maxsize=16)
+@result_cache.cached('fis_views', version=dataset_version)
+def get_fis_matrix_views(fis: PatternCollection, s_ids: list, data='airport') -> dict:
     '''
-    :param fis: list of FrequentItemSet objects
+    :param fis: PatternCollection of FrequentItemSet objects
     :param s_ids: list of transaction ids used for data mining
     :param data: dataset identifier: 'airport' or 'flaredown'
     :return: dictionary of pattern matrix and data series for distribution analysis in front-end
     '''
+    report_stage('building views')
     matrix = ItemsetGraph(data=data).create_matrix(fis)
     headers = [c for c in matrix.columns if c not in ["rid", "level", "group", "support"]]
     headers.append("support")  # must be the last one on front end!
@@ -578,8 +863,10 @@ def get_filter_options(data='airport') -> dict:
     :return: filtering options for datasets
     '''
     if data == 'airport':
+        flat_flight_tid = datasets.get('flat_flight_tid')
+        weather_tid_df = datasets.get('weather_tid_df')
         return {
-            'events': [{'value': code, 'text': d['event']} for code, d in ce_mapping.code_to_event.items() if
+            'events': [{'value': code, 'text': d['event']} for code, d in get_mapping().code_to_event.items() if
                        'parent' in d],
             'stand': list(flat_flight_tid['Stand'].unique()),
             'airline': list(flat_flight_tid['AL'].unique()),
@@ -590,6 +877,7 @@ def get_filter_options(data='airport') -> dict:
             'humid': {'min': int(math.floor(weather_tid_df['RH'].min())),
                       'max': int(math.ceil(weather_tid_df['RH'].max()))},
         }
+    user_demographics = datasets.get('user_demographics')
     return {
         'age': list(user_demographics['age_group'].unique()),
         'sex': list(user_demographics['sex'].unique()),
@@ -0,0 +1,290 @@
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from typing import Callable, List
+
+'''
+Lazy, binary-format loading of the dataset tables.
+
+Tables used to be read from pickles and CSV files when post_processing.utils was imported, so every server process
+paid for all of them at start, even for a single dataset. The DatasetStore loads each registered table on first use.
+
+The first load of a table converts its source file into a columnar binary directory:
+    meta.json: format version, source size/mtime, column order and index
+    <column number>.npy: numeric, boolean and datetime columns, loaded memory-mapped (read-only, no parsing, pages are
+        shared with the other processes reading the same file)
+    <column number>.codes.npy: string columns with few distinct values, dictionary-encoded as memory-mapped codes into
+        their distinct values
+    objects.pkl: the remaining columns (lists, unique strings), distinct values of the encoded columns, column labels
+        and index
+Later loads read the binary directory as long as the source file is unchanged. Tables can be converted ahead of time
+with:
+    python -m pattern_mining.pre_processing.dataset_store
+
+Load time, format and size of each table and the boot time of the server are kept in metrics().
+
+Sharing the tables across gunicorn workers: the memory-mapped files are shared by the page cache, and with preload()
+called in the gunicorn master (see gunicorn.conf.py) the rest of the tables is loaded once and inherited by the forked
+workers, instead of being loaded again by each worker. Dictionary encoding keeps the number of Python string objects of
+a table small, so reading the inherited tables touches (and copies on write) only a few pages.
+'''
+
+FORMAT_VERSION = 2
+
+
+def _source_stamp(source: str) -> list:
+    stat = os.stat(source)
+    return [stat.st_size, stat.st_mtime]
+
+
+def _is_array_column(series: pd.Series) -> bool:
+    return isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufmM'
+
+
+def _encode(series: pd.Series):
+    '''
+    :return: tuple of codes and distinct values if the column only has strings and repeats them, otherwise None
+    '''
+    if series.dtype.kind not in 'OU' and not isinstance(series.dtype, pd.StringDtype):
+        return None
+    if series.isna().any() or not all(isinstance(value, str) for value in series):
+        return None
+    codes, categories = pd.factorize(series)
+    if len(categories) > len(series) // 2:
+        return None
+    return codes.astype(np.int32 if len(categories) > np.iinfo(np.int16).max else np.int16), categories
+
+
+def write_table(df: pd.DataFrame, directory: str, source: str = None):
+    '''
+    writes a DataFrame in the binary table format, the directory is replaced atomically
+
+    :param df: table
+    :param directory: binary table directory
+    :param source: source file of the table, its size and modification time are stored to detect changes
+    '''
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    temp = os.path.join(parent, '.' + os.path.basename(directory) + '-' + uuid.uuid4().hex)
+    os.makedirs(temp)
+
+    columns = []
+    objects = {}
+    for position, column in enumerate(df.columns):
+        series = df.iloc[:, position]
+        encoded = None if _is_array_column(series) else _encode(series)
+        if _is_array_column(series):
+            np.save(os.path.join(temp, str(position) + '.npy'), series.to_numpy())
+            columns.append({'name': str(column), 'file': str(position) + '.npy'})
+        elif encoded is not None:
+            np.save(os.path.join(temp, str(position) + '.codes.npy'), encoded[0])
+            objects[position] = (np.asarray(encoded[1], dtype=object), series.dtype)
+            columns.append({'name': str(column), 'file': str(position) + '.codes.npy', 'encoded': True})
+        else:
+            objects[position] = series.reset_index(drop=True)
+            columns.append({'name': str(column), 'file': None})
+
+    if isinstance(df.index, pd.RangeIndex):
+        index = {'start': df.index.start, 'step': df.index.step}
+    else:
+        objects['index'] = df.index
+        index = None
+    objects['columns'] = df.columns
+    with open(os.path.join(temp, 'objects.pkl'), 'wb') as f:
+        pickle.dump(objects, f, protocol=pickle.HIGHEST_PROTOCOL)
+    with open(os.path.join(temp, 'meta.json'), 'w') as f:
+        json.dump({'version': FORMAT_VERSION, 'source': _source_stamp(source) if source else None, 'rows': len(df),
+                   'columns': columns, 'index': index}, f)
+
+    # another process may have converted the same table in the meantime, the last one wins
+    if os.path.exists(directory):
+        old = temp + '-old'
+        os.rename(directory, old)
+        shutil.rmtree(old, ignore_errors=True)
+    try:
+        os.rename(temp, directory)
+    except OSError:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def is_current(directory: str, source: str = None) -> bool:
+    '''
+    :return: True if the binary table exists, has the current format and was converted from the current source file
+    '''
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if meta.get('version') != FORMAT_VERSION:
+        return False
+    return source is None or meta.get('source') == _source_stamp(source)
+
+
+def read_table(directory: str, mmap=True) -> pd.DataFrame:
+    '''
+    :param directory: binary table directory
+    :param mmap: memory-map the array columns instead of reading them into memory
+    :return: DataFrame, array columns are read-only views of the memory-mapped files
+    '''
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    with open(os.path.join(directory, 'objects.pkl'), 'rb') as f:
+        objects = pickle.load(f)
+
+    if meta['index'] is not None:
+        index = pd.RangeIndex(meta['index']['start'], meta['index']['start'] + meta['rows'] * meta['index']['step'],
+                              meta['index']['step'])
+    else:
+        index = objects['index']
+
+    data = {}
+    for position, column in enumerate(meta['columns']):
+        if column['file'] is not None:
+            # plain ndarray view of the np.memmap, pandas does not expect the subclass
+            values = np.asarray(np.load(os.path.join(directory, column['file']), mmap_mode='r' if mmap else None))
+            if column.get('encoded'):
+                # every row refers to one of the few string objects of the distinct values
+                categories, dtype = objects[position]
+                values = pd.Series(categories.take(values), index=index, dtype=dtype, copy=False)
+        else:
+            # kept as a Series, so object columns are not inferred to another dtype
+            values = objects[position].set_axis(index)
+        data[position] = values
+    # copy=False keeps every array column as its own block, pointing to the memory-mapped file
+    df = pd.DataFrame(data, index=index, copy=False)
+    df.columns = objects['columns']
+    return df
+
+
+class DatasetStore:
+
+    def __init__(self, directory: str, mmap=True):
+        '''
+        :param directory: directory of the binary tables
+        :param mmap: memory-map the array columns of the binary tables
+        '''
+        self.directory = directory
+        self.mmap = mmap
+        self.created = time.time()
+        self.boot_seconds = None
+        self._tables = {}
+        self._loaded = {}
+        self._metrics = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, source: str, reader: Callable[[str], pd.DataFrame],
+                 postprocess: Callable[[pd.DataFrame], pd.DataFrame] = None):
+        '''
+        :param name: table name
+        :param source: source file of the table
+        :param reader: function reading the source file, e.g. pd.read_csv
+        :param postprocess: function applied to the table after every load (not stored in the binary format)
+        '''
+        self._tables[name] = (source, reader, postprocess)
+        self._locks[name] = threading.Lock()
+
+    def _binary_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def convert(self, names: List[str] = None, force=False) -> List[str]:
+        '''
+        converts source files of tables to the binary format
+
+        :param names: table names, all registered tables by default
+        :param force: convert even if the binary table is current
+        :return: names of the converted tables
+        '''
+        converted = []
+        for name in names if names is not None else self._tables:
+            source, reader, _ = self._tables[name]
+            if not os.path.exists(source):
+                continue
+            if force or not is_current(self._binary_path(name), source):
+                write_table(reader(source), self._binary_path(name), source)
+                converted.append(name)
+        return converted
+
+    def get(self, name: str) -> pd.DataFrame:
+        '''
+        :param name: table name
+        :return: the table, loaded on first use
+        '''
+        table = self._loaded.get(name)
+        if table is not None:
+            return table
+        with self._locks[name]:
+            if name not in self._loaded:
+                self._loaded[name] = self._load(name)
+        return self._loaded[name]
+
+    def _load(self, name: str) -> pd.DataFrame:
+        source, reader, postprocess = self._tables[name]
+        start = time.time()
+        binary = self._binary_path(name)
+        if is_current(binary, source):
+            table, table_format = read_table(binary, self.mmap), 'binary'
+        else:
+            table, table_format = reader(source), 'source'
+            try:
+                write_table(table, binary, source)
+            except OSError as e:  # e.g. read-only deployment, the source is read again next time
+                print("could not convert " + name + ": " + str(e))
+        if postprocess is not None:
+            table = postprocess(table)
+        seconds = time.time() - start
+        with self._lock:
+            self._metrics[name] = {'format': table_format, 'rows': table.shape[0], 'load_seconds': round(seconds, 4)}
+        print("loaded " + name + " from " + table_format + " in " + str(round(seconds, 3)) + "s")
+        return table
+
+    def preload(self, names: List[str] = None) -> List[str]:
+        '''
+        converts and loads tables before they are used, e.g. in the gunicorn master so that the forked workers share
+        them
+
+        :param names: table names, all registered tables with an existing source file by default
+        :return: names of the loaded tables
+        '''
+        names = [name for name in (names if names is not None else self._tables)
+                 if os.path.exists(self._tables[name][0])]
+        self.convert(names)
+        for name in names:
+            self.get(name)
+        return names
+
+    def report_boot(self, since: float = None):
+        '''
+        records the boot time of the server
+
+        :param since: start time of the server process, the creation time of the store by default
+        '''
+        self.boot_seconds = round(time.time() - (since if since is not None else self.created), 4)
+        print("boot time: " + str(self.boot_seconds) + "s")
+
+    def metrics(self) -> dict:
+        '''
+        :return: dictionary of boot time and load metrics of the loaded tables
+        '''
+        with self._lock:
+            return {'boot_seconds': self.boot_seconds, 'tables': dict(self._metrics),
+                    'not_loaded': [name for name in self._tables if name not in self._metrics]}
+
+
+if __name__ == '__main__':
+    import argparse
+    from pattern_mining.post_processing import utils
+
+    parser = argparse.ArgumentParser(description='converts the dataset tables to the binary format')
+    parser.add_argument('tables', nargs='*', help='table names, all tables by default')
+    parser.add_argument('--force', action='store_true', help='convert tables that are already current')
+    args = parser.parse_args()
+    for name in utils.datasets.convert(args.tables or None, args.force):
+        print("converted " + name)
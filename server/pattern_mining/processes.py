@@ -0,0 +1,15 @@
+import os
+
+
+def pid_alive(pid: int) -> bool:
+    '''
+    :param pid: process id
+    :return: True if a process with the id exists (it may belong to another user)
+    '''
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # exists, owned by another user
+        return True
+    return True
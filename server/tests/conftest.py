@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# tests run against the server package with the same relative data paths as the app, caches go to a temporary
+# directory
+server_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, server_dir)
+os.chdir(server_dir)
+os.environ.setdefault('RESULT_CACHE_DIR', tempfile.mkdtemp(prefix='serviz-test-cache-'))
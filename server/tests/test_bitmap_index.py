@@ -0,0 +1,59 @@
+import random
+import pandas as pd
+import pytest
+from pattern_mining.post_processing.bitmap_index import BitmapIndex
+
+
+def random_df(seed: int, count: int = 150, items: int = 12) -> pd.DataFrame:
+    rng = random.Random(seed)
+    records = [[rng.randrange(items) if rng.random() < 0.7 else tuple(rng.sample(range(items), 2))
+                for _ in range(rng.randint(0, 6))] for _ in range(count)]
+    # index labels are not row positions, as in filtered dataframes
+    return pd.DataFrame({'Sequence': records, 'id': ['r' + str(i) for i in range(count)]},
+                        index=[3 * i + 7 for i in range(count)])
+
+
+def items_of(record: list) -> set:
+    return set(item for element in record for item in (element if isinstance(element, tuple) else (element,)))
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_bitmaps_match_scan(seed):
+    df = random_df(seed)
+    index = BitmapIndex(df, 'Sequence', 'id')
+    rng = random.Random(seed)
+    subset = sorted(rng.sample(list(df.index), 60))
+    rows = index.mask(subset)
+    for _ in range(30):
+        items = rng.sample(range(14), rng.randint(1, 3))  # items 12 and 13 are in no record
+        for all_items in (True, False):
+            expected = [row_id for label, record, row_id in zip(df.index, df['Sequence'], df['id'])
+                        if (set(items) <= items_of(record) if all_items else set(items) & items_of(record))]
+            bitmap = index.bitmap(items, all_items=all_items)
+            assert index.seq_ids(bitmap) == expected
+            assert index.count(bitmap) == len(expected)
+            in_subset = set(df.loc[subset, 'id'])
+            assert index.seq_ids(index.bitmap(items, all_items=all_items, rows=rows)) == \
+                [row_id for row_id in expected if row_id in in_subset]
+
+
+def test_empty_itemset_is_all_rows():
+    df = random_df(0, count=70)
+    index = BitmapIndex(df, 'Sequence', 'id')
+    assert index.count(index.bitmap([])) == 70
+    assert index.count(index.bitmap([], all_items=False)) == 0
+    assert index.count(index.mask()) == 70
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_subset_rows_are_taken_by_position(seed):
+    df = random_df(seed)
+    index = BitmapIndex(df, 'Sequence', 'id')
+    rng = random.Random(seed)
+    # filtered and reordered subsets of the indexed dataframe, and the dataframe itself
+    subsets = [df.loc[rng.sample(list(df.index), 80)] for _ in range(5)] + [df]
+    for subset in subsets:
+        items = rng.sample(range(12), rng.randint(1, 2))
+        bitmap = index.bitmap(items, all_items=False, rows=index.mask(subset.index))
+        expected = subset[[bool(items_of(record) & set(items)) for record in subset['Sequence']]]
+        assert subset.take(index.subset_positions(bitmap, subset.index)).equals(expected)
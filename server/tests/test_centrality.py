@@ -0,0 +1,36 @@
+import networkx as nx
+from pattern_mining.post_processing import centrality
+
+
+def random_dag(node_count: int, edge_count: int) -> nx.DiGraph:
+    graph = nx.gnm_random_graph(node_count, edge_count, seed=1, directed=True)
+    return nx.DiGraph((u, v) for u, v in graph.edges if u < v)
+
+
+def test_small_graphs_are_exact():
+    assert centrality.get_pivot_count(26) == 26
+    assert centrality.get_pivot_count(0) == 0
+
+
+def test_large_graphs_are_sampled():
+    assert centrality.get_pivot_count(500) == 100
+    assert centrality.get_pivot_count(5000) == 500
+    assert centrality.get_pivot_count(500, pivots=50) == 50
+
+
+def test_approximate_centrality_samples_pivots(monkeypatch):
+    graph = random_dag(500, 2000)
+    calls = []
+    betweenness = nx.betweenness_centrality
+
+    def record(graph, k=None, **kwargs):
+        calls.append(k)
+        return betweenness(graph, k=k, **kwargs)
+
+    monkeypatch.setattr(centrality.nx, 'betweenness_centrality', record)
+    approximate = centrality.betweenness_centrality(graph, method='approximate', pivots=80)
+    assert 0 < calls[0] < graph.number_of_nodes()
+    exact = centrality.betweenness_centrality(graph, method='exact')
+    assert calls[1] is None
+    assert set(approximate) == set(exact)
+    assert max(abs(approximate[node] - exact[node]) for node in graph.nodes) < 0.05
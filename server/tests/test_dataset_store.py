@@ -0,0 +1,71 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from pattern_mining.pre_processing.dataset_store import DatasetStore, write_table, read_table, is_current
+
+
+def sample_df(index=None) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    count = 200
+    return pd.DataFrame({
+        'Turnaround ID': np.arange(count) * 3,
+        'delta': rng.normal(size=count),
+        'late': rng.random(count) < 0.3,
+        'time': pd.date_range('2020-01-01', periods=count, freq='h'),
+        'airline': rng.choice(['AA', 'BB', 'CC'], size=count).astype(object),  # dictionary-encoded
+        'name': ['flight ' + str(i) for i in range(count)],  # unique strings, pickled
+        'Sequence': [[int(item) for item in rng.integers(0, 10, size=rng.integers(0, 5))] for _ in range(count)],
+    }, index=index)
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+@pytest.mark.parametrize('index', [None, pd.Index([5 * i + 1 for i in range(200)])])
+def test_round_trip(tmp_path, mmap, index):
+    df = sample_df(index)
+    write_table(df, str(tmp_path / 'table'))
+    assert_frame_equal(read_table(str(tmp_path / 'table'), mmap=mmap), df)
+
+
+def test_missing_and_mixed_values_round_trip(tmp_path):
+    df = pd.DataFrame({'weather': ['rain', None, 'rain', 'snow'] * 10, 'mixed': ['a', 1, 'a', 2.5] * 10,
+                       'value': [1.5, np.nan, 2.0, 3.0] * 10})
+    write_table(df, str(tmp_path / 'table'))
+    assert_frame_equal(read_table(str(tmp_path / 'table')), df)
+
+
+def test_store_loads_the_binary_table_of_the_current_source(tmp_path):
+    source = str(tmp_path / 'table.pkl')
+    df = sample_df()
+    df.to_pickle(source)
+
+    store = DatasetStore(str(tmp_path / 'binary'))
+    store.register('table', source, pd.read_pickle)
+    assert_frame_equal(store.get('table'), df)
+    assert store.metrics()['tables']['table']['format'] == 'source'
+    assert is_current(str(tmp_path / 'binary' / 'table'), source)
+
+    store = DatasetStore(str(tmp_path / 'binary'))
+    store.register('table', source, pd.read_pickle)
+    assert_frame_equal(store.get('table'), df)
+    assert store.metrics()['tables']['table']['format'] == 'binary'
+
+    # a replaced source file is read again
+    changed = df.iloc[:50]
+    changed.to_pickle(source)
+    os.utime(source, (1, 1))
+    assert not is_current(str(tmp_path / 'binary' / 'table'), source)
+    store = DatasetStore(str(tmp_path / 'binary'))
+    store.register('table', source, pd.read_pickle)
+    assert_frame_equal(store.get('table'), changed)
+    assert store.metrics()['tables']['table']['format'] == 'source'
+
+
+def test_postprocess_is_applied_after_every_load(tmp_path):
+    source = str(tmp_path / 'table.pkl')
+    sample_df().to_pickle(source)
+    for _ in range(2):
+        store = DatasetStore(str(tmp_path / 'binary'))
+        store.register('table', source, pd.read_pickle, postprocess=lambda df: df[df['late']])
+        assert store.get('table')['late'].all()
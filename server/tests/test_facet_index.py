@@ -0,0 +1,83 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from pattern_mining.post_processing.facet_index import FacetIndex
+
+colors = ['red', 'green', 'blue', 'grey']
+sizes = ['S', 'M', 'L']
+
+
+def random_tables(seed: int, count: int = 200):
+    rng = random.Random(seed)
+    ids = rng.sample(range(10 * count), count)
+    # the facets come from two tables of the same records, the second one does not have every record
+    attributes = pd.DataFrame({'id': ids, 'color': [rng.choice(colors + [None]) for _ in ids],
+                               'size': [rng.choice(sizes) for _ in ids]})
+    measured = rng.sample(ids, count // 2)
+    measures = pd.DataFrame({'id': measured, 'weight': [rng.choice([rng.uniform(0, 100), np.nan]) for _ in measured]})
+    return ids, attributes, measures
+
+
+def build_index(ids: list, attributes: pd.DataFrame, measures: pd.DataFrame) -> FacetIndex:
+    index = FacetIndex(ids)
+    index.add_categorical('color', attributes['id'], attributes['color'])
+    index.add_categorical('size', attributes['id'], attributes['size'])
+    index.add_range('weight', measures['id'], measures['weight'])
+    return index
+
+
+def naive_filter(attributes: pd.DataFrame, measures: pd.DataFrame, selections: dict, weight: tuple = None) -> set:
+    # scans the rows of the tables
+    matching = set()
+    weights = dict(zip(measures['id'], measures['weight']))
+    for row in attributes.to_dict('records'):
+        if not all(row[name] in values for name, values in selections.items()):
+            continue
+        if weight is not None and not (row['id'] in weights and weight[0] <= weights[row['id']] <= weight[1]):
+            continue
+        matching.add(row['id'])
+    return matching
+
+
+def random_selections(rng: random.Random) -> dict:
+    return {'color': rng.sample(colors + ['purple'], rng.randint(0, 3)), 'size': rng.sample(sizes, rng.randint(1, 3))}
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_filters_match_scan(seed):
+    ids, attributes, measures = random_tables(seed)
+    index = build_index(ids, attributes, measures)
+    rng = random.Random(seed)
+    for _ in range(30):
+        selections = random_selections(rng)
+        low = rng.uniform(0, 100)
+        weight = (low, low + rng.uniform(0, 50))
+        bitmap = index.select('color', selections['color']) & index.select('size', selections['size'])
+        assert index.record_ids(bitmap) == naive_filter(attributes, measures, selections)
+        bitmap &= index.between('weight', *weight)
+        assert index.record_ids(bitmap) == naive_filter(attributes, measures, selections, weight)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_facet_counts_match_scan(seed):
+    ids, attributes, measures = random_tables(seed)
+    index = build_index(ids, attributes, measures)
+    rng = random.Random(seed)
+    for _ in range(20):
+        selections = random_selections(rng)
+        low = rng.uniform(0, 100)
+        weight = (low, low + rng.uniform(0, 50))
+        counts = index.facet_counts(selections, rows=index.between('weight', *weight))
+        for name in selections:
+            # the count of a value is the number of records matching it and the selections of the other facets
+            others = {other: values for other, values in selections.items() if other != name}
+            for value, count in counts[name].items():
+                assert count == len(naive_filter(attributes, measures, dict(others, **{name: [value]}), weight))
+            assert set(counts[name]) == set(attributes[name].dropna())
+
+
+def test_unknown_ids_are_rejected():
+    index = FacetIndex([1, 2, 3])
+    with pytest.raises(ValueError):
+        index.add_categorical('color', pd.Series([1, 4]), pd.Series(['red', 'blue']))
@@ -0,0 +1,60 @@
+import random
+from itertools import combinations
+import pytest
+from pattern_mining.mining import fpgrowth
+from pattern_mining.mining.limits import TooManyPatterns
+
+
+def random_records(seed: int, count: int, items: int) -> list:
+    rng = random.Random(seed)
+    # complex records (tuples of simultaneous items) are flattened into transactions
+    return [[rng.randrange(items) if rng.random() < 0.7 else tuple(rng.sample(range(items), 2))
+             for _ in range(rng.randint(1, 6))] for _ in range(count)]
+
+
+def naive_itemsets(records: list, support: float) -> dict:
+    # counts every subset of every transaction
+    transactions = [fpgrowth.to_transaction(record) for record in records]
+    min_count = fpgrowth.get_min_count(support, len(transactions))
+    counts = {}
+    for transaction in transactions:
+        for size in range(1, len(transaction) + 1):
+            for itemset in combinations(sorted(transaction), size):
+                counts[itemset] = counts.get(itemset, 0) + 1
+    return {itemset: count for itemset, count in counts.items() if count >= min_count}
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('support', [5, 20, 50])
+def test_same_itemsets_as_naive_miner(seed, support):
+    records = random_records(seed, 40, 8)
+    ids = ['t' + str(i) for i in range(len(records))]
+    table = fpgrowth.mine_frequent_itemsets(records, ids, support)
+    expected = naive_itemsets(records, support)
+    mined = {tuple(int(item) for item in fis.items): fis for fis in table}
+    assert {itemset: fis.support for itemset, fis in mined.items()} == expected
+    transactions = [fpgrowth.to_transaction(record) for record in records]
+    for itemset, fis in mined.items():
+        assert fis.seq_ids == [ids[i] for i, transaction in enumerate(transactions) if set(itemset) <= transaction]
+
+
+def test_no_records():
+    assert len(fpgrowth.mine_frequent_itemsets([], [], 10)) == 0
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_pattern_budget(seed):
+    records = random_records(seed, 40, 8)
+    ids = ['t' + str(i) for i in range(len(records))]
+    count = len(naive_itemsets(records, 5))
+    assert len(fpgrowth.mine_frequent_itemsets(records, ids, 5, max_patterns=count)) == count
+    with pytest.raises(TooManyPatterns):
+        fpgrowth.mine_frequent_itemsets(records, ids, 5, max_patterns=count - 1)
+
+
+def test_pattern_budget_of_single_path():
+    # identical transactions make a single path tree, its 15 itemsets are counted before they are enumerated
+    records = [[0, 1, 2, 3]] * 5
+    assert len(fpgrowth.mine_frequent_itemsets(records, range(5), 50, max_patterns=15)) == 15
+    with pytest.raises(TooManyPatterns):
+        fpgrowth.mine_frequent_itemsets(records, range(5), 50, max_patterns=14)
@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+# the network figure needs plotly
+itemset_graph = pytest.importorskip('pattern_mining.post_processing.itemset_graph')
+from pattern_mining.post_processing.pattern_classes import FrequentItemSet
+
+
+def test_network_keeps_heaviest_edges_per_node():
+    # every itemset shares item 1 with all the others, and the first two also share item 2
+    fis_list = [FrequentItemSet(np.array([1, 2]), 5), FrequentItemSet(np.array([1, 2, 3]), 4)] + \
+               [FrequentItemSet(np.array([1, item]), 3) for item in range(4, 10)]
+    full = itemset_graph.ItemsetGraph()._create_graph(fis_list)
+    pruned = itemset_graph.ItemsetGraph(max_edges_per_node=2)._create_graph(fis_list)
+    assert full.number_of_edges() == len(fis_list) * (len(fis_list) - 1) // 2
+    assert max(degree for _, degree in pruned.degree) <= 2
+    assert pruned.has_edge(fis_list[0].id, fis_list[1].id)
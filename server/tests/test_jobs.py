@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from pattern_mining import jobs
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path)
+
+
+def make_manager(directory):
+    return jobs.JobManager(directory, workers=1, max_pending=4, ttl=3600)
+
+
+def insert_job(directory, job_id, status, pid, pid_start):
+    with sqlite3.connect(os.path.join(directory, 'jobs.sqlite')) as connection:
+        connection.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, 0, NULL, NULL, ?, NULL, ?)",
+                           (job_id, status, status, pid, time.time(), pid_start))
+
+
+def stored_status(directory, job_id):
+    with sqlite3.connect(os.path.join(directory, 'jobs.sqlite')) as connection:
+        return connection.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_running_jobs_of_exited_process_fail_at_startup(directory):
+    make_manager(directory)
+    insert_job(directory, 'crashed', jobs.RUNNING, exited_pid(), None)
+    insert_job(directory, 'queued', jobs.QUEUED, exited_pid(), None)
+    make_manager(directory)
+    assert stored_status(directory, 'crashed') == jobs.FAILED
+    assert stored_status(directory, 'queued') == jobs.FAILED
+
+
+@pytest.mark.skipif(jobs._process_start(os.getpid()) is None, reason='process start time needs /proc')
+def test_reused_pid_is_not_taken_as_owner(directory):
+    make_manager(directory)
+    # same pid as this process, but started at another time: the pid was reused
+    insert_job(directory, 'reused', jobs.RUNNING, os.getpid(), 'another start')
+    manager = make_manager(directory)
+    assert stored_status(directory, 'reused') == jobs.FAILED
+    assert manager.cancel('reused') is False
+
+
+def test_list_reports_orphans_and_keeps_live_jobs(directory):
+    manager = make_manager(directory)
+    release = threading.Event()
+    job_id = manager.submit(release.wait, 10)
+    insert_job(directory, 'crashed', jobs.RUNNING, exited_pid(), None)
+    try:
+        listed = {job['job_id']: job['status'] for job in manager.list()}
+        assert listed['crashed'] == jobs.FAILED
+        assert listed[job_id] in (jobs.QUEUED, jobs.RUNNING)
+    finally:
+        release.set()
+    for _ in range(50):
+        if manager.status(job_id)['status'] == jobs.DONE:
+            break
+        time.sleep(0.05)
+    assert manager.status(job_id)['status'] == jobs.DONE
+
+
+def test_database_of_earlier_version_is_migrated(directory):
+    with sqlite3.connect(os.path.join(directory, 'jobs.sqlite')) as connection:
+        connection.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT, stage TEXT, pid INTEGER, "
+                           "cancel INTEGER, result BLOB, error TEXT, created REAL, finished REAL)")
+        connection.execute("INSERT INTO jobs VALUES ('old', ?, ?, ?, 0, NULL, NULL, ?, NULL)",
+                           (jobs.RUNNING, jobs.RUNNING, exited_pid(), time.time()))
+    manager = make_manager(directory)
+    assert manager.status('old')['status'] == jobs.FAILED
@@ -0,0 +1,49 @@
+import pytest
+
+# the app needs the full server dependencies (Flask, plotly, spmf, ...)
+pytest.importorskip('flask')
+main = pytest.importorskip('main')
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+def test_expired_handle_returns_410(client):
+    # the front-end re-requests the selection with the mining configuration when it gets 410
+    response = client.post('/distribution_data', json={'handle': 'expired-handle', 'rids': ['1']})
+    assert response.status_code == 410
+    assert response.get_json() == {'error': 'result expired, patterns must be mined again'}
+
+
+def test_too_many_patterns_is_reported_to_front_end(client, monkeypatch):
+    def get_frequent_itemsets(*args, **kwargs):
+        raise main.utils.TooManyPatterns("SPMF output exceeded 10 bytes")
+
+    monkeypatch.setattr(main.utils, 'get_frequent_itemsets', get_frequent_itemsets)
+    response = client.post('/fis', json={'config': {'support': 1}, 'data': 'flaredown'})
+    assert response.status_code == 200
+    assert response.get_json() == {'toomany': '1'}
+
+
+def test_mining_errors_are_not_reported_as_too_many_patterns(client, monkeypatch):
+    def get_sequential_rules(*args, **kwargs):
+        raise KeyError('support')
+
+    monkeypatch.setattr(main.utils, 'get_sequential_rules', get_sequential_rules)
+    # the app runs with DEBUG, which re-raises errors instead of answering 500
+    monkeypatch.setitem(main.app.config, 'PROPAGATE_EXCEPTIONS', False)
+    response = client.post('/rules', json={'config': {}, 'data': 'flaredown'})
+    assert response.status_code == 500
+
+
+def test_invalid_pivot_count_is_rejected(client):
+    response = client.post('/rules', json={'config': None, 'data': 'airport', 'centrality_pivots': 0})
+    assert response.status_code == 400
+
+
+def test_unknown_patterns_of_legacy_request_return_404(client):
+    response = client.post('/distribution_data', json={'config': None, 'mode': 0, 'data': 'airport',
+                                                       'rids': ['unknown-rule']})
+    assert response.status_code == 404
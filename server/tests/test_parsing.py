@@ -0,0 +1,57 @@
+import random
+import numpy as np
+import pytest
+from pattern_mining.post_processing.pattern_classes import _PatternTable
+
+# post_processing needs the full server dependencies (plotly, ...)
+post_processing = pytest.importorskip('pattern_mining.post_processing.post_processing')
+
+
+def naive_parse_rules(rules_file: str) -> list:
+    # line by line parser the bulk parser replaced
+    rules = []
+    with open(rules_file) as f:
+        for line in f:
+            lhs, rest = line.split('==>')
+            rest = rest.split()
+            rules.append(([int(item) for item in lhs.split(',')], int(rest[0]), int(rest[2]), round(float(rest[4]), 2)))
+    return rules
+
+
+def naive_parse_itemsets(itemset_file: str) -> list:
+    itemsets = []
+    with open(itemset_file) as f:
+        for line in f:
+            items, support = line.split('#SUP:')
+            itemsets.append(([int(item) for item in items.split()], int(support)))
+    return itemsets
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_rules_same_as_line_parser(tmp_path, seed):
+    rng = random.Random(seed)
+    path = str(tmp_path / 'rules.txt')
+    with open(path, 'w') as f:
+        for _ in range(50):
+            lhs = rng.sample(range(1, 300), rng.randint(1, 4))
+            f.write(','.join(map(str, lhs)) + ' ==> ' + str(rng.randint(1, 300)) + ' #SUP: ' +
+                    str(rng.randint(1, 1000)) + ' #CONF: ' + str(round(rng.random(), 6)) + '\n')
+    parsed = [(list(rule.LHS), rule.RHS, rule.support, rule.confidence) for rule in post_processing.parse_rules(path)]
+    assert parsed == naive_parse_rules(path)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_itemsets_same_as_line_parser(tmp_path, seed):
+    rng = random.Random(seed)
+    path = str(tmp_path / 'itemsets.txt')
+    with open(path, 'w') as f:
+        for _ in range(50):
+            items = sorted(rng.sample(range(1, 300), rng.randint(1, 5)))
+            f.write(' '.join(map(str, items)) + ' #SUP: ' + str(rng.randint(1, 1000)) + '\n')
+    parsed = [(list(fis.items), fis.support) for fis in post_processing.parse_itemsets(path)]
+    assert parsed == naive_parse_itemsets(path)
+
+
+def test_pattern_table_is_abstract():
+    with pytest.raises(TypeError):
+        _PatternTable(np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64))
@@ -0,0 +1,24 @@
+import time
+import numpy as np
+import pytest
+from pattern_mining.post_processing.pattern_classes import FrequentItemSet
+from pattern_mining.post_processing.pattern_store import PatternStore, PatternSetExpired
+
+
+def test_stored_patterns_are_returned_by_id(tmp_path):
+    store = PatternStore(str(tmp_path), ttl=60)
+    patterns = [FrequentItemSet(np.array([1, 2]), 10), FrequentItemSet(np.array([3]), 5)]
+    store.put('handle', patterns, 'airport', False)
+    data, rule, found = store.get('handle', [patterns[1].id, 'unknown'])
+    assert (data, rule) == ('airport', False)
+    assert [pattern.id for pattern in found] == [patterns[1].id]
+
+
+def test_unknown_and_expired_handles_raise(tmp_path):
+    store = PatternStore(str(tmp_path), ttl=0.1)
+    store.put('handle', [FrequentItemSet(np.array([1]), 10)], 'airport', False)
+    with pytest.raises(PatternSetExpired):
+        store.get('unknown', [])
+    time.sleep(0.2)
+    with pytest.raises(PatternSetExpired):
+        store.get('handle', [])
@@ -0,0 +1,40 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from pattern_mining.post_processing.pattern_classes import Rule
+from pattern_mining.post_processing.position_index import PositionIndex
+
+
+def naive_match(events: list, lhs: list, rhs: int) -> bool:
+    # the row-wise check PositionIndex replaced: every LHS item first occurs before the first RHS
+    return rhs in events and all(item in events and events.index(item) < events.index(rhs) for item in lhs)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_rules_match_row_scan(seed):
+    rng = random.Random(seed)
+    sequences = [[rng.randrange(10) for _ in range(rng.randint(0, 12))] for _ in range(120)]
+    df = pd.DataFrame({'Sequence': sequences, 'id': ['t' + str(i) for i in range(len(sequences))]},
+                      index=[5 * i for i in range(len(sequences))])
+    index = PositionIndex(df, 'Sequence', 'id')
+    # item 11 is in no sequence, 50 is beyond the largest item code
+    rules = [Rule(np.array(rng.sample([*range(10), 11, 50], rng.randint(0, 3))), rng.choice([*range(10), 50]), 1, 1.0)
+             for _ in range(80)]
+    subset = sorted(rng.sample(list(df.index), 50))
+    for rows, labels in ((None, list(df.index)), (index.rows(subset), subset)):
+        matched = index.seq_ids_per_rule(rules, rows)
+        for rule, seq_ids in zip(rules, matched):
+            assert seq_ids == [df.loc[label, 'id'] for label in labels
+                               if naive_match(df.loc[label, 'Sequence'], list(rule.LHS), rule.RHS)]
+
+
+def test_small_batches_give_same_result():
+    rng = random.Random(0)
+    sequences = [[rng.randrange(6) for _ in range(8)] for _ in range(40)]
+    index = PositionIndex(pd.DataFrame({'Sequence': sequences, 'id': range(40)}), 'Sequence', 'id')
+    lhs = [np.array(rng.sample(range(6), 2)) for _ in range(20)]
+    rhs = [rng.randrange(6) for _ in range(20)]
+    expected = index.match_rules(lhs, rhs)
+    batched = index.match_rules(lhs, rhs, batch_cells=1)
+    assert all(np.array_equal(a, b) for a, b in zip(expected, batched))
@@ -0,0 +1,28 @@
+import random
+import numpy as np
+import pytest
+from pattern_mining.post_processing.pattern_classes import Rule
+
+# post_processing needs the full server dependencies (plotly, ...)
+post_processing = pytest.importorskip('pattern_mining.post_processing.post_processing')
+
+
+def naive_remove_redundant_rules(rules: list) -> list:
+    # pairwise check the bucketed version replaced
+    redundant_ids = set()
+    for rule in rules:
+        for other in rules:
+            if rule.id != other.id and other.RHS == rule.RHS and set(other.LHS) <= set(rule.LHS) and \
+                    other.support == rule.support and other.confidence == rule.confidence:
+                redundant_ids.add(rule.id)
+    return [rule for rule in rules if rule.id not in redundant_ids]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_same_rules_as_pairwise_check(seed):
+    rng = random.Random(seed)
+    # few distinct RHS/support/confidence values, so buckets are large and subsets are frequent
+    rules = [Rule(np.array(sorted(rng.sample(range(1, 9), rng.randint(1, 5)))), rng.randint(9, 10),
+                  rng.randint(1, 3), rng.choice([0.5, 1.0])) for _ in range(300)]
+    assert [rule.id for rule in post_processing.remove_redundant_rules(rules)] == \
+        [rule.id for rule in naive_remove_redundant_rules(rules)]
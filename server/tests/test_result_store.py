@@ -0,0 +1,51 @@
+import numpy as np
+from pattern_mining.post_processing.pattern_classes import ItemsetTable
+from pattern_mining.post_processing.result_store import ThresholdResultStore
+
+
+def make_table(supports, record_count=100):
+    supports = np.asarray(supports, dtype=np.int64)
+    indptr = np.arange(len(supports) + 1, dtype=np.int64)
+    items = np.arange(len(supports), dtype=np.int64)
+    return ItemsetTable(indptr, items, supports, record_count=record_count)
+
+
+def test_stricter_support_is_served_from_permissive_run():
+    store = ThresholdResultStore()
+    store.put('key', 10, None, make_table([50, 20, 10]))
+    assert list(store.get('key', 20, None).support) == [50, 20]
+    assert store.get('key', 5, None) is None
+
+
+def test_least_recently_used_key_is_evicted_over_pattern_budget():
+    store = ThresholdResultStore(max_patterns=5)
+    store.put('a', 10, None, make_table([10, 10]))
+    store.put('b', 10, None, make_table([10, 10]))
+    assert store.get('a', 10, None) is not None  # b is now the least recently used key
+    store.put('c', 10, None, make_table([10, 10]))
+    assert store.get('b', 10, None) is None
+    assert store.get('a', 10, None) is not None
+    assert store.get('c', 10, None) is not None
+    assert store.pattern_count == 4
+
+
+def test_run_over_pattern_budget_is_not_stored():
+    store = ThresholdResultStore(max_patterns=2)
+    store.put('a', 10, None, make_table([10, 10, 10]))
+    assert store.get('a', 10, None) is None
+    assert store.pattern_count == 0
+
+
+def test_dominated_runs_are_released_from_budget():
+    store = ThresholdResultStore(max_patterns=10)
+    store.put('a', 20, None, make_table([30, 20]))
+    store.put('a', 10, None, make_table([30, 20, 10]))
+    assert store.pattern_count == 3
+
+
+def test_key_count_limit():
+    store = ThresholdResultStore(max_keys=2)
+    for key in ['a', 'b', 'c']:
+        store.put(key, 10, None, make_table([10]))
+    assert store.get('a', 10, None) is None
+    assert store.pattern_count == 2
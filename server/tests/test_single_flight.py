@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import time
+import pytest
+from pattern_mining.post_processing.single_flight import SingleFlight, fcntl
+
+
+def compute(log_path: str, fail: bool):
+    with open(log_path, 'a') as log:
+        log.write('start {}\n'.format(time.time()))
+    time.sleep(0.4)
+    with open(log_path, 'a') as log:
+        log.write('end {}\n'.format(time.time()))
+    if fail:
+        raise RuntimeError('leader failed')
+    return 'result'
+
+
+def call(lock_directory: str, log_path: str, delay: float, fail: bool):
+    time.sleep(delay)
+    try:
+        SingleFlight(lock_directory).do('key', lambda: compute(log_path, fail), lambda: (False, None))
+    except RuntimeError:
+        pass
+
+
+def concurrency(log_path: str) -> tuple:
+    # maximum number of computations running at the same time, and number of computations
+    with open(log_path) as log:
+        events = sorted((float(time_), kind) for kind, time_ in (line.split() for line in log))
+    depth, max_depth = 0, 0
+    for _, kind in events:
+        depth += 1 if kind == 'start' else -1
+        max_depth = max(max_depth, depth)
+    return max_depth, len(events) // 2
+
+
+@pytest.mark.skipif(fcntl is None, reason='cross-process locks need fcntl')
+def test_one_leader_at_a_time_across_processes_when_leader_raises(tmp_path):
+    lock_directory = str(tmp_path / 'locks')
+    log_path = str(tmp_path / 'log')
+    context = multiprocessing.get_context('fork')
+    # the leader raises, so nothing is stored and the waiting callers compute again one at a time. The last caller
+    # arrives after the leader removed its lock file, while a waiting caller computes
+    processes = [context.Process(target=call, args=(lock_directory, log_path, 0.0, True)),
+                 context.Process(target=call, args=(lock_directory, log_path, 0.1, False)),
+                 context.Process(target=call, args=(lock_directory, log_path, 0.1, False)),
+                 context.Process(target=call, args=(lock_directory, log_path, 0.6, False))]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(10)
+        assert process.exitcode == 0
+    max_depth, computations = concurrency(log_path)
+    assert computations == 4
+    assert max_depth == 1
+    assert os.listdir(lock_directory) == []
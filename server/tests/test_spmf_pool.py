@@ -0,0 +1,89 @@
+import subprocess
+import sys
+import threading
+import time
+import pytest
+from pattern_mining.mining import spmf_pool
+
+# stands in for java/SpmfWorker: replies @DONE to every job, never replies to a 'hang' job, keeps writing output for
+# a 'flood' job and runs out of memory for an 'oom' job
+FAKE_WORKER = '''
+import sys, time
+for line in sys.stdin:
+    if line.startswith('hang'):
+        time.sleep(3600)
+    if line.startswith('flood'):
+        with open(line.strip().split('\\t')[2], 'w') as output:
+            while True:
+                output.write('1 2 #SUP: 10\\n' * 1000)
+                output.flush()
+                time.sleep(0.01)
+    if line.startswith('oom'):
+        print('@ERROR java.lang.OutOfMemoryError: Java heap space', flush=True)
+        continue
+    print('@DONE', flush=True)
+'''
+
+
+class FakeWorker(spmf_pool.SpmfWorker):
+    started = 0
+
+    def __init__(self, memory: int):
+        FakeWorker.started += 1
+        self.process = subprocess.Popen([sys.executable, '-c', FAKE_WORKER], stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, text=True, bufsize=1)
+
+
+@pytest.fixture
+def pool():
+    FakeWorker.started = 0
+    pool = spmf_pool.SpmfWorkerPool(size=1, max_queue=2, timeout=1, max_bytes=100000, worker_factory=FakeWorker)
+    yield pool
+    pool.close()
+
+
+def test_job_runs_on_warm_worker(pool):
+    pool.run('FPGrowth_itemsets', 'in.txt', 'out.txt', ['10%'])
+    pool.run('FPGrowth_itemsets', 'in.txt', 'out.txt', ['10%'])
+    assert FakeWorker.started == 1
+
+
+def test_hung_job_times_out_and_worker_is_replaced(pool):
+    start = time.time()
+    with pytest.raises(spmf_pool.SpmfJobTimeout):
+        pool.run('hang', 'in.txt', 'out.txt', [])
+    assert time.time() - start < 5
+    pool.run('FPGrowth_itemsets', 'in.txt', 'out.txt', ['10%'])
+    assert FakeWorker.started == 2
+
+
+def test_waiting_job_gets_the_place_of_a_killed_worker(pool):
+    results = []
+
+    def run_hung():
+        with pytest.raises(spmf_pool.SpmfJobTimeout):
+            pool.run('hang', 'in.txt', 'out.txt', [])
+
+    hung = threading.Thread(target=run_hung)
+    hung.start()
+    time.sleep(0.2)
+    waiting = threading.Thread(target=lambda: results.append(pool.run('FPGrowth_itemsets', 'in.txt', 'out.txt', [])))
+    waiting.start()
+    hung.join(5)
+    waiting.join(5)
+    assert not waiting.is_alive()
+    assert results == [None]
+    assert FakeWorker.started == 2
+
+
+def test_job_exceeding_output_cap_is_killed(pool, tmp_path):
+    with pytest.raises(spmf_pool.SpmfOutputTooLarge):
+        pool.run('flood', 'in.txt', str(tmp_path / 'out.txt'), [])
+    pool.run('FPGrowth_itemsets', 'in.txt', str(tmp_path / 'out2.txt'), ['10%'])
+    assert FakeWorker.started == 2
+
+
+def test_worker_out_of_memory_is_output_too_large(pool):
+    with pytest.raises(spmf_pool.SpmfOutputTooLarge):
+        pool.run('oom', 'in.txt', 'out.txt', [])
+    assert FakeWorker.started == 1
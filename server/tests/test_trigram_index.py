@@ -0,0 +1,35 @@
+import random
+import pytest
+from pattern_mining.post_processing.trigram_index import TrigramIndex
+
+
+def random_names(seed: int, count: int = 300) -> list:
+    rng = random.Random(seed)
+    # a small alphabet, so queries of every length match some names
+    return [''.join(rng.choice('abcAB -') for _ in range(rng.randint(0, 12))) for _ in range(count)]
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_search_matches_substring_scan(seed):
+    names = random_names(seed)
+    codes = [10 * i + 1 for i in range(len(names))]
+    index = TrigramIndex(names, codes)
+    rng = random.Random(seed)
+    queries = [''.join(rng.choice('abcAB -x') for _ in range(length)) for length in range(7) for _ in range(20)]
+    queries += [name[2:8] for name in rng.sample(names, 20)]
+    for query in queries:
+        expected = [code for name, code in zip(names, codes) if query.lower() in name.lower()]
+        assert index.search(query) == expected
+        expected = [code for name, code in zip(names, codes) if query in name.lower()]
+        assert index.search(query, lowercase=False) == expected
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_suggestions_start_with_prefix_matches(seed):
+    names = random_names(seed)
+    index = TrigramIndex(names, list(range(len(names))))
+    for query in ['a', 'Ab', 'ab c', 'q']:
+        matches = [code for code, name in enumerate(names) if query.lower() in name.lower()]
+        prefixed = [code for code in matches if names[code].lower().startswith(query.lower())]
+        expected = prefixed + [code for code in matches if code not in prefixed]
+        assert index.suggest(query, limit=15) == [{'value': code, 'text': names[code]} for code in expected[:15]]
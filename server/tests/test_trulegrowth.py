@@ -0,0 +1,97 @@
+import random
+from itertools import combinations
+import pytest
+from pattern_mining.mining import trulegrowth
+from pattern_mining.mining.fpgrowth import get_min_count
+from pattern_mining.mining.limits import TooManyPatterns
+
+
+def random_sequences(seed: int, count: int, items: int) -> list:
+    rng = random.Random(seed)
+    # complex sequences have itemsets of simultaneous items
+    return [[rng.randrange(items) if rng.random() < 0.7 else tuple(sorted(rng.sample(range(items), 2)))
+             for _ in range(rng.randint(1, 8))] for _ in range(count)]
+
+
+def holds(itemsets: list, lhs: tuple, rhs: tuple, window: int) -> bool:
+    # tries every window start and every split between antecedent and consequent
+    for start in range(len(itemsets)):
+        span = itemsets[start:start + window]
+        for split in range(1, len(span)):
+            before = set(item for itemset in span[:split] for item in itemset)
+            after = set(item for itemset in span[split:] for item in itemset)
+            if set(lhs) <= before and set(rhs) <= after:
+                return True
+    return False
+
+
+def naive_rules(sequences: list, support: float, confidence: float, window: int) -> dict:
+    itemsets = [trulegrowth.to_itemsets(sequence) for sequence in sequences]
+    min_count = get_min_count(support, len(itemsets))
+    items = sorted(set(item for sequence in itemsets for itemset in sequence for item in itemset))
+    rules = {}
+    for rhs in items:
+        others = [item for item in items if item != rhs]
+        for size in range(1, window + 1):
+            for lhs in combinations(others, size):
+                sids = [sid for sid, sequence in enumerate(itemsets) if holds(sequence, lhs, (rhs,), window)]
+                if len(sids) < min_count:
+                    continue
+                lhs_count = sum(1 for sequence in itemsets
+                                if set(lhs) <= set(item for itemset in sequence for item in itemset))
+                if len(sids) / lhs_count >= confidence / 100:
+                    rules[(lhs, rhs)] = (len(sids), len(sids) / lhs_count, sids)
+    return rules
+
+
+def mined_rules(table) -> dict:
+    return {(tuple(int(item) for item in rule.LHS), int(rule.RHS)): rule for rule in table}
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('support, confidence, window', [(10, 50, 3), (20, 30, 4), (5, 25, 2)])
+def test_same_rules_as_naive_matcher(seed, support, confidence, window):
+    sequences = random_sequences(seed, 30, 6)
+    ids = ['s' + str(i) for i in range(len(sequences))]
+    expected = naive_rules(sequences, support, confidence, window)
+    mined = mined_rules(trulegrowth.mine_sequential_rules(sequences, ids, support, confidence, window))
+    assert set(mined) == set(expected)
+    for key, rule in mined.items():
+        count, rule_confidence, sids = expected[key]
+        assert rule.support == count
+        assert rule.confidence == round(rule_confidence, 2)
+        assert rule.seq_ids == [ids[sid] for sid in sids]
+
+
+def test_no_sequences():
+    assert len(trulegrowth.mine_sequential_rules([], [], 10, 50, 3)) == 0
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('k, confidence, window', [(5, 50, 3), (20, 30, 2), (1, 10, 4)])
+def test_top_k_rules_have_the_highest_support(seed, k, confidence, window):
+    sequences = random_sequences(seed, 30, 6)
+    ids = ['s' + str(i) for i in range(len(sequences))]
+    # a support of one sequence gives every rule the top-k miner can choose from
+    expected = naive_rules(sequences, 1, confidence, window)
+    table = trulegrowth.mine_top_k_rules(sequences, ids, k, confidence, window)
+    assert len(table) == min(k, len(expected))
+    assert sorted((rule.support for rule in table), reverse=True) == \
+        sorted((count for count, _, _ in expected.values()), reverse=True)[:k]
+    for key, rule in mined_rules(table).items():
+        count, rule_confidence, sids = expected[key]
+        assert rule.support == count
+        assert rule.confidence == round(rule_confidence, 2)
+        assert rule.seq_ids == [ids[sid] for sid in sids]
+    ranks = [(rule.support, rule.confidence) for rule in table]
+    assert ranks == sorted(ranks, reverse=True)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_pattern_budget(seed):
+    sequences = random_sequences(seed, 30, 6)
+    ids = ['s' + str(i) for i in range(len(sequences))]
+    count = len(naive_rules(sequences, 10, 30, 3))
+    assert len(trulegrowth.mine_sequential_rules(sequences, ids, 10, 30, 3, max_patterns=count)) == count
+    with pytest.raises(TooManyPatterns):
+        trulegrowth.mine_sequential_rules(sequences, ids, 10, 30, 3, max_patterns=count - 1)
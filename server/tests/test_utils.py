@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+# utils needs the full server dependencies (plotly, ...)
+utils = pytest.importorskip('pattern_mining.post_processing.utils')
+from pattern_mining.mining import spmf_manager, spmf_pool
+from pattern_mining.post_processing.pattern_classes import Rule
+
+
+def test_top_rules_are_cut_after_redundancy_removal(monkeypatch):
+    monkeypatch.setattr(utils, 'max_rules', 2)
+    rules = [Rule(np.array([1]), 3, 10, 0.5),
+             Rule(np.array([1, 2]), 3, 10, 0.5),  # redundant with 1 => 3
+             Rule(np.array([4]), 3, 5, 0.5),
+             Rule(np.array([5]), 3, 4, 0.5)]
+    kept, total = utils.post_process_rules(rules)
+    assert [rule.id for rule in kept] == [rules[0].id, rules[2].id]
+    assert total == 3
+
+
+def test_rules_within_max_rules_have_no_total():
+    rules = [Rule(np.array([1]), 3, 10, 0.5), Rule(np.array([4]), 3, 5, 0.5)]
+    kept, total = utils.post_process_rules(rules)
+    assert len(kept) == 2
+    assert total is None
+
+
+def test_spmf_output_cap_is_too_many_patterns(monkeypatch):
+    def run(*args, **kwargs):
+        raise spmf_pool.SpmfOutputTooLarge("SPMF output exceeded 10 bytes")
+
+    monkeypatch.setattr(spmf_manager, 'run', run)
+    with pytest.raises(utils.TooManyPatterns):
+        utils.mine_patterns(['1 2\n'], support=10, itemset=True, is_spmf_format=True, backend='spmf')
+
+
+def test_other_spmf_errors_are_not_too_many_patterns(monkeypatch):
+    def run(*args, **kwargs):
+        raise spmf_pool.SpmfWorkerError("java.lang.IllegalArgumentException")
+
+    monkeypatch.setattr(spmf_manager, 'run', run)
+    with pytest.raises(spmf_pool.SpmfWorkerError):
+        utils.mine_patterns(['1 2\n'], support=10, itemset=True, is_spmf_format=True, backend='spmf')